@@ -0,0 +1,101 @@
+"""
+Память FSM на одного пользователя для списков тикетов (история тикетов пользователя
+и список неназначенных тикетов модератора).
+
+Раньше обработчики сохраняли в данные FSM каждый тикет списка в виде готового словаря
+(тексты, тема, отформатированные даты, имена), теперь - только номер страницы.
+Скрипт записывает оба варианта данных в хранилище FSM (EvictingStorage) для заданного
+количества пользователей и сравнивает память по tracemalloc.
+
+Запуск из корня репозитория:
+    python benchmarks/fsm_memory.py [--users 1000] [--tickets 10 50]
+"""
+import os
+import sys
+import asyncio
+import argparse
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram.fsm.storage.base import StorageKey
+
+from utils.fsm_storage import EvictingStorage
+
+SUBJECT = "Не могу войти в аккаунт после смены пароля, пишет что сессия истекла"
+USER_NAME = "Иван Петров"
+
+
+def history_payload(tickets: int) -> dict:
+    """Данные FSM истории тикетов до изменения (handlers/user.py)"""
+    now = datetime(2025, 1, 1, 12, 0)
+    return {
+        "tickets": [
+            {
+                "id": 100000 + i,
+                "text": f"Тикет #{100000 + i} - {SUBJECT}",
+                "subject": SUBJECT,
+                "created_at": now.strftime("%d.%m.%Y %H:%M"),
+                "closed_at": now.strftime("%d.%m.%Y %H:%M"),
+                "rating": 5.0,
+            }
+            for i in range(tickets)
+        ],
+        "page": 0,
+    }
+
+
+def unassigned_payload(tickets: int) -> dict:
+    """Данные FSM списка неназначенных тикетов до изменения (handlers/moderator.py)"""
+    now = datetime(2025, 1, 1, 12, 0)
+    return {
+        "tickets": [
+            {
+                "id": 100000 + i,
+                "text": f"Тикет #{100000 + i} - {USER_NAME}",
+                "subject": SUBJECT,
+                "created_at": now.strftime("%d.%m.%Y %H:%M"),
+                "user_name": USER_NAME,
+                "user_id": 1000 + i,
+            }
+            for i in range(tickets)
+        ],
+        "page": 0,
+    }
+
+
+def cursor_payload(tickets: int) -> dict:
+    """Данные FSM обоих списков после изменения: только номер страницы"""
+    return {"page": 0}
+
+
+async def measure(payload, users: int, tickets: int) -> float:
+    """Записывает данные FSM для users пользователей и возвращает байт на пользователя"""
+    storage = EvictingStorage(idle_ttl=0, max_entries=0)
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    for user_id in range(users):
+        key = StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+        await storage.set_data(key, payload(tickets))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (current - baseline) / users
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000, help="количество пользователей")
+    parser.add_argument("--tickets", type=int, nargs="+", default=[10, 50], help="тикетов в списке")
+    args = parser.parse_args()
+
+    print(f"Память FSM на пользователя, {args.users} пользователей")
+    for tickets in args.tickets:
+        for name, before in (("история тикетов", history_payload), ("неназначенные тикеты", unassigned_payload)):
+            old = await measure(before, args.users, tickets)
+            new = await measure(cursor_payload, args.users, tickets)
+            print(f"  {name}, {tickets} тикетов: {old:.0f} Б -> {new:.0f} Б ({old / new:.0f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,143 @@
+"""
+Скорость функции перевода _() (вызовов в секунду) на ключах из locales/ru.json.
+
+Случаи:
+    plain_ru     - строка без подстановок на языке по умолчанию
+    plain_en     - строка без подстановок на другом языке
+    fallback_en  - ключ, которого нет в en.json (перевод берется из языка по умолчанию)
+    formatted_ru - строка с подстановками {name}
+    context_lang - язык не передан и берется из контекста апдейта
+
+С параметром --baseline та же нагрузка запускается на utils/i18n.py из указанной
+git-ревизии, например на версии до предкомпиляции каталогов (_Snapshot, _Template).
+Параметр --revision заменяет рабочую копию на другую ревизию, так что отдельное
+изменение можно измерить без более поздних:
+    python benchmarks/i18n_lookup.py --baseline f68e5c5~1 --revision f68e5c5
+
+Запуск из корня репозитория:
+    python benchmarks/i18n_lookup.py [--calls 200000] [--repeat 7] [--baseline REV] [--revision REV]
+"""
+import os
+import sys
+import json
+import time
+import types
+import string
+import logging
+import argparse
+import subprocess
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOCALES_DIR = os.path.join(ROOT, "locales")
+sys.path.insert(0, ROOT)
+
+from utils import i18n
+
+
+def load_revision(revision: str) -> types.ModuleType:
+    """Загружает utils/i18n.py из git-ревизии как отдельный модуль"""
+    source = subprocess.run(
+        ["git", "show", f"{revision}:utils/i18n.py"],
+        cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    module = types.ModuleType(f"i18n_{revision}")
+    exec(compile(source, f"{revision}:utils/i18n.py", "exec"), module.__dict__)
+    return module
+
+
+def make_cases(module: types.ModuleType, calls: int) -> Dict[str, Callable[[], None]]:
+    """Создает нагрузки для функции _ модуля локализации"""
+    with open(os.path.join(LOCALES_DIR, "ru.json"), encoding="utf-8") as f:
+        ru = json.load(f)
+    with open(os.path.join(LOCALES_DIR, "en.json"), encoding="utf-8") as f:
+        en = json.load(f)
+
+    plain = [key for key, value in ru.items() if "{" not in value]
+    fallback = [key for key in ru if key not in en]
+    formatted = [
+        (key, {field: 1 for _, field, _, _ in string.Formatter().parse(value) if field})
+        for key, value in ru.items() if "{" in value
+    ]
+    translate = module._
+
+    def plain_ru():
+        for i in range(calls):
+            translate(plain[i % len(plain)], "ru")
+
+    def plain_en():
+        for i in range(calls):
+            translate(plain[i % len(plain)], "en")
+
+    def fallback_en():
+        for i in range(calls):
+            translate(fallback[i % len(fallback)], "en")
+
+    def formatted_ru():
+        for i in range(calls):
+            key, kwargs = formatted[i % len(formatted)]
+            translate(key, "ru", **kwargs)
+
+    def context_lang():
+        for i in range(calls):
+            translate(plain[i % len(plain)])
+
+    cases = {
+        "plain_ru": plain_ru,
+        "plain_en": plain_en,
+        "fallback_en": fallback_en,
+        "formatted_ru": formatted_ru,
+        "context_lang": context_lang,
+    }
+    if not fallback:
+        del cases["fallback_en"]
+    return cases
+
+
+def run(module: types.ModuleType, calls: int, repeat: int) -> Dict[str, float]:
+    """Возвращает лучший результат (вызовов в секунду) для каждого случая"""
+    module.setup_i18n(LOCALES_DIR, "ru")
+    token = module.set_current_language("en") if hasattr(module, "set_current_language") else None
+
+    results = {}
+    for name, case in make_cases(module, calls).items():
+        # Первый прогон прогревает кэши и не учитывается
+        case()
+        timings: List[float] = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            case()
+            timings.append(time.perf_counter() - started)
+        results[name] = calls / min(timings)
+
+    if token is not None:
+        module.reset_current_language(token)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200_000, help="вызовов _() на один замер")
+    parser.add_argument("--repeat", type=int, default=7, help="замеров, берется лучший")
+    parser.add_argument("--baseline", help="git-ревизия для сравнения")
+    parser.add_argument("--revision", help="git-ревизия вместо рабочей копии")
+    args = parser.parse_args()
+
+    # Предупреждения о недостающих переводах не должны попадать в замер
+    logging.disable(logging.CRITICAL)
+
+    baseline: Optional[Dict[str, float]] = None
+    if args.baseline:
+        baseline = run(load_revision(args.baseline), args.calls, args.repeat)
+    current = run(load_revision(args.revision) if args.revision else i18n, args.calls, args.repeat)
+
+    print(f"_(): вызовов в секунду, лучший из {args.repeat} замеров по {args.calls}")
+    for name, rate in current.items():
+        line = f"  {name:13s} {rate / 1e6:5.2f}M/s"
+        if baseline is not None:
+            line = f"  {name:13s} {baseline[name] / 1e6:5.2f}M/s -> {rate / 1e6:5.2f}M/s"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
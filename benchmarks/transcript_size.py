@@ -0,0 +1,234 @@
+"""
+Место, которое занимает архив переписки: строки messages_archive против одного сжатого
+блока tickets_archive.transcript и текста tickets_archive.transcript_text на тикет (ARCHIVE_COMPRESS).
+
+Скрипт заполняет SQLite закрытыми тикетами с перепиской на русском, английском
+и украинском (текст, фото с подписями, системные сообщения), переносит их в архив
+задачей ArchiveJob в обоих режимах и сравнивает размер архивных таблиц с индексами
+и полнотекстовыми индексами (по dbstat), а также скорость упаковки и распаковки.
+В обоих режимах в размер входит полнотекстовый индекс текста сообщений.
+Перед сравнением проверяется, что переписка читается одинаково, а поиск по тексту
+сообщений находит в обоих режимах одни и те же тикеты.
+
+Запуск из корня репозитория (нужен aiosqlite, см. requirements-dev.txt):
+    python benchmarks/transcript_size.py [--tickets 3000] [--seed 7]
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import database
+from database import Base
+from utils.archive import ArchiveJob, find_ticket
+from utils.search import setup_search, search_tickets
+from utils.transcript import pack_transcript, unpack_transcript, transcript_text
+
+PHRASES: Dict[str, List[str]] = {
+    "ru": [
+        "Здравствуйте! У меня не проходит оплата картой, пишет ошибка 402.",
+        "Добрый день, подскажите, пожалуйста, номер заказа.",
+        "Номер заказа {n}, оплачивал вчера вечером через приложение.",
+        "Спасибо, проверяю информацию по вашему заказу, это займет пару минут.",
+        "Платеж отклонен банком-эмитентом. Попробуйте, пожалуйста, другую карту или свяжитесь с банком.",
+        "Попробовал другую карту, теперь все прошло, спасибо!",
+        "Не приходит код подтверждения на телефон {p}.",
+        "Проверьте, пожалуйста, не заблокированы ли SMS с коротких номеров.",
+        "Рады были помочь! Хорошего дня.",
+    ],
+    "en": [
+        "Hi, I can't log into my account since the last update.",
+        "Could you tell me which device and app version you're using?",
+        "iPhone 13, app version 4.{n}.2",
+        "Thanks! Please try clearing the cache and reinstalling the app.",
+        "Still the same error: session expired.",
+        "I've reset your session on our side, please try again now.",
+        "It works now, thank you so much!",
+        "My order #{n} arrived damaged, the box was crushed.",
+    ],
+    "uk": [
+        "Доброго дня! Не можу змінити адресу доставки для замовлення {n}.",
+        "Вітаю! Вкажіть, будь ласка, нову адресу.",
+        "Київ, вул. Хрещатик, {n}, кв. 12",
+        "Адресу змінено, кур'єр зв'яжеться з вами напередодні доставки.",
+        "Дякую за допомогу!",
+    ],
+}
+
+SYSTEM_MESSAGES = [
+    "Модератор Анна взяла тикет в работу",
+    "Тикет закрыт модератором",
+    "Пользователь оценил работу: ⭐⭐⭐⭐⭐",
+    "Ticket reassigned to moderator Ivan",
+]
+
+# Таблицы архива переписки: строки сообщений, их индексы и полнотекстовый индекс,
+# тикеты с блоками и текстом для поиска (tickets_archive_transcript_fts)
+ARCHIVE_TABLES = ("messages_archive", "ix_messages_archive", "sqlite_autoindex_messages_archive", "tickets_archive")
+
+# Слова из переписки на каждом языке для проверки поиска
+SEARCH_QUERIES = ("оплата", "заказа", "session", "damaged", "Хрещатик", "доставки")
+
+NOW = datetime(2026, 1, 1, 12, 0)
+
+
+def conversation(rng: random.Random) -> Tuple[datetime, List[Tuple[str, str, datetime]]]:
+    """Переписка одного тикета: (время создания, [(тип, текст, время отправки)])"""
+    language = rng.choice(list(PHRASES))
+    created_at = NOW - timedelta(days=rng.randint(100, 300))
+
+    def phrase() -> str:
+        return rng.choice(PHRASES[language]).format(
+            n=rng.randint(1000, 99999), p=f"+7900{rng.randint(1000000, 9999999)}"
+        )
+
+    messages = []
+    for i in range(rng.randint(3, 25)):
+        if rng.random() < 0.15:
+            message_type, message_text = "SYSTEM", rng.choice(SYSTEM_MESSAGES)
+        elif rng.random() < 0.08:
+            message_type, message_text = "PHOTO", "[ФОТО] " + phrase()
+        else:
+            message_type, message_text = "TEXT", phrase()
+        messages.append((message_type, message_text, created_at + timedelta(minutes=3 * i + rng.random())))
+    return created_at, messages
+
+
+async def build(path: str, tickets: int, seed: int, compress: bool) -> Tuple[AsyncEngine, ArchiveJob, float]:
+    """Создает БД с закрытыми тикетами и переносит их в архив"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    database.engine = engine
+    database.async_session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    await setup_search(engine)
+
+    rng = random.Random(seed)
+    ticket_rows, message_rows = [], []
+    message_id = 0
+    for ticket_id in range(1, tickets + 1):
+        created_at, messages = conversation(rng)
+        ticket_rows.append({"id": ticket_id, "created": created_at, "closed": created_at + timedelta(hours=2),
+                            "subject": f"Вопрос {ticket_id}"})
+        for message_type, message_text, sent_at in messages:
+            message_id += 1
+            file_id = f"AgACAgIAAxkBAAI{rng.getrandbits(120):030x}" if message_type == "PHOTO" else None
+            message_rows.append({"id": message_id, "ticket": ticket_id, "sender": 1 if rng.random() < 0.5 else 2,
+                                 "type": message_type, "text": message_text, "file": file_id, "sent": sent_at})
+
+    async with engine.begin() as connection:
+        await connection.execute(text(
+            "INSERT INTO users (id, telegram_id, role, language) VALUES (1, 1, 'USER', 'ru'), (2, 2, 'MODERATOR', 'ru')"
+        ))
+        await connection.execute(text(
+            "INSERT INTO tickets (id, user_id, moderator_id, status, subject, created_at, updated_at, closed_at, priority) "
+            "VALUES (:id, 1, 2, 'CLOSED', :subject, :created, :closed, :closed, 0)"
+        ), ticket_rows)
+        await connection.execute(text(
+            "INSERT INTO messages (id, ticket_id, sender_id, message_type, text, file_id, sent_at, is_read) "
+            "VALUES (:id, :ticket, :sender, :type, :text, :file, :sent, 2)"
+        ), message_rows)
+
+    job = ArchiveJob(after_days=90, batch_size=200, pause=0, compress=compress)
+    started = time.perf_counter()
+    await job.run_once()
+    return engine, job, time.perf_counter() - started
+
+
+async def archive_size(engine: AsyncEngine) -> int:
+    """Размер архивных таблиц, их индексов и полнотекстового индекса в байтах"""
+    async with engine.connect() as connection:
+        await connection.execute(text("VACUUM"))
+        rows = (await connection.execute(text("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"))).all()
+    return sum(size for name, size in rows if name.startswith(ARCHIVE_TABLES))
+
+
+async def read_transcripts(engine: AsyncEngine, ticket_ids: range) -> Tuple[list, float]:
+    """Читает переписку тикетов через find_ticket"""
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    transcripts = []
+    started = time.perf_counter()
+    async with session_factory() as session:
+        for ticket_id in ticket_ids:
+            ticket = await find_ticket(session, ticket_id)
+            transcripts.append([
+                (m.id, m.sender_id, m.message_type, m.text, m.file_id, m.sent_at, m.is_read)
+                for m in ticket.messages
+            ])
+    return transcripts, time.perf_counter() - started
+
+
+async def search_results(engine: AsyncEngine, tickets: int) -> Dict[str, set]:
+    """Тикеты, которые поиск находит по словам SEARCH_QUERIES"""
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        return {
+            query: {ticket_id for ticket_id, _ in await search_tickets(session, query, limit=tickets)}
+            for query in SEARCH_QUERIES
+        }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tickets", type=int, default=3000, help="количество тикетов")
+    parser.add_argument("--seed", type=int, default=7, help="зерно генератора переписки")
+    args = parser.parse_args()
+
+    sizes, transcripts, found = {}, {}, {}
+    sample = range(1, args.tickets + 1, max(args.tickets // 100, 1))
+    with tempfile.TemporaryDirectory() as directory:
+        for compress in (False, True):
+            engine, job, elapsed = await build(
+                os.path.join(directory, f"archive_{int(compress)}.db"), args.tickets, args.seed, compress
+            )
+            sizes[compress] = await archive_size(engine)
+            transcripts[compress], read_time = await read_transcripts(engine, sample)
+            found[compress] = await search_results(engine, args.tickets)
+            await engine.dispose()
+            mode = "сжатая переписка" if compress else "строки сообщений"
+            print(f"{mode}: {job.stats['tickets']} тикетов, {job.stats['messages']} сообщений, "
+                  f"архивация {elapsed:.2f} с, архив {sizes[compress] / 1024:.0f} КиБ, "
+                  f"чтение {len(sample)} тикетов {read_time * 1000:.0f} мс")
+
+    assert transcripts[False] == transcripts[True], "Переписка в режимах архивации различается"
+    assert found[False] == found[True], "Поиск в режимах архивации находит разные тикеты"
+    print(f"Архив: {sizes[False] / 1024:.0f} КиБ -> {sizes[True] / 1024:.0f} КиБ "
+          f"({sizes[False] / sizes[True]:.1f}x), переписка и результаты поиска совпадают "
+          f"({sum(map(len, found[True].values()))} найденных тикетов по {len(SEARCH_QUERIES)} словам)")
+
+    # Кодек отдельно от БД
+    rng = random.Random(args.seed)
+    conversations = []
+    for _ in range(500):
+        _, messages = conversation(rng)
+        conversations.append([
+            {"id": i, "sender_id": 1, "message_type": message_type.lower(), "text": message_text,
+             "file_id": None, "sent_at": sent_at, "is_read": True, "media_group_id": None}
+            for i, (message_type, message_text, sent_at) in enumerate(messages)
+        ])
+    started = time.perf_counter()
+    packed = [(pack_transcript(messages), transcript_text(messages)) for messages in conversations]
+    pack_time = time.perf_counter() - started
+    started = time.perf_counter()
+    for blob, blob_text in packed:
+        unpack_transcript(blob, blob_text)
+    unpack_time = time.perf_counter() - started
+    text_bytes = sum(len(blob_text.encode("utf-8")) for _, blob_text in packed)
+    print(f"Кодек: упаковка {pack_time / len(packed) * 1e6:.0f} мкс/тикет, распаковка "
+          f"{unpack_time / len(packed) * 1e6:.0f} мкс/тикет, на тикет текст {text_bytes / len(packed):.0f} Б "
+          f"и блок без текста {sum(len(blob) for blob, _ in packed) / len(packed):.0f} Б")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,10 +2,10 @@
 # ------
 
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.client.default import DefaultBotProperties
 
 from config import Config
+from utils.fsm_storage import create_storage
 
 
 async def setup_bot(config: Config) -> Bot:
@@ -19,13 +19,12 @@ async def setup_bot(config: Config) -> Bot:
     return bot
 
 
-def setup_dispatcher() -> Dispatcher:
+def setup_dispatcher(config: Config) -> Dispatcher:
     """
     Настройка и инициализация диспетчера.
     """
-    # Используем MemoryStorage для хранения состояний FSM
-    # В production-среде лучше использовать RedisStorage
-    storage = MemoryStorage()
+    # Хранилище FSM с вытеснением состояний неактивных пользователей
+    storage = create_storage(config)
     dp = Dispatcher(storage=storage)
 
     return dp
\ No newline at end of file
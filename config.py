@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from environs import Env
 
@@ -37,6 +37,121 @@ class Localization:
     default_language: str
     languages: List[str]
     locales_dir: Path
+    reload_interval: float  # Интервал проверки файлов локализации (сек); 0 - без перезагрузки
+
+
+@dataclass
+class FsmConfig:
+    """Конфигурация хранилища состояний FSM"""
+    idle_ttl: int  # Время неактивности (сек), после которого состояние вытесняется
+    max_entries: int  # Максимальное количество состояний в памяти
+
+
+@dataclass
+class RedisConfig:
+    """Конфигурация Redis (общее хранилище FSM и кэш)"""
+    url: Optional[str]  # URL подключения; если не указан, Redis не используется
+    fsm_shared: bool  # True - FSM целиком в Redis, False - Redis только для вытесненных состояний
+    cache_ttl: int  # Время жизни записей кэша в секундах
+
+
+@dataclass
+class ThrottlingConfig:
+    """Конфигурация ограничения частоты запросов"""
+    rate: float  # Скорость пополнения (запросов в секунду)
+    burst: float  # Допустимый всплеск запросов
+    notify_interval: float  # Не чаще какого интервала (сек) уведомлять пользователя об ограничении
+    shared: bool  # Общие корзины в Redis для всех экземпляров (если указан REDIS_URL)
+    redis_timeout: float  # Время ожидания Redis (сек), после которого используется локальная корзина
+
+
+@dataclass
+class OverloadConfig:
+    """Конфигурация контроля перегрузки"""
+    lag_threshold: float  # Порог задержки цикла событий (сек)
+    pool_threshold: float  # Порог заполненности пула соединений БД (0..1)
+    inflight_threshold: int  # Порог количества одновременно обрабатываемых апдейтов
+    sample_interval: float  # Интервал замеров (сек)
+    recover_after: float  # Сколько секунд без превышений нужно для выхода из режима перегрузки
+
+
+@dataclass
+class AssignmentConfig:
+    """Конфигурация автоматического назначения тикетов"""
+    enabled: bool  # Назначать тикеты автоматически вместо рассылки всем модераторам
+    policy: str  # Политика выбора модератора: least_loaded, round_robin, language
+    interval: float  # Интервал проверки очереди (сек)
+    idle_timeout: float  # Сколько секунд без активности модератор не получает новые тикеты
+
+
+@dataclass
+class PresenceConfig:
+    """Конфигурация индекса присутствия сотрудников"""
+    online_after: float  # Сколько секунд после активности сотрудник считается в сети
+    idle_after: float  # Сколько секунд после активности сотрудник считается отошедшим (дальше - не в сети)
+
+
+@dataclass
+class QueueConfig:
+    """Конфигурация очереди неназначенных тикетов"""
+    priority_step_minutes: float  # На сколько минут каждый уровень приоритета продвигает тикет в очереди
+
+
+@dataclass
+class ArchiveConfig:
+    """Конфигурация переноса закрытых тикетов в архивные таблицы"""
+    enabled: bool  # Переносить старые закрытые тикеты в архив
+    after_days: int  # Через сколько дней после закрытия тикет переносится в архив
+    batch_size: int  # Сколько тикетов переносится за одну транзакцию
+    interval: float  # Интервал запуска переноса (сек)
+    compress: bool  # Хранить переписку архивного тикета одним сжатым блоком вместо строк messages_archive
+
+
+@dataclass
+class PartitionConfig:
+    """Конфигурация помесячного секционирования таблицы messages (MySQL)"""
+    enabled: bool  # Секционировать messages при миграции
+    months_ahead: int  # Сколько будущих месяцев создавать заранее
+    retention_months: int  # Сколько месяцев хранить сообщения (0 - не удалять секции)
+    interval: float  # Интервал обслуживания секций (сек)
+
+
+@dataclass
+class RetentionConfig:
+    """Конфигурация удаления устаревших сообщений"""
+    enabled: bool  # Удалять сообщения старше срока хранения
+    policies: Dict[str, int]  # Тип сообщения -> срок хранения в днях (например, system=90)
+    batch_size: int  # Ширина диапазона id, обрабатываемого одним DELETE
+    target_latency: float  # Желаемая длительность одного DELETE (сек); при превышении диапазон сужается
+    max_load: float  # Доля времени, которую очистка может занимать БД (0..1)
+    interval: float  # Интервал запуска очистки (сек)
+
+
+@dataclass
+class MetricsConfig:
+    """Конфигурация метрик в формате Prometheus"""
+    enabled: bool  # Собирать метрики и отдавать их по HTTP (/metrics)
+    host: str  # Адрес HTTP-сервера метрик
+    port: int  # Порт HTTP-сервера метрик
+    db_interval: float  # Как часто обновлять метрики, которые требуют запроса к БД (сек)
+
+
+@dataclass
+class QueryBudgetConfig:
+    """Конфигурация бюджета запросов к БД на один апдейт"""
+    enabled: bool  # Считать запросы каждого апдейта и писать сводку при превышении бюджета
+    max_queries: int  # Максимальное количество запросов на апдейт
+    max_time: float  # Максимальное суммарное время запросов на апдейт (сек)
+    repeat_threshold: int  # Сколько выполнений одного запроса за апдейт считается повтором (N+1)
+
+
+@dataclass
+class SlowQueryConfig:
+    """Конфигурация журнала медленных запросов к БД"""
+    enabled: bool  # Собирать статистику запросов по отпечаткам
+    threshold: float  # С какой длительности (сек) запрос считается медленным
+    dump_interval: float  # Интервал записи отчета в лог (сек); 0 - не записывать
+    max_fingerprints: int  # Максимальное количество отпечатков в памяти
 
 
 @dataclass
@@ -45,6 +160,19 @@ class Config:
     tg_bot: TgBot
     db: DbConfig
     localization: Localization
+    fsm: FsmConfig
+    redis: RedisConfig
+    throttling: ThrottlingConfig
+    overload: OverloadConfig
+    assignment: AssignmentConfig
+    presence: PresenceConfig
+    queue: QueueConfig
+    archive: ArchiveConfig
+    partitions: PartitionConfig
+    retention: RetentionConfig
+    metrics: MetricsConfig
+    query_budget: QueryBudgetConfig
+    slow_queries: SlowQueryConfig
 
 
 def load_config(path: Optional[str] = None) -> Config:
@@ -76,5 +204,81 @@ def load_config(path: Optional[str] = None) -> Config:
             default_language=env.str('DEFAULT_LANGUAGE', 'ru'),
             languages=env.list('LANGUAGES', ['ru', 'en', 'uk']),
             locales_dir=Path(__file__).parent / 'locales',
+            reload_interval=env.float('LOCALES_RELOAD_INTERVAL', 5.0),
+        ),
+        fsm=FsmConfig(
+            idle_ttl=env.int('FSM_IDLE_TTL', 7 * 24 * 3600),
+            max_entries=env.int('FSM_MAX_ENTRIES', 100000),
+        ),
+        redis=RedisConfig(
+            url=env.str('REDIS_URL', None) or None,
+            fsm_shared=env.bool('REDIS_FSM_SHARED', True),
+            cache_ttl=env.int('CACHE_TTL', 300),
+        ),
+        throttling=ThrottlingConfig(
+            rate=env.float('THROTTLE_RATE', 2.0),
+            burst=env.float('THROTTLE_BURST', 5.0),
+            notify_interval=env.float('THROTTLE_NOTIFY_INTERVAL', 10.0),
+            shared=env.bool('THROTTLE_SHARED', True),
+            redis_timeout=env.float('THROTTLE_REDIS_TIMEOUT', 0.05),
+        ),
+        overload=OverloadConfig(
+            lag_threshold=env.float('OVERLOAD_LAG_THRESHOLD', 0.2),
+            pool_threshold=env.float('OVERLOAD_POOL_THRESHOLD', 0.9),
+            inflight_threshold=env.int('OVERLOAD_INFLIGHT_THRESHOLD', 100),
+            sample_interval=env.float('OVERLOAD_SAMPLE_INTERVAL', 0.5),
+            recover_after=env.float('OVERLOAD_RECOVER_AFTER', 5.0),
+        ),
+        assignment=AssignmentConfig(
+            enabled=env.bool('ASSIGNMENT_ENABLED', False),
+            policy=env.str('ASSIGNMENT_POLICY', 'least_loaded'),
+            interval=env.float('ASSIGNMENT_INTERVAL', 5.0),
+            idle_timeout=env.float('ASSIGNMENT_IDLE_TIMEOUT', 900.0),
+        ),
+        presence=PresenceConfig(
+            online_after=env.float('PRESENCE_ONLINE_AFTER', 300.0),
+            idle_after=env.float('PRESENCE_IDLE_AFTER', 1800.0),
+        ),
+        queue=QueueConfig(
+            priority_step_minutes=env.float('QUEUE_PRIORITY_STEP_MINUTES', 30.0),
+        ),
+        archive=ArchiveConfig(
+            enabled=env.bool('ARCHIVE_ENABLED', True),
+            after_days=env.int('ARCHIVE_AFTER_DAYS', 90),
+            batch_size=env.int('ARCHIVE_BATCH_SIZE', 200),
+            interval=env.float('ARCHIVE_INTERVAL', 3600.0),
+            compress=env.bool('ARCHIVE_COMPRESS', False),
+        ),
+        partitions=PartitionConfig(
+            enabled=env.bool('MESSAGES_PARTITIONING', False),
+            months_ahead=env.int('PARTITION_MONTHS_AHEAD', 3),
+            retention_months=env.int('PARTITION_RETENTION_MONTHS', 12),
+            interval=env.float('PARTITION_INTERVAL', 86400.0),
+        ),
+        retention=RetentionConfig(
+            enabled=env.bool('RETENTION_ENABLED', False),
+            policies=env.dict('RETENTION_POLICIES', {}, subcast_values=int),
+            batch_size=env.int('RETENTION_BATCH_SIZE', 5000),
+            target_latency=env.float('RETENTION_TARGET_LATENCY', 0.1),
+            max_load=env.float('RETENTION_MAX_LOAD', 0.2),
+            interval=env.float('RETENTION_INTERVAL', 3600.0),
+        ),
+        metrics=MetricsConfig(
+            enabled=env.bool('METRICS_ENABLED', False),
+            host=env.str('METRICS_HOST', '127.0.0.1'),
+            port=env.int('METRICS_PORT', 9101),
+            db_interval=env.float('METRICS_DB_INTERVAL', 15.0),
+        ),
+        query_budget=QueryBudgetConfig(
+            enabled=env.bool('QUERY_BUDGET_ENABLED', True),
+            max_queries=env.int('QUERY_BUDGET_MAX_QUERIES', 20),
+            max_time=env.float('QUERY_BUDGET_MAX_TIME', 0.5),
+            repeat_threshold=env.int('QUERY_REPEAT_THRESHOLD', 5),
+        ),
+        slow_queries=SlowQueryConfig(
+            enabled=env.bool('SLOW_QUERY_ENABLED', True),
+            threshold=env.float('SLOW_QUERY_THRESHOLD', 0.1),
+            dump_interval=env.float('SLOW_QUERY_DUMP_INTERVAL', 3600),
+            max_fingerprints=env.int('SLOW_QUERY_MAX_FINGERPRINTS', 1000),
         ),
     )
\ No newline at end of file
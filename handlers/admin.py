@@ -1,3 +1,4 @@
+import html
 import logging
 from typing import Union, Dict, List, Any, Optional
 from datetime import datetime, timedelta
@@ -10,8 +11,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, desc, update
 from sqlalchemy.orm import selectinload
 
-from models import User, Ticket, Message as TicketMessage, TicketStatus, MessageType, UserRole
-from utils.i18n import _
+from models import User, Ticket, Message as TicketMessage, TicketStatus, MessageType, UserRole, ArchivedTicket
+from utils.archive import closed_tickets, find_ticket
+from utils.cache import get_cache, get_cached_user, get_moderator_roster
+from utils.presence import get_presence
+from utils.search import search_tickets, find_users, get_user_tickets
+from utils.slow_queries import get_slow_query_log
+from utils.tickets import set_ticket_priority, PRIORITY_LABELS, PRIORITY_ICONS, MAX_MODERATOR_CAPACITY
+from utils.i18n import _, get_i18n
 from utils.keyboards import KeyboardFactory
 from utils.states import AdminStates, ModeratorStates, UserStates
 
@@ -67,10 +74,12 @@ async def _process_admin_stats(callback_query: CallbackQuery, session: AsyncSess
     moderators_count = users_counts.get(UserRole.MODERATOR, 0)
     admins_count = users_counts.get(UserRole.ADMIN, 0)
 
-    # Получаем общее количество тикетов
+    # Получаем общее количество тикетов (вместе с архивом)
     total_tickets_query = select(func.count(Ticket.id))
     total_tickets_result = await session.execute(total_tickets_query)
-    total_tickets = total_tickets_result.scalar() or 0
+    archived_tickets_query = select(func.count(ArchivedTicket.id))
+    archived_tickets_result = await session.execute(archived_tickets_query)
+    total_tickets = (total_tickets_result.scalar() or 0) + (archived_tickets_result.scalar() or 0)
 
     # Получаем количество открытых тикетов
     open_tickets_query = select(func.count(Ticket.id)).where(Ticket.status == TicketStatus.OPEN)
@@ -87,15 +96,12 @@ async def _process_admin_stats(callback_query: CallbackQuery, session: AsyncSess
     resolved_tickets_result = await session.execute(resolved_tickets_query)
     resolved_tickets = resolved_tickets_result.scalar() or 0
 
-    # Получаем количество закрытых тикетов
-    closed_tickets_query = select(func.count(Ticket.id)).where(Ticket.status == TicketStatus.CLOSED)
+    # Получаем количество закрытых тикетов и среднюю оценку (вместе с архивом)
+    closed = closed_tickets()
+    closed_tickets_query = select(func.count(closed.c.id), func.avg(closed.c.rating))
     closed_tickets_result = await session.execute(closed_tickets_query)
-    closed_tickets = closed_tickets_result.scalar() or 0
-
-    # Получаем среднюю оценку закрытых тикетов
-    avg_rating_query = select(func.avg(Ticket.rating)).where(Ticket.status == TicketStatus.CLOSED)
-    avg_rating_result = await session.execute(avg_rating_query)
-    avg_rating = avg_rating_result.scalar()
+    closed_tickets_count, avg_rating = closed_tickets_result.one()
+    closed_tickets_count = closed_tickets_count or 0
 
     # Правильное форматирование средней оценки
     if avg_rating is not None:
@@ -112,12 +118,12 @@ async def _process_admin_stats(callback_query: CallbackQuery, session: AsyncSess
     # Получаем статистику по модераторам
     moderators_query = select(
         User,
-        func.count(Ticket.id).label("closed_count"),
-        func.avg(Ticket.rating).label("avg_rating")
+        func.count(closed.c.id).label("closed_count"),
+        func.avg(closed.c.rating).label("avg_rating")
     ).where(
         User.role == UserRole.MODERATOR
     ).outerjoin(
-        Ticket, (Ticket.moderator_id == User.id) & (Ticket.status == TicketStatus.CLOSED)
+        closed, closed.c.moderator_id == User.id
     ).group_by(
         User.id
     ).order_by(
@@ -140,7 +146,7 @@ async def _process_admin_stats(callback_query: CallbackQuery, session: AsyncSess
         f"🆕 Открытых: {open_tickets}\n"
         f"🔄 В работе: {in_progress_tickets}\n"
         f"✅ Решенных (ожидают оценки): {resolved_tickets}\n"
-        f"🔒 Закрытых: {closed_tickets}\n"
+        f"🔒 Закрытых: {closed_tickets_count}\n"
         f"📅 Новых за последние 7 дней: {recent_tickets_count}\n"
         f"⭐ Средняя оценка: {avg_rating_text}\n\n"
     )
@@ -206,9 +212,7 @@ async def _process_manage_moderators(callback_query: CallbackQuery, session: Asy
         return
 
     # Получаем список модераторов
-    moderators_query = select(User).where(User.role == UserRole.MODERATOR)
-    moderators_result = await session.execute(moderators_query)
-    moderators = moderators_result.scalars().all()
+    moderators = await get_moderator_roster(session)
 
     # Формируем сообщение со списком модераторов
     message_text = "👨‍💼 <b>Управление модераторами</b>\n\n"
@@ -218,7 +222,7 @@ async def _process_manage_moderators(callback_query: CallbackQuery, session: Asy
     else:
         message_text += "<b>Текущие модераторы:</b>\n\n"
         for i, mod in enumerate(moderators, 1):
-            message_text += f"{i}. {mod.full_name} (ID: {mod.telegram_id})\n"
+            message_text += f"{i}. {mod['full_name']} (ID: {mod['telegram_id']})\n"
 
     # Создаем клавиатуру с действиями
     kb_items = [
@@ -437,6 +441,11 @@ async def _process_confirm_add_moderator(callback_query: CallbackQuery, bot: Bot
     user.role = UserRole.MODERATOR
     await session.commit()
 
+    cache = get_cache()
+    await cache.invalidate_user(user.telegram_id)
+    await cache.invalidate_moderators()
+    get_presence().upsert(user)
+
     await callback_query.message.edit_text(
         f"✅ Пользователь {user.full_name} (ID: {user.telegram_id}) "
         f"успешно назначен модератором.",
@@ -496,9 +505,7 @@ async def _process_remove_moderator_start(callback_query: CallbackQuery, session
         return
 
     # Получаем список модераторов
-    moderators_query = select(User).where(User.role == UserRole.MODERATOR)
-    moderators_result = await session.execute(moderators_query)
-    moderators = moderators_result.scalars().all()
+    moderators = await get_moderator_roster(session)
 
     if not moderators:
         await callback_query.message.edit_text(
@@ -516,8 +523,8 @@ async def _process_remove_moderator_start(callback_query: CallbackQuery, session
     mod_items = []
     for mod in moderators:
         mod_items.append({
-            "id": f"confirm_remove_mod:{mod.telegram_id}",
-            "text": f"{mod.full_name} (ID: {mod.telegram_id})"
+            "id": f"confirm_remove_mod:{mod['telegram_id']}",
+            "text": f"{mod['full_name']} (ID: {mod['telegram_id']})"
         })
 
     # Добавляем кнопку "Назад"
@@ -617,6 +624,11 @@ async def _process_confirm_remove_moderator(callback_query: CallbackQuery, sessi
     moderator.role = UserRole.USER
     await session.commit()
 
+    cache = get_cache()
+    await cache.invalidate_user(moderator.telegram_id)
+    await cache.invalidate_moderators()
+    get_presence().discard(moderator.telegram_id)
+
     await callback_query.message.edit_text(
         f"✅ Модератор {moderator.full_name} (ID: {moderator.telegram_id}) "
         f"успешно удален из списка модераторов.",
@@ -731,10 +743,16 @@ async def _process_force_remove_moderator(callback_query: CallbackQuery, bot: Bo
         except Exception as e:
             logger.error(f"Failed to send notification to user {ticket.user.telegram_id}: {e}")
 
-    # Разжалуем модератора до обычного пользователя
+    # Разжалуем модератора до обычного пользователя; его тикеты вернулись в очередь
     moderator.role = UserRole.USER
+    moderator.active_tickets = 0
     await session.commit()
 
+    cache = get_cache()
+    await cache.invalidate_user(moderator.telegram_id)
+    await cache.invalidate_moderators()
+    get_presence().discard(moderator.telegram_id)
+
     await callback_query.message.edit_text(
         f"✅ Модератор {moderator.full_name} (ID: {moderator.telegram_id}) "
         f"успешно удален из списка модераторов.\n\n"
@@ -782,16 +800,10 @@ async def _process_back_to_menu(callback_query: CallbackQuery, session: AsyncSes
     """
     user_id = callback_query.from_user.id
 
-    # Получаем пользователя из БД
-    query = select(User).where(User.telegram_id == user_id)
-    result = await session.execute(query)
-    admin = result.scalar_one_or_none()
-
-    language = admin.language if admin else "ru"
-
+    # Язык пользователя уже установлен I18nMiddleware для текущего апдейта
     await callback_query.message.edit_text(
-        _("admin_main_menu", language),
-        reply_markup=KeyboardFactory.main_menu(UserRole.ADMIN, language)
+        _("admin_main_menu"),
+        reply_markup=KeyboardFactory.main_menu(UserRole.ADMIN)
     )
 
     await state.set_state(AdminStates.MAIN_MENU)
@@ -840,16 +852,10 @@ async def _process_switch_to_mod_menu(callback_query: CallbackQuery, session: As
     """
     user_id = callback_query.from_user.id
 
-    # Получаем пользователя из БД
-    query = select(User).where(User.telegram_id == user_id)
-    result = await session.execute(query)
-    admin = result.scalar_one_or_none()
-
-    language = admin.language if admin else "ru"
-
+    # Язык пользователя уже установлен I18nMiddleware для текущего апдейта
     await callback_query.message.edit_text(
-        _("moderator_main_menu", language),
-        reply_markup=KeyboardFactory.main_menu(UserRole.MODERATOR, language)
+        _("moderator_main_menu"),
+        reply_markup=KeyboardFactory.main_menu(UserRole.MODERATOR)
     )
 
     await state.set_state(ModeratorStates.MAIN_MENU)
@@ -881,16 +887,10 @@ async def _process_switch_to_user_menu(callback_query: CallbackQuery, session: A
     """
     user_id = callback_query.from_user.id
 
-    # Получаем пользователя из БД
-    query = select(User).where(User.telegram_id == user_id)
-    result = await session.execute(query)
-    admin = result.scalar_one_or_none()
-
-    language = admin.language if admin else "ru"
-
+    # Язык пользователя уже установлен I18nMiddleware для текущего апдейта
     await callback_query.message.edit_text(
-        _("user_main_menu", language),
-        reply_markup=KeyboardFactory.main_menu(UserRole.USER, language)
+        _("user_main_menu"),
+        reply_markup=KeyboardFactory.main_menu(UserRole.USER)
     )
 
     await state.set_state(UserStates.MAIN_MENU)
@@ -1109,24 +1109,17 @@ async def _process_ticket_search(message: Message, bot: Bot, session: AsyncSessi
         await message.answer(_("error_access_denied", admin.language if admin else None))
         return
 
-    # Проверяем, что введенный текст - число
+    # Число - ID тикета, иначе ищем по словам в темах и сообщениях
     try:
         ticket_id = int(message.text.strip())
     except ValueError:
-        await message.answer(
-            "❌ Некорректный ввод. Пожалуйста, введите числовой ID тикета.",
-            reply_markup=KeyboardFactory.back_button("admin:back_to_menu", admin.language)
-        )
+        query = message.text.strip()
+        await state.update_data(search_query=query, search_after=None)
+        await _send_search_page(message, session, admin.language, query, None, state)
         return
 
-    # Получаем тикет из БД
-    ticket_query = select(Ticket).where(Ticket.id == ticket_id).options(
-        selectinload(Ticket.user),
-        selectinload(Ticket.moderator),
-        selectinload(Ticket.messages)
-    )
-    ticket_result = await session.execute(ticket_query)
-    ticket = ticket_result.scalar_one_or_none()
+    # Получаем тикет из БД (старые закрытые тикеты - из архива)
+    ticket = await find_ticket(session, ticket_id)
 
     if not ticket:
         await message.answer(
@@ -1144,11 +1137,12 @@ async def _process_ticket_search(message: Message, bot: Bot, session: AsyncSessi
     }
 
     message_text = (
-        f"🔍 <b>Тикет #{ticket.id}</b>\n\n"
+        f"🔍 <b>Тикет #{ticket.id}</b>{' 🗄 (в архиве)' if ticket.is_archived else ''}\n\n"
         f"<b>Статус:</b> {status_texts.get(ticket.status, 'Неизвестный статус')}\n"
         f"<b>Создан:</b> {ticket.created_at.strftime('%d.%m.%Y %H:%M')}\n"
         f"<b>Обновлен:</b> {ticket.updated_at.strftime('%d.%m.%Y %H:%M')}\n"
-        f"<b>Тема:</b> {ticket.subject or 'Не указана'}\n\n"
+        f"<b>Тема:</b> {ticket.subject or 'Не указана'}\n"
+        f"<b>Приоритет:</b> {PRIORITY_LABELS.get(ticket.priority or 0)}\n\n"
         f"<b>Пользователь:</b> {ticket.user.full_name} (ID: {ticket.user.telegram_id})\n"
     )
 
@@ -1223,6 +1217,13 @@ async def _process_ticket_search(message: Message, bot: Bot, session: AsyncSessi
             text="👑 Взять тикет себе",
             callback_data=f"admin:take_ticket:{ticket.id}"
         ))
+        # Приоритет меняет положение тикета в очереди неназначенных
+        for priority, label in PRIORITY_LABELS.items():
+            if priority != (ticket.priority or 0):
+                admin_actions.append(InlineKeyboardButton(
+                    text=f"{PRIORITY_ICONS[priority]} Приоритет: {label}",
+                    callback_data=f"admin:ticket_priority:{ticket.id}:{priority}"
+                ))
     elif ticket.status == TicketStatus.IN_PROGRESS:
         admin_actions.append(InlineKeyboardButton(
             text="🔄 Переназначить тикет",
@@ -1255,6 +1256,416 @@ async def _process_ticket_search(message: Message, bot: Bot, session: AsyncSessi
     logger.info(f"Admin {user_id} viewed ticket #{ticket.id} details")
 
 
+# Количество тикетов на странице результатов поиска
+SEARCH_PAGE_SIZE = 10
+
+
+async def _send_search_page(message: Message, session: AsyncSession, language: str,
+                            query: str, after: Optional[List], state: FSMContext):
+    """
+    Отправляет страницу результатов поиска тикетов по словам и сохраняет
+    ключ следующей страницы в состоянии.
+    """
+    hits = await search_tickets(
+        session, query, limit=SEARCH_PAGE_SIZE, after=tuple(after) if after else None
+    )
+
+    if not hits:
+        await message.answer(
+            "❌ По запросу ничего не найдено." if after is None else "Больше результатов нет.",
+            reply_markup=KeyboardFactory.back_button("admin:back_to_menu", language)
+        )
+        return
+
+    # Тикеты ищутся и в живой таблице, и в архиве
+    ticket_ids = [ticket_id for ticket_id, _score in hits]
+    tickets = {}
+    for model in (Ticket, ArchivedTicket):
+        tickets_query = select(model).where(model.id.in_(ticket_ids)).options(selectinload(model.user))
+        tickets.update({ticket.id: ticket for ticket in (await session.execute(tickets_query)).scalars().all()})
+
+    text = f"🔍 <b>Результаты поиска:</b> {html.escape(query)}\n\n"
+    for ticket_id, _score in hits:
+        ticket = tickets.get(ticket_id)
+        if not ticket:
+            continue
+        text += (
+            f"#{ticket.id}{' 🗄' if ticket.is_archived else ''} - {html.escape(ticket.subject or 'Без темы')}\n"
+            f"<i>{html.escape(ticket.user.full_name)}, {ticket.created_at.strftime('%d.%m.%Y')}, "
+            f"{_('status_' + ticket.status.value, language)}</i>\n\n"
+        )
+    text += "Отправьте ID тикета, чтобы открыть его, или новый запрос."
+
+    buttons = []
+    if len(hits) == SEARCH_PAGE_SIZE:
+        # Ключ последнего результата - следующая страница начинается после него
+        last_id, last_score = hits[-1]
+        await state.update_data(search_after=[last_score, last_id])
+        buttons.append([InlineKeyboardButton(text="Далее ▶️", callback_data="admin:search_more")])
+    else:
+        await state.update_data(search_after=None)
+    buttons.append([InlineKeyboardButton(text=_("action_back", language), callback_data="admin:back_to_menu")])
+
+    await message.answer(text, reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
+
+
+@router.callback_query(AdminStates.SEARCHING_TICKET, F.data == "admin:search_more")
+async def search_more_wrapper(callback_query: CallbackQuery, state: FSMContext, **kwargs):
+    """
+    Обертка для обработчика следующей страницы результатов поиска
+    """
+    session = kwargs.get("session")
+    if not session:
+        logger.error("Сессия не передана в обработчик search_more!")
+        await callback_query.answer()
+        return
+
+    return await _process_search_more(callback_query, session, state)
+
+
+async def _process_search_more(callback_query: CallbackQuery, session: AsyncSession, state: FSMContext):
+    """
+    Реализация обработчика следующей страницы результатов поиска
+    """
+    # Роль берем из кэша пользователей
+    admin = await get_cached_user(session, callback_query.from_user.id)
+
+    if not admin or admin["role"] != UserRole.ADMIN.value:
+        await callback_query.answer(_("error_access_denied"))
+        return
+
+    data = await state.get_data()
+    if not data.get("search_query") or not data.get("search_after"):
+        await callback_query.answer("Больше результатов нет.")
+        return
+
+    await callback_query.answer()
+    await _send_search_page(
+        callback_query.message, session, admin["language"],
+        data["search_query"], data["search_after"], state
+    )
+
+
+@router.callback_query(F.data.startswith("admin:ticket_priority:"))
+async def ticket_priority_wrapper(callback_query: CallbackQuery, state: FSMContext, **kwargs):
+    """
+    Обертка для обработчика изменения приоритета тикета
+    """
+    session = kwargs.get("session")
+    if not session:
+        logger.error("Сессия не передана в обработчик ticket_priority!")
+        await callback_query.answer()
+        return
+
+    return await _process_ticket_priority(callback_query, session, state)
+
+
+async def _process_ticket_priority(callback_query: CallbackQuery, session: AsyncSession, state: FSMContext):
+    """
+    Реализация обработчика изменения приоритета тикета
+    """
+    user_id = callback_query.from_user.id
+    _prefix, _action, ticket_id, priority = callback_query.data.split(":")
+    ticket_id, priority = int(ticket_id), int(priority)
+
+    # Роль берем из кэша пользователей
+    admin = await get_cached_user(session, user_id)
+
+    if not admin or admin["role"] != UserRole.ADMIN.value:
+        await callback_query.answer(_("error_access_denied"))
+        return
+
+    ticket = await set_ticket_priority(session, ticket_id, priority)
+    if not ticket:
+        await callback_query.answer(_("error_ticket_not_found", ticket_id=ticket_id), show_alert=True)
+        return
+
+    await session.commit()
+
+    await callback_query.answer(
+        f"{PRIORITY_ICONS[priority]} Приоритет тикета #{ticket_id}: {PRIORITY_LABELS[priority]}",
+        show_alert=True
+    )
+
+    logger.info(f"Admin {user_id} set priority {priority} for ticket #{ticket_id}")
+
+
+@router.message(Command("i18n_report"))
+async def i18n_report_wrapper(message: Message, state: FSMContext, **kwargs):
+    """
+    Обертка для обработчика команды отчета о полноте переводов
+    """
+    session = kwargs.get("session")
+    if not session:
+        logger.error("Сессия не передана в обработчик i18n_report!")
+        await message.answer("Произошла ошибка при подключении к базе данных. Пожалуйста, попробуйте позже.")
+        return
+
+    return await _process_i18n_report(message, session, state)
+
+
+async def _process_i18n_report(message: Message, session: AsyncSession, state: FSMContext):
+    """
+    Реализация обработчика команды отчета о полноте переводов
+    """
+    user_id = message.from_user.id
+
+    # Роль берем из кэша пользователей
+    user = await get_cached_user(session, user_id)
+
+    if not user or user["role"] != UserRole.ADMIN.value:
+        await message.answer(_("error_access_denied"))
+        return
+
+    report = get_i18n().format_coverage_report()
+
+    # Ограничение Telegram на длину сообщения - 4096 символов
+    if len(report) > 3800:
+        report = report[:3800] + "\n..."
+
+    await message.answer(
+        f"🌐 <b>Полнота переводов</b>\n\n<pre>{html.escape(report)}</pre>"
+    )
+
+    logger.info(f"Admin {user_id} viewed i18n coverage report")
+
+
+@router.message(Command("slow_queries"))
+async def slow_queries_wrapper(message: Message, state: FSMContext, **kwargs):
+    """
+    Обертка для обработчика команды отчета о медленных запросах к БД
+    """
+    session = kwargs.get("session")
+    if not session:
+        logger.error("Сессия не передана в обработчик slow_queries!")
+        await message.answer("Произошла ошибка при подключении к базе данных. Пожалуйста, попробуйте позже.")
+        return
+
+    return await _process_slow_queries(message, session, state)
+
+
+async def _process_slow_queries(message: Message, session: AsyncSession, state: FSMContext):
+    """
+    Реализация обработчика команды /slow_queries [reset]
+    """
+    user_id = message.from_user.id
+
+    # Роль берем из кэша пользователей
+    user = await get_cached_user(session, user_id)
+
+    if not user or user["role"] != UserRole.ADMIN.value:
+        await message.answer(_("error_access_denied"))
+        return
+
+    slow_query_log = get_slow_query_log()
+    if slow_query_log is None:
+        await message.answer("Журнал медленных запросов отключен (SLOW_QUERY_ENABLED).")
+        return
+
+    args = (message.text or "").split()[1:]
+    if args and args[0].lower() == "reset":
+        slow_query_log.reset()
+        await message.answer("Статистика медленных запросов сброшена.")
+        logger.info(f"Admin {user_id} reset slow query log")
+        return
+
+    report = slow_query_log.format_report()
+
+    # Ограничение Telegram на длину сообщения - 4096 символов
+    if len(report) > 3800:
+        report = report[:3800] + "\n..."
+
+    await message.answer(
+        f"🐢 <b>Медленные запросы</b>\n\n<pre>{html.escape(report)}</pre>"
+    )
+
+    logger.info(f"Admin {user_id} viewed slow query report")
+
+
+@router.message(Command("set_capacity"))
+async def set_capacity_wrapper(message: Message, state: FSMContext, **kwargs):
+    """
+    Обертка для обработчика команды изменения лимита тикетов модератора
+    """
+    session = kwargs.get("session")
+    if not session:
+        logger.error("Сессия не передана в обработчик set_capacity!")
+        await message.answer("Произошла ошибка при подключении к базе данных. Пожалуйста, попробуйте позже.")
+        return
+
+    return await _process_set_capacity(message, session, state)
+
+
+async def _process_set_capacity(message: Message, session: AsyncSession, state: FSMContext):
+    """
+    Реализация обработчика команды /set_capacity <telegram_id> <количество>
+    """
+    user_id = message.from_user.id
+
+    # Роль берем из кэша пользователей
+    admin = await get_cached_user(session, user_id)
+
+    if not admin or admin["role"] != UserRole.ADMIN.value:
+        await message.answer(_("error_access_denied"))
+        return
+
+    args = (message.text or "").split()[1:]
+    try:
+        moderator_telegram_id, capacity = int(args[0]), int(args[1])
+    except (IndexError, ValueError):
+        await message.answer(
+            "Использование: /set_capacity <code>telegram_id</code> <code>количество</code>\n\n"
+            f"Количество - от 1 до {MAX_MODERATOR_CAPACITY} тикетов в работе одновременно."
+        )
+        return
+
+    if not 1 <= capacity <= MAX_MODERATOR_CAPACITY:
+        await message.answer(f"❌ Количество тикетов должно быть от 1 до {MAX_MODERATOR_CAPACITY}.")
+        return
+
+    query = select(User).where(User.telegram_id == moderator_telegram_id)
+    result = await session.execute(query)
+    moderator = result.scalar_one_or_none()
+
+    if not moderator or moderator.role != UserRole.MODERATOR:
+        await message.answer(f"Модератор с ID {moderator_telegram_id} не найден.")
+        return
+
+    # Уменьшение лимита не снимает уже принятые тикеты: новые не назначаются, пока их больше лимита
+    moderator.max_active_tickets = capacity
+    await session.commit()
+    get_presence().upsert(moderator)
+
+    await message.answer(
+        f"✅ Модератор {moderator.full_name} теперь может вести до {capacity} тикетов одновременно "
+        f"(сейчас в работе: {moderator.active_tickets})."
+    )
+
+    logger.info(f"Admin {user_id} set capacity {capacity} for moderator {moderator_telegram_id}")
+
+
+async def _send_user_tickets(message: Message, session: AsyncSession, user: User, language: str):
+    """
+    Отправляет список тикетов пользователя, сначала новые.
+    """
+    tickets = await get_user_tickets(session, user.id, limit=20)
+
+    username = f" @{html.escape(user.username)}" if user.username else ""
+    text = (
+        f"👤 <b>{html.escape(user.full_name)}</b>{username}\n"
+        f"ID: <code>{user.telegram_id}</code>, роль: {user.role.value}\n\n"
+    )
+
+    if not tickets:
+        text += "У пользователя нет тикетов."
+    else:
+        text += f"<b>Тикеты (последние {len(tickets)}):</b>\n\n"
+        for ticket in tickets:
+            text += (
+                f"#{ticket.id}{' 🗄' if ticket.is_archived else ''} - {html.escape(ticket.subject or 'Без темы')}\n"
+                f"<i>{ticket.created_at.strftime('%d.%m.%Y %H:%M')}, "
+                f"{_('status_' + ticket.status.value, language)}</i>\n\n"
+            )
+        text += "Подробности тикета - в меню \"Поиск тикета\" по его ID."
+
+    await message.answer(text)
+
+
+@router.message(Command("user_tickets"))
+async def user_tickets_wrapper(message: Message, state: FSMContext, **kwargs):
+    """
+    Обертка для обработчика команды поиска тикетов пользователя
+    """
+    session = kwargs.get("session")
+    if not session:
+        logger.error("Сессия не передана в обработчик user_tickets!")
+        await message.answer("Произошла ошибка при подключении к базе данных. Пожалуйста, попробуйте позже.")
+        return
+
+    return await _process_user_tickets(message, session, state)
+
+
+async def _process_user_tickets(message: Message, session: AsyncSession, state: FSMContext):
+    """
+    Реализация обработчика команды /user_tickets <telegram_id | @username | имя>
+    """
+    user_id = message.from_user.id
+
+    # Роль берем из кэша пользователей
+    admin = await get_cached_user(session, user_id)
+
+    if not admin or admin["role"] != UserRole.ADMIN.value:
+        await message.answer(_("error_access_denied"))
+        return
+
+    query = (message.text or "").partition(" ")[2].strip()
+    if not query:
+        await message.answer(
+            "Использование: /user_tickets <code>telegram_id</code> | <code>@username</code> | <code>имя</code>\n\n"
+            "По username и имени ищется начало, без учета регистра."
+        )
+        return
+
+    users = await find_users(session, query)
+
+    if not users:
+        await message.answer(f"Пользователь по запросу {html.escape(query)} не найден.")
+        return
+
+    if len(users) == 1:
+        await _send_user_tickets(message, session, users[0], admin["language"])
+        return
+
+    # Несколько совпадений - предлагаем выбрать пользователя
+    buttons = [
+        [InlineKeyboardButton(
+            text=f"{user.full_name}" + (f" @{user.username}" if user.username else "") + f" ({user.telegram_id})",
+            callback_data=f"admin:user_tickets:{user.id}"
+        )]
+        for user in users
+    ]
+    await message.answer(
+        f"Найдено пользователей: {len(users)}. Выберите пользователя:",
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons)
+    )
+
+    logger.info(f"Admin {user_id} looked up user tickets: {query}")
+
+
+@router.callback_query(F.data.startswith("admin:user_tickets:"))
+async def user_tickets_select_wrapper(callback_query: CallbackQuery, state: FSMContext, **kwargs):
+    """
+    Обертка для обработчика выбора пользователя в поиске тикетов пользователя
+    """
+    session = kwargs.get("session")
+    if not session:
+        logger.error("Сессия не передана в обработчик user_tickets_select!")
+        await callback_query.answer()
+        return
+
+    return await _process_user_tickets_select(callback_query, session, state)
+
+
+async def _process_user_tickets_select(callback_query: CallbackQuery, session: AsyncSession, state: FSMContext):
+    """
+    Реализация обработчика выбора пользователя в поиске тикетов пользователя
+    """
+    # Роль берем из кэша пользователей
+    admin = await get_cached_user(session, callback_query.from_user.id)
+
+    if not admin or admin["role"] != UserRole.ADMIN.value:
+        await callback_query.answer(_("error_access_denied"))
+        return
+
+    user = await session.get(User, int(callback_query.data.split(":")[2]))
+    if not user:
+        await callback_query.answer("Пользователь не найден.", show_alert=True)
+        return
+
+    await callback_query.answer()
+    await _send_user_tickets(callback_query.message, session, user, admin["language"])
+
+
 def register_handlers(dp: Dispatcher):
     """
     Регистрирует все обработчики данного модуля.
@@ -19,6 +19,45 @@ logger = logging.getLogger(__name__)
 # Создание роутера
 router = Router()
 
+# Приветствие нового пользователя (на всех языках, так как язык еще не выбран)
+WELCOME_TEXT = (
+    "👋 Добро пожаловать в систему поддержки!\n\n"
+    "Пожалуйста, выберите язык интерфейса:\n\n"
+    "Welcome to the support system!\n"
+    "Please select your language:\n\n"
+    "Ласкаво просимо до системи підтримки!\n"
+    "Будь ласка, виберіть мову інтерфейсу:"
+)
+
+# Текст справки /help
+HELP_TEXT = (
+    "🤝 <b>Помощь по использованию бота поддержки</b>\n\n"
+    "<b>Основные команды:</b>\n"
+    "/start - Начать работу с ботом\n"
+    "/help - Показать эту справку\n"
+    "/menu - Показать главное меню\n\n"
+
+    "<b>Для пользователей:</b>\n"
+    "- Создайте тикет, описав вашу проблему\n"
+    "- Дождитесь, пока модератор примет ваш тикет\n"
+    "- Общайтесь с модератором через бота\n"
+    "- После решения проблемы оцените работу модератора\n\n"
+
+    "<b>Для модераторов:</b>\n"
+    "- Принимайте тикеты в работу\n"
+    "- Общайтесь с пользователем через бота\n"
+    "- Если вы ведете несколько тикетов, переключайтесь между ними кнопкой \"Активный тикет\"\n"
+    "- Отметьте тикет как решенный, когда проблема будет устранена\n\n"
+
+    "<b>Для администраторов:</b>\n"
+    "- Назначайте новых модераторов\n"
+    "- Просматривайте статистику работы бота\n"
+    "- /set_capacity ID N - сколько тикетов модератор может вести одновременно\n"
+    "- /user_tickets ID | @username | имя - тикеты пользователя\n"
+    "- /i18n_report - полнота переводов\n"
+    "- /slow_queries [reset] - медленные запросы к БД\n"
+)
+
 
 @router.message(CommandStart())
 async def command_start_wrapper(message: Message, state: FSMContext, **kwargs):
@@ -70,12 +109,7 @@ async def _process_start_command(message: Message, session: AsyncSession, state:
 
         # Предлагаем выбрать язык
         await message.answer(
-            "👋 Добро пожаловать в систему поддержки!\n\n"
-            "Пожалуйста, выберите язык интерфейса:\n\n"
-            "Welcome to the support system!\n"
-            "Please select your language:\n\n"
-            "Ласкаво просимо до системи підтримки!\n"
-            "Будь ласка, виберіть мову інтерфейсу:",
+            WELCOME_TEXT,
             reply_markup=KeyboardFactory.language_selection()
         )
 
@@ -211,41 +245,8 @@ async def _process_help_command(message: Message, session: AsyncSession):
     """
     user_id = message.from_user.id
 
-    # Получаем пользователя из БД
-    query = select(User).where(User.telegram_id == user_id)
-    result = await session.execute(query)
-    user = result.scalar_one_or_none()
-
-    if not user:
-        # Если пользователя нет в БД, используем русский язык по умолчанию
-        language = "ru"
-    else:
-        language = user.language
-
-    help_text = (
-        "🤝 <b>Помощь по использованию бота поддержки</b>\n\n"
-        "<b>Основные команды:</b>\n"
-        "/start - Начать работу с ботом\n"
-        "/help - Показать эту справку\n"
-        "/menu - Показать главное меню\n\n"
-
-        "<b>Для пользователей:</b>\n"
-        "- Создайте тикет, описав вашу проблему\n"
-        "- Дождитесь, пока модератор примет ваш тикет\n"
-        "- Общайтесь с модератором через бота\n"
-        "- После решения проблемы оцените работу модератора\n\n"
-
-        "<b>Для модераторов:</b>\n"
-        "- Принимайте тикеты в работу\n"
-        "- Общайтесь с пользователем через бота\n"
-        "- Отметьте тикет как решенный, когда проблема будет устранена\n\n"
-
-        "<b>Для администраторов:</b>\n"
-        "- Назначайте новых модераторов\n"
-        "- Просматривайте статистику работы бота\n"
-    )
-
-    await message.answer(help_text)
+    # Справка не зависит от пользователя - обращение к БД не нужно
+    await message.answer(HELP_TEXT)
     logger.info(f"User {user_id} requested help")
 
 
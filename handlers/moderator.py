@@ -10,11 +10,18 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, update
 from sqlalchemy.orm import selectinload
 
-from models import User, Ticket, Message as TicketMessage, TicketStatus, MessageType, UserRole
-from utils.i18n import _
+from models import User, Ticket, Message as TicketMessage, TicketStatus, MessageType, UserRole, ArchivedTicket
+from utils.archive import closed_tickets
+from utils.assignment import get_assignment_engine
+from utils.cache import get_cached_user, get_moderator_roster
+from utils.i18n import _, get_i18n
 from utils.keyboards import KeyboardFactory
+from utils.presence import get_presence, STATUS_ONLINE, STATUS_IDLE, STATUS_OFFLINE
 from utils.states import ModeratorStates, UserStates
-from utils.paginator import Paginator
+from utils.tickets import (
+    ClaimResult, claim_ticket, transfer_ticket, resolve_ticket, get_active_ticket_ids,
+    set_ticket_priority, load_ticket_messages, PRIORITY_LABELS, PRIORITY_ICONS
+)
 
 # Инициализация логгера
 logger = logging.getLogger(__name__)
@@ -22,6 +29,9 @@ logger = logging.getLogger(__name__)
 # Создание роутера
 router = Router()
 
+# Количество тикетов на одной странице списка неназначенных
+UNASSIGNED_PAGE_SIZE = 5
+
 
 @router.callback_query(F.data == "mod:unassigned_tickets")
 async def unassigned_tickets_wrapper(callback_query: CallbackQuery, state: FSMContext, **kwargs):
@@ -58,33 +68,19 @@ async def _process_unassigned_tickets(callback_query: CallbackQuery, session: As
         await callback_query.answer()
         return
 
-    # Проверяем, есть ли у модератора активный тикет
-    active_mod_ticket_query = select(Ticket).where(
-        (Ticket.moderator_id == user.id) &
-        (Ticket.status == TicketStatus.IN_PROGRESS)
-    )
-    active_mod_ticket_result = await session.execute(active_mod_ticket_query)
-    active_mod_ticket = active_mod_ticket_result.scalar_one_or_none()
-
-    if active_mod_ticket:
+    # Проверяем, может ли модератор взять еще один тикет (счетчик хранится в строке модератора)
+    if user.active_tickets >= user.max_active_tickets:
         await callback_query.message.edit_text(
-            f"⚠️ У вас уже есть активный тикет #{active_mod_ticket.id}.\n\n"
-            f"Модератор может работать только с одним тикетом одновременно. "
-            f"Пожалуйста, завершите работу с текущим тикетом, прежде чем принимать новый.",
+            f"⚠️ Вы уже ведете максимальное количество тикетов ({user.max_active_tickets}).\n\n"
+            f"Пожалуйста, завершите работу с одним из текущих тикетов, прежде чем принимать новый.",
             reply_markup=KeyboardFactory.back_button("mod:back_to_menu", user.language)
         )
         await callback_query.answer()
         return
 
-    # Получаем неназначенные тикеты
-    unassigned_tickets_query = select(Ticket).where(
-        (Ticket.status == TicketStatus.OPEN) &
-        (Ticket.moderator_id == None)
-    ).order_by(Ticket.created_at.asc()).options(selectinload(Ticket.user))
-    unassigned_tickets_result = await session.execute(unassigned_tickets_query)
-    unassigned_tickets = unassigned_tickets_result.scalars().all()
+    page_view = await _render_unassigned_tickets_page(session, user, 0)
 
-    if not unassigned_tickets:
+    if not page_view:
         await callback_query.message.edit_text(
             "📨 <b>Неназначенные тикеты</b>\n\n"
             "В настоящее время нет неназначенных тикетов.",
@@ -93,62 +89,196 @@ async def _process_unassigned_tickets(callback_query: CallbackQuery, session: As
         await callback_query.answer()
         return
 
-    # Сохраняем тикеты в state для пагинации
-    tickets_data = [
-        {
-            "id": ticket.id,
-            "text": f"Тикет #{ticket.id} - {ticket.user.full_name if ticket.user else 'Неизвестный пользователь'}",
-            "subject": ticket.subject or "Без темы",
-            "created_at": ticket.created_at.strftime("%d.%m.%Y %H:%M"),
-            "user_name": ticket.user.full_name if ticket.user else "Неизвестный пользователь",
-            "user_id": ticket.user.id if ticket.user else None
-        }
-        for ticket in unassigned_tickets
-    ]
-    await state.update_data(tickets=tickets_data, page=0)
-
-    # Формируем сообщение со списком тикетов
-    paginator = Paginator(tickets_data, page_size=5)
-    page_items = paginator.get_page(0)
+    message_text, keyboard, page = page_view
+
+    # В state храним только номер страницы: сама страница рендерится по запросу
+    await state.update_data(page=page)
+
+    # Отправляем сообщение с клавиатурой
+    await callback_query.message.edit_text(message_text, reply_markup=keyboard)
+
+    await state.set_state(ModeratorStates.VIEWING_TICKETS)
+    await callback_query.answer()
+
+    logger.info(f"Moderator {user_id} viewed unassigned tickets")
+
+
+async def _render_unassigned_tickets_page(session: AsyncSession, moderator: User, page: int):
+    """
+    Формирует одну страницу списка неназначенных тикетов.
+
+    Args:
+        session: Сессия БД
+        moderator: Модератор, который просматривает список
+        page: Номер страницы (начиная с 0)
+
+    Returns:
+        Optional[tuple]: (текст, клавиатура, фактический номер страницы) или None, если тикетов нет
+    """
+    unassigned_filter = (Ticket.status == TicketStatus.OPEN) & (Ticket.moderator_id == None)
+
+    total_query = select(func.count(Ticket.id)).where(unassigned_filter)
+    total = (await session.execute(total_query)).scalar() or 0
+
+    if not total:
+        return None
+
+    total_pages = (total + UNASSIGNED_PAGE_SIZE - 1) // UNASSIGNED_PAGE_SIZE
+    page = max(0, min(page, total_pages - 1))
+
+    # Загружаем только тикеты текущей страницы. Порядок очереди учитывает приоритет
+    # и возраст тикета и обслуживается индексом ix_tickets_queue
+    tickets_query = select(Ticket).where(unassigned_filter).order_by(
+        Ticket.queue_at.asc(), Ticket.id.asc()
+    ).offset(page * UNASSIGNED_PAGE_SIZE).limit(UNASSIGNED_PAGE_SIZE).options(selectinload(Ticket.user))
+    tickets_result = await session.execute(tickets_query)
+    tickets = tickets_result.scalars().all()
 
     message_text = "📨 <b>Неназначенные тикеты</b>\n\n"
-    for item in page_items:
+    for ticket in tickets:
+        priority = ticket.priority or 0
         message_text += (
-            f"🔹 <b>Тикет #{item['id']}</b>\n"
-            f"👤 Пользователь: {item['user_name']}\n"
-            f"📝 {item['subject']}\n"
-            f"📅 Создан: {item['created_at']}\n\n"
+            f"{PRIORITY_ICONS[priority]} <b>Тикет #{ticket.id}</b> (приоритет: {PRIORITY_LABELS[priority]})\n"
+            f"👤 Пользователь: {ticket.user.full_name if ticket.user else 'Неизвестный пользователь'}\n"
+            f"📝 {ticket.subject or 'Без темы'}\n"
+            f"📅 Создан: {ticket.created_at.strftime('%d.%m.%Y %H:%M')}\n\n"
         )
 
-    page_info = paginator.get_page_info(0)
-    message_text += _("page_info", user.language,
-                      current_page=page_info["current_page"],
-                      total_pages=page_info["total_pages"])
+    message_text += _("page_info", moderator.language, current_page=page + 1, total_pages=total_pages)
 
     # Создаем клавиатуру с тикетами и кнопками действий
     kb_items = []
-    for item in page_items:
-        kb_items.append({
-            "id": f"take:{item['id']}",
-            "text": f"Принять тикет #{item['id']}"
-        })
+    for ticket in tickets:
+        kb_items.append({"id": f"take_ticket:{ticket.id}", "text": f"Принять тикет #{ticket.id}"})
+        kb_items.append({"id": f"bump_priority:{ticket.id}", "text": f"⬆️ Приоритет тикета #{ticket.id}"})
+    keyboard = KeyboardFactory.paginated_list(
+        kb_items,
+        page,
+        page_size=UNASSIGNED_PAGE_SIZE,
+        action_prefix="mod",
+        back_callback="mod:back_to_menu",
+        language=moderator.language,
+        total_pages=total_pages
+    )
 
-    # Отправляем сообщение с клавиатурой
-    await callback_query.message.edit_text(
-        message_text,
-        reply_markup=KeyboardFactory.paginated_list(
-            kb_items,
-            0,
-            action_prefix="mod",
-            back_callback="mod:back_to_menu",
-            language=user.language
+    return message_text, keyboard, page
+
+
+@router.callback_query(ModeratorStates.VIEWING_TICKETS, F.data.startswith("page:"))
+async def unassigned_tickets_page_wrapper(callback_query: CallbackQuery, state: FSMContext, **kwargs):
+    """
+    Обертка для обработчика переключения страниц неназначенных тикетов
+    """
+    session = kwargs.get("session")
+    if not session:
+        logger.error("Сессия не передана в обработчик unassigned_tickets_page!")
+        await callback_query.answer()
+        return
+
+    return await _process_unassigned_tickets_page(callback_query, session, state)
+
+
+async def _process_unassigned_tickets_page(callback_query: CallbackQuery, session: AsyncSession,
+                                           state: FSMContext):
+    """
+    Реализация обработчика переключения страниц неназначенных тикетов
+    """
+    user_id = callback_query.from_user.id
+    page = int(callback_query.data.split(":")[1])
+
+    # Получаем пользователя из БД
+    query = select(User).where(User.telegram_id == user_id)
+    result = await session.execute(query)
+    user = result.scalar_one_or_none()
+
+    if not user or user.role != UserRole.MODERATOR:
+        await callback_query.answer()
+        return
+
+    page_view = await _render_unassigned_tickets_page(session, user, page)
+
+    if not page_view:
+        await callback_query.message.edit_text(
+            "📨 <b>Неназначенные тикеты</b>\n\n"
+            "В настоящее время нет неназначенных тикетов.",
+            reply_markup=KeyboardFactory.back_button("mod:back_to_menu", user.language)
         )
-    )
+        await callback_query.answer()
+        return
 
-    await state.set_state(ModeratorStates.VIEWING_TICKETS)
+    message_text, keyboard, page = page_view
+    await state.update_data(page=page)
+
+    await callback_query.message.edit_text(message_text, reply_markup=keyboard)
     await callback_query.answer()
 
-    logger.info(f"Moderator {user_id} viewed unassigned tickets")
+
+@router.callback_query(F.data.startswith("mod:bump_priority:"))
+async def bump_priority_wrapper(callback_query: CallbackQuery, state: FSMContext, **kwargs):
+    """
+    Обертка для обработчика повышения приоритета тикета
+    """
+    session = kwargs.get("session")
+    if not session:
+        logger.error("Сессия не передана в обработчик bump_priority!")
+        await callback_query.answer()
+        return
+
+    return await _process_bump_priority(callback_query, session, state)
+
+
+async def _process_bump_priority(callback_query: CallbackQuery, session: AsyncSession, state: FSMContext):
+    """
+    Реализация обработчика повышения приоритета тикета.
+    Приоритет повышается по кругу: обычный -> высокий -> срочный -> обычный.
+    """
+    user_id = callback_query.from_user.id
+    ticket_id = int(callback_query.data.split(":")[2])
+
+    query = select(User).where(User.telegram_id == user_id)
+    result = await session.execute(query)
+    user = result.scalar_one_or_none()
+
+    if not user or user.role != UserRole.MODERATOR:
+        await callback_query.answer(_("error_access_denied", user.language if user else None))
+        return
+
+    ticket = await session.get(Ticket, ticket_id)
+    if not ticket or ticket.status != TicketStatus.OPEN:
+        await callback_query.answer(_("error_ticket_not_found", user.language, ticket_id=ticket_id), show_alert=True)
+        return
+
+    priority = ((ticket.priority or 0) + 1) % len(PRIORITY_LABELS)
+    await set_ticket_priority(session, ticket_id, priority)
+    await session.commit()
+
+    logger.info(f"Moderator {user_id} set priority {priority} for ticket #{ticket_id}")
+
+    # Перерисовываем текущую страницу с учетом нового порядка
+    data = await state.get_data()
+    page_view = await _render_unassigned_tickets_page(session, user, data.get("page", 0))
+    if page_view:
+        message_text, keyboard, page = page_view
+        await state.update_data(page=page)
+        await callback_query.message.edit_text(message_text, reply_markup=keyboard)
+
+    await callback_query.answer(f"Приоритет тикета #{ticket_id}: {PRIORITY_LABELS[priority]}")
+
+
+async def _leave_ticket_state(state: FSMContext, ticket_id: int) -> None:
+    """
+    Выводит модератора из режима работы с тикетом после решения или передачи тикета.
+    Если модератор в это время работал с другим своим тикетом, режим работы с ним сохраняется.
+    """
+    data = await state.get_data()
+    active_ticket_id = data.get("active_ticket_id")
+
+    if active_ticket_id and active_ticket_id != ticket_id:
+        await state.set_state(ModeratorStates.WORKING_WITH_TICKET)
+        await state.set_data({"active_ticket_id": active_ticket_id})
+    else:
+        await state.set_state(ModeratorStates.MAIN_MENU)
+        await state.clear()
 
 
 @router.callback_query(F.data.startswith("mod:take_ticket:"))
@@ -184,68 +314,55 @@ async def _process_take_ticket(callback_query: CallbackQuery, bot: Bot, session:
     user_id = callback_query.from_user.id
     ticket_id = int(callback_query.data.split(":")[2])
 
-    # Получаем пользователя из БД
-    query = select(User).where(User.telegram_id == user_id)
-    result = await session.execute(query)
-    moderator = result.scalar_one_or_none()
+    # Роль и имя модератора берем из кэша пользователей
+    moderator = await get_cached_user(session, user_id)
 
-    if not moderator or moderator.role != UserRole.MODERATOR:
-        await callback_query.message.edit_text(
-            _("error_access_denied", moderator.language if moderator else None)
-        )
+    if not moderator or moderator["role"] != UserRole.MODERATOR.value:
+        await callback_query.message.edit_text(_("error_access_denied"))
         await callback_query.answer()
         return
 
-    # Проверяем, есть ли у модератора активный тикет
-    active_mod_ticket_query = select(Ticket).where(
-        (Ticket.moderator_id == moderator.id) &
-        (Ticket.status == TicketStatus.IN_PROGRESS)
-    )
-    active_mod_ticket_result = await session.execute(active_mod_ticket_query)
-    active_mod_ticket = active_mod_ticket_result.scalar_one_or_none()
+    # Назначаем тикет условными UPDATE: у модератора должно быть свободное место,
+    # а тикет должен быть открыт и не назначен
+    claim = await claim_ticket(session, ticket_id, moderator["id"])
 
-    if active_mod_ticket:
+    if claim == ClaimResult.BUSY:
+        active_ticket_ids = await get_active_ticket_ids(session, moderator["id"])
         await callback_query.message.edit_text(
-            f"⚠️ У вас уже есть активный тикет #{active_mod_ticket.id}.\n\n"
-            f"Модератор может работать только с одним тикетом одновременно. "
-            f"Пожалуйста, завершите работу с текущим тикетом, прежде чем принимать новый.",
-            reply_markup=KeyboardFactory.back_button("mod:back_to_menu", moderator.language)
+            f"⚠️ Вы уже ведете максимальное количество тикетов: "
+            f"{', '.join(f'#{active_id}' for active_id in active_ticket_ids)}.\n\n"
+            f"Пожалуйста, завершите работу с одним из текущих тикетов, прежде чем принимать новый.",
+            reply_markup=KeyboardFactory.back_button("mod:back_to_menu")
         )
         await callback_query.answer()
         return
 
-    # Получаем тикет из БД
-    ticket_query = select(Ticket).where(
-        (Ticket.id == ticket_id) &
-        (Ticket.status == TicketStatus.OPEN)
-    ).options(selectinload(Ticket.user), selectinload(Ticket.messages))
-    ticket_result = await session.execute(ticket_query)
-    ticket = ticket_result.scalar_one_or_none()
-
-    if not ticket:
+    if claim == ClaimResult.TAKEN:
         await callback_query.message.edit_text(
-            _("error_ticket_not_found", moderator.language, ticket_id=ticket_id) + " " +
+            _("error_ticket_not_found", ticket_id=ticket_id) + " " +
             "Возможно, тикет уже был взят другим модератором.",
-            reply_markup=KeyboardFactory.back_button("mod:back_to_menu", moderator.language)
+            reply_markup=KeyboardFactory.back_button("mod:back_to_menu")
         )
         await callback_query.answer()
         return
 
-    # Обновляем тикет: назначаем модератора и меняем статус
-    ticket.moderator_id = moderator.id
-    ticket.status = TicketStatus.IN_PROGRESS
-    ticket.updated_at = datetime.now()
-
     # Добавляем системное сообщение о принятии тикета
     system_message = TicketMessage(
-        ticket_id=ticket.id,
-        sender_id=moderator.id,
+        ticket_id=ticket_id,
+        sender_id=moderator["id"],
         message_type=MessageType.SYSTEM,
-        text=_("moderator_took_ticket", None, moderator_name=moderator.full_name)
+        text=_("moderator_took_ticket", get_i18n().default_language, moderator_name=moderator["full_name"])
     )
     session.add(system_message)
 
     await session.commit()
+    get_presence().adjust_load(moderator["id"], 1)
+
+    # Загружаем тикет для отображения
+    ticket_query = select(Ticket).where(Ticket.id == ticket_id).options(selectinload(Ticket.user))
+    ticket_result = await session.execute(ticket_query)
+    ticket = ticket_result.scalar_one()
+    await load_ticket_messages(session, ticket)
 
     # Отправляем информацию о тикете
     message_text = (
@@ -256,7 +373,7 @@ async def _process_take_ticket(callback_query: CallbackQuery, bot: Bot, session:
     )
 
     # Создаем клавиатуру с действиями для тикета
-    keyboard = KeyboardFactory.ticket_actions(TicketStatus.IN_PROGRESS, ticket.id, moderator.language)
+    keyboard = KeyboardFactory.ticket_actions(TicketStatus.IN_PROGRESS, ticket.id)
 
     await callback_query.message.edit_text(
         message_text,
@@ -269,7 +386,7 @@ async def _process_take_ticket(callback_query: CallbackQuery, bot: Bot, session:
 
     # Отправляем историю сообщений отдельными сообщениями
     if ticket.messages:
-        await callback_query.message.answer(_("message_history", moderator.language))
+        await callback_query.message.answer(_("message_history"))
 
         # Ограничиваем количество сообщений
         max_messages = 20
@@ -284,7 +401,7 @@ async def _process_take_ticket(callback_query: CallbackQuery, bot: Bot, session:
         for msg in ticket.messages[start_idx:]:
             if msg.sender_id == ticket.user_id:
                 sender = "Пользователь"
-            elif msg.sender_id == moderator.id:
+            elif msg.sender_id == moderator["id"]:
                 sender = "Вы"
             else:
                 sender = "Система"
@@ -327,7 +444,7 @@ async def _process_take_ticket(callback_query: CallbackQuery, bot: Bot, session:
         await bot.send_message(
             chat_id=ticket.user.telegram_id,
             text=f"🔔 <b>Ваш тикет #{ticket.id} принят в работу</b>\n\n"
-                 f"Модератор {moderator.full_name} начал работу с вашим запросом.\n"
+                 f"Модератор {moderator['full_name']} начал работу с вашим запросом.\n"
                  f"Вы можете продолжить общение через бота.",
         )
     except Exception as e:
@@ -466,20 +583,32 @@ async def _process_confirm_resolve_ticket(callback_query: CallbackQuery, bot: Bo
         await callback_query.answer()
         return
 
-    # Обновляем тикет: меняем статус
-    ticket.status = TicketStatus.RESOLVED
-    ticket.updated_at = datetime.now()
+    # Меняем статус условным UPDATE и освобождаем место модератора
+    if not await resolve_ticket(session, ticket.id, moderator.id):
+        await callback_query.message.edit_text(
+            _("error_ticket_not_found", moderator.language, ticket_id=ticket_id) + " " +
+            "или он не находится в работе у вас.",
+            reply_markup=KeyboardFactory.back_button("mod:back_to_menu", moderator.language)
+        )
+        await callback_query.answer()
+        return
 
     # Добавляем системное сообщение о решении тикета
     system_message = TicketMessage(
         ticket_id=ticket.id,
         sender_id=moderator.id,
         message_type=MessageType.SYSTEM,
-        text=_("moderator_resolved_ticket", None, moderator_name=moderator.full_name)
+        text=_("moderator_resolved_ticket", get_i18n().default_language, moderator_name=moderator.full_name)
     )
     session.add(system_message)
 
     await session.commit()
+    get_presence().adjust_load(moderator.id, -1)
+
+    # Модератор освободился - очередь можно разобрать сразу
+    assignment_engine = get_assignment_engine()
+    if assignment_engine:
+        assignment_engine.wake()
 
     # Отправляем подтверждение модератору
     await callback_query.message.edit_text(
@@ -489,9 +618,8 @@ async def _process_confirm_resolve_ticket(callback_query: CallbackQuery, bot: Bo
         reply_markup=KeyboardFactory.main_menu(UserRole.MODERATOR, moderator.language)
     )
 
-    # Сбрасываем состояние
-    await state.set_state(ModeratorStates.MAIN_MENU)
-    await state.clear()
+    # Сбрасываем режим работы с тикетом
+    await _leave_ticket_state(state, ticket.id)
 
     # Уведомляем пользователя о решении тикета
     try:
@@ -546,10 +674,10 @@ async def _process_my_stats(callback_query: CallbackQuery, session: AsyncSession
         await callback_query.answer()
         return
 
-    # Получаем статистику по закрытым тикетам
-    closed_tickets_query = select(func.count(Ticket.id), func.avg(Ticket.rating)).where(
-        (Ticket.moderator_id == moderator.id) &
-        (Ticket.status == TicketStatus.CLOSED)
+    # Получаем статистику по закрытым тикетам (вместе с архивом)
+    closed = closed_tickets()
+    closed_tickets_query = select(func.count(closed.c.id), func.avg(closed.c.rating)).where(
+        closed.c.moderator_id == moderator.id
     )
     closed_tickets_result = await session.execute(closed_tickets_query)
     closed_count, avg_rating = closed_tickets_result.one()
@@ -570,12 +698,16 @@ async def _process_my_stats(callback_query: CallbackQuery, session: AsyncSession
     resolved_result = await session.execute(resolved_tickets_query)
     resolved_count = resolved_result.scalar()
 
-    # Получаем статистику по всем тикетам
+    # Получаем статистику по всем тикетам (вместе с архивом)
     all_tickets_query = select(func.count(Ticket.id)).where(
         Ticket.moderator_id == moderator.id
     )
     all_tickets_result = await session.execute(all_tickets_query)
-    all_tickets_count = all_tickets_result.scalar()
+    archived_tickets_query = select(func.count(ArchivedTicket.id)).where(
+        ArchivedTicket.moderator_id == moderator.id
+    )
+    archived_tickets_result = await session.execute(archived_tickets_query)
+    all_tickets_count = all_tickets_result.scalar() + archived_tickets_result.scalar()
 
     # Форматируем средний рейтинг
     avg_rating_text = f"{avg_rating:.2f}" if avg_rating else "Нет оценок"
@@ -808,16 +940,10 @@ async def _process_back_to_menu(callback_query: CallbackQuery, session: AsyncSes
     """
     user_id = callback_query.from_user.id
 
-    # Получаем пользователя из БД
-    query = select(User).where(User.telegram_id == user_id)
-    result = await session.execute(query)
-    moderator = result.scalar_one_or_none()
-
-    language = moderator.language if moderator else "ru"
-
+    # Язык пользователя уже установлен I18nMiddleware для текущего апдейта
     await callback_query.message.edit_text(
-        _("moderator_main_menu", language),
-        reply_markup=KeyboardFactory.main_menu(UserRole.MODERATOR, language)
+        _("moderator_main_menu"),
+        reply_markup=KeyboardFactory.main_menu(UserRole.MODERATOR)
     )
 
     await state.set_state(ModeratorStates.MAIN_MENU)
@@ -850,16 +976,10 @@ async def _process_switch_to_user_menu(callback_query: CallbackQuery, session: A
     """
     user_id = callback_query.from_user.id
 
-    # Получаем пользователя из БД
-    query = select(User).where(User.telegram_id == user_id)
-    result = await session.execute(query)
-    user = result.scalar_one_or_none()
-
-    language = user.language if user else "ru"
-
+    # Язык пользователя уже установлен I18nMiddleware для текущего апдейта
     await callback_query.message.edit_text(
-        _("user_main_menu", language),
-        reply_markup=KeyboardFactory.main_menu(UserRole.USER, language)
+        _("user_main_menu"),
+        reply_markup=KeyboardFactory.main_menu(UserRole.USER)
     )
 
     await state.set_state(UserStates.MAIN_MENU)
@@ -885,6 +1005,32 @@ async def reassign_ticket_wrapper(callback_query: CallbackQuery, state: FSMConte
     return await _process_reassign_ticket(callback_query, session, state)
 
 
+async def _reassign_candidates(session: AsyncSession, current_moderator_id: int) -> List[Dict[str, Any]]:
+    """
+    Модераторы, которым можно переназначить тикет: сначала доступные по индексу присутствия
+    (в сети или недавно отошедшие, наименее загруженные), затем остальные из списка модераторов
+    по имени - их тоже можно выбрать, тикет они увидят, когда вернутся.
+
+    Args:
+        session: Сессия БД
+        current_moderator_id: ID модератора, который переназначает тикет (users.id)
+
+    Returns:
+        List[Dict[str, Any]]: Снимки модераторов с полем status (у доступных есть и load)
+    """
+    roster = {
+        mod["id"]: mod for mod in await get_moderator_roster(session)
+        if mod["id"] != current_moderator_id
+    }
+    available = [mod for mod in get_presence().moderators() if mod["id"] in roster]
+    available_ids = {mod["id"] for mod in available}
+    offline = sorted(
+        ({**mod, "status": STATUS_OFFLINE} for mod in roster.values() if mod["id"] not in available_ids),
+        key=lambda mod: (mod["full_name"] or "").lower()
+    )
+    return available + offline
+
+
 async def _process_reassign_ticket(callback_query: CallbackQuery, session: AsyncSession, state: FSMContext):
     """
     Реализация обработчика переназначения тикета другому модератору
@@ -922,17 +1068,11 @@ async def _process_reassign_ticket(callback_query: CallbackQuery, session: Async
         await callback_query.answer()
         return
 
-    # Получаем список других модераторов
-    moderators_query = select(User).where(
-        (User.role == UserRole.MODERATOR) &
-        (User.id != current_moderator.id)
-    )
-    moderators_result = await session.execute(moderators_query)
-    moderators = moderators_result.scalars().all()
+    moderators = await _reassign_candidates(session, current_moderator.id)
 
     if not moderators:
         await callback_query.message.edit_text(
-            "В системе нет других модераторов, которым можно переназначить тикет.",
+            "Нет других модераторов, которым можно переназначить тикет.",
             reply_markup=KeyboardFactory.back_button("mod:back_to_menu", current_moderator.language)
         )
         await callback_query.answer()
@@ -950,10 +1090,12 @@ async def _process_reassign_ticket(callback_query: CallbackQuery, session: Async
 
     # Создаем список модераторов для клавиатуры
     kb_items = []
+    status_icons = {STATUS_ONLINE: "🟢", STATUS_IDLE: "🟡", STATUS_OFFLINE: "⚪"}
     for mod in moderators:
+        load = f" ({mod['load']})" if "load" in mod else ""
         kb_items.append({
-            "id": f"reassign:{mod.id}",
-            "text": f"{mod.full_name}"
+            "id": f"reassign:{mod['id']}",
+            "text": f"{status_icons[mod['status']]} {mod['full_name']}{load}"
         })
 
     # Добавляем кнопку "Назад"
@@ -1157,76 +1299,86 @@ async def _process_do_reassign_ticket(callback_query: CallbackQuery, bot: Bot, s
         await callback_query.answer()
         return
 
-    # Проверяем, есть ли у нового модератора активный тикет
-    active_mod_ticket_query = select(Ticket).where(
-        (Ticket.moderator_id == new_moderator.id) &
-        (Ticket.status == TicketStatus.IN_PROGRESS)
-    )
-    active_mod_ticket_result = await session.execute(active_mod_ticket_query)
-    active_mod_ticket = active_mod_ticket_result.scalar_one_or_none()
-
-    if active_mod_ticket:
+    # Данные для уведомлений сохраняем до UPDATE: при неудаче сессия откатывается
+    old_moderator_name = current_moderator.full_name
+    new_moderator_name = new_moderator.full_name
+    new_moderator_telegram_id = new_moderator.telegram_id
+    new_moderator_language = new_moderator.language
+    language = current_moderator.language
+    current_moderator_id = current_moderator.id
+    ticket_subject = ticket.subject
+    ticket_user_name = ticket.user.full_name
+    ticket_user_telegram_id = ticket.user.telegram_id
+
+    # Переназначаем тикет условными UPDATE с учетом лимита тикетов нового модератора
+    transfer = await transfer_ticket(session, ticket_id, current_moderator_id, new_moderator_id)
+
+    if transfer == ClaimResult.BUSY:
         await callback_query.message.edit_text(
-            f"⚠️ Модератор {new_moderator.full_name} уже имеет активный тикет #{active_mod_ticket.id}.\n\n"
-            f"Модератор может работать только с одним тикетом одновременно. "
+            f"⚠️ Модератор {new_moderator_name} уже ведет максимальное количество тикетов.\n\n"
             f"Пожалуйста, выберите другого модератора.",
-            reply_markup=KeyboardFactory.back_button(f"mod:reassign_ticket:{ticket_id}", current_moderator.language)
+            reply_markup=KeyboardFactory.back_button(f"mod:reassign_ticket:{ticket_id}", language)
         )
         await callback_query.answer()
         return
 
-    # Переназначаем тикет новому модератору
-    old_moderator_name = current_moderator.full_name
-    ticket.moderator_id = new_moderator.id
-    ticket.updated_at = datetime.now()
+    if transfer == ClaimResult.TAKEN:
+        await callback_query.message.edit_text(
+            _("error_ticket_not_found", language, ticket_id=ticket_id) + " " +
+            "или он не находится в работе у вас.",
+            reply_markup=KeyboardFactory.back_button("mod:back_to_menu", language)
+        )
+        await callback_query.answer()
+        return
 
     # Добавляем системное сообщение о переназначении
     system_message = TicketMessage(
-        ticket_id=ticket.id,
-        sender_id=current_moderator.id,
+        ticket_id=ticket_id,
+        sender_id=current_moderator_id,
         message_type=MessageType.SYSTEM,
-        text=f"Тикет переназначен с модератора {old_moderator_name} на модератора {new_moderator.full_name}"
+        text=f"Тикет переназначен с модератора {old_moderator_name} на модератора {new_moderator_name}"
     )
     session.add(system_message)
 
     await session.commit()
+    get_presence().adjust_load(current_moderator_id, -1)
+    get_presence().adjust_load(new_moderator_id, 1)
 
     # Уведомляем текущего модератора о переназначении
     await callback_query.message.edit_text(
-        f"✅ Тикет #{ticket_id} успешно переназначен модератору {new_moderator.full_name}.",
-        reply_markup=KeyboardFactory.back_button("mod:back_to_menu", current_moderator.language)
+        f"✅ Тикет #{ticket_id} успешно переназначен модератору {new_moderator_name}.",
+        reply_markup=KeyboardFactory.back_button("mod:back_to_menu", language)
     )
 
-    # Сбрасываем состояние
-    await state.set_state(ModeratorStates.MAIN_MENU)
-    await state.clear()
+    # Сбрасываем режим работы с тикетом
+    await _leave_ticket_state(state, ticket_id)
 
     # Уведомляем нового модератора о назначении тикета
     try:
         # Создаем клавиатуру с кнопкой "Принять тикет"
-        keyboard = KeyboardFactory.ticket_actions(TicketStatus.IN_PROGRESS, ticket_id, new_moderator.language)
+        keyboard = KeyboardFactory.ticket_actions(TicketStatus.IN_PROGRESS, ticket_id, new_moderator_language)
 
         await bot.send_message(
-            chat_id=new_moderator.telegram_id,
+            chat_id=new_moderator_telegram_id,
             text=f"📩 <b>Вам переназначен тикет #{ticket_id}</b>\n\n"
-                 f"От: {ticket.user.full_name}\n"
-                 f"Тема: {ticket.subject or 'Не указана'}\n\n"
+                 f"От: {ticket_user_name}\n"
+                 f"Тема: {ticket_subject or 'Не указана'}\n\n"
                  f"Модератор {old_moderator_name} переназначил вам этот тикет.",
             reply_markup=keyboard
         )
     except Exception as e:
-        logger.error(f"Failed to send notification to new moderator {new_moderator.telegram_id}: {e}")
+        logger.error(f"Failed to send notification to new moderator {new_moderator_telegram_id}: {e}")
 
     # Уведомляем пользователя о смене модератора
     try:
         await bot.send_message(
-            chat_id=ticket.user.telegram_id,
+            chat_id=ticket_user_telegram_id,
             text=f"🔄 <b>Уведомление по тикету #{ticket_id}</b>\n\n"
-                 f"Ваш тикет переназначен новому модератору: {new_moderator.full_name}.\n"
+                 f"Ваш тикет переназначен новому модератору: {new_moderator_name}.\n"
                  f"Он продолжит работать с вашим запросом."
         )
     except Exception as e:
-        logger.error(f"Failed to send notification to user {ticket.user.telegram_id}: {e}")
+        logger.error(f"Failed to send notification to user {ticket_user_telegram_id}: {e}")
 
     await callback_query.answer()
 
@@ -1316,21 +1468,55 @@ async def mod_active_ticket_button_wrapper(message: Message, state: FSMContext,
         await message.answer(_("error_access_denied", user.language if user else None))
         return
 
-    # Здесь обработка текущего активного тикета модератора
-    active_ticket_query = select(Ticket).where(
+    # Тикеты, которые модератор ведет сейчас
+    active_tickets_query = select(Ticket).where(
         (Ticket.moderator_id == user.id) &
         (Ticket.status == TicketStatus.IN_PROGRESS)
-    ).options(selectinload(Ticket.user), selectinload(Ticket.messages))
-    active_ticket_result = await session.execute(active_ticket_query)
-    ticket = active_ticket_result.scalar_one_or_none()
+    ).order_by(Ticket.updated_at.asc(), Ticket.id.asc()).options(selectinload(Ticket.user))
+    active_tickets_result = await session.execute(active_tickets_query)
+    tickets = active_tickets_result.scalars().all()
 
-    if not ticket:
+    if not tickets:
         await message.answer(
             "У вас нет активных тикетов в работе. Вы можете взять тикет из списка неназначенных.",
             reply_markup=KeyboardFactory.main_reply_keyboard(UserRole.MODERATOR, user.language)
         )
         return
 
+    # Если тикетов несколько, модератор выбирает, с каким работать
+    if len(tickets) > 1:
+        state_data = await state.get_data()
+        current_ticket_id = state_data.get("active_ticket_id")
+
+        message_text = "🗂 <b>Ваши тикеты в работе</b>\n\n"
+        for ticket in tickets:
+            marker = "▶️" if ticket.id == current_ticket_id else "🔹"
+            message_text += (
+                f"{marker} <b>Тикет #{ticket.id}</b> - {ticket.user.full_name}\n"
+                f"📝 {ticket.subject or 'Без темы'}\n\n"
+            )
+        message_text += "Выберите тикет, в котором хотите отвечать:"
+
+        kb_items = [
+            {"id": f"switch_ticket:{ticket.id}", "text": f"Тикет #{ticket.id}"}
+            for ticket in tickets
+        ]
+        await message.answer(
+            message_text,
+            reply_markup=KeyboardFactory.paginated_list(
+                kb_items,
+                0,
+                action_prefix="mod",
+                back_callback="mod:back_to_menu",
+                language=user.language,
+                total_pages=1
+            )
+        )
+        return
+
+    ticket = tickets[0]
+    await load_ticket_messages(session, ticket)
+
     # Если есть активный тикет, показываем информацию о нем
     message_text = (
         f"🔄 <b>Тикет #{ticket.id} в работе</b>\n\n"
@@ -1412,6 +1598,66 @@ async def mod_active_ticket_button_wrapper(message: Message, state: FSMContext,
     logger.info(f"Moderator {user_id} viewed active ticket #{ticket.id}")
 
 
+@router.callback_query(F.data.startswith("mod:switch_ticket:"))
+async def switch_ticket_wrapper(callback_query: CallbackQuery, state: FSMContext, **kwargs):
+    """
+    Обертка для обработчика переключения модератора на другой тикет в работе
+    """
+    session = kwargs.get("session")
+    if not session:
+        logger.error("Сессия не передана в обработчик switch_ticket!")
+        await callback_query.answer()
+        return
+
+    return await _process_switch_ticket(callback_query, session, state)
+
+
+async def _process_switch_ticket(callback_query: CallbackQuery, session: AsyncSession, state: FSMContext):
+    """
+    Реализация обработчика переключения модератора на другой тикет в работе.
+    Сообщения модератора отправляются в тикет из active_ticket_id, поэтому достаточно его заменить.
+    """
+    user_id = callback_query.from_user.id
+    ticket_id = int(callback_query.data.split(":")[2])
+
+    # Роль берем из кэша пользователей
+    moderator = await get_cached_user(session, user_id)
+
+    if not moderator or moderator["role"] != UserRole.MODERATOR.value:
+        await callback_query.answer(_("error_access_denied"))
+        return
+
+    ticket_query = select(Ticket).where(
+        (Ticket.id == ticket_id) &
+        (Ticket.moderator_id == moderator["id"]) &
+        (Ticket.status == TicketStatus.IN_PROGRESS)
+    ).options(selectinload(Ticket.user))
+    ticket_result = await session.execute(ticket_query)
+    ticket = ticket_result.scalar_one_or_none()
+
+    if not ticket:
+        await callback_query.answer(
+            _("error_ticket_not_found", ticket_id=ticket_id) + " " + "или он не находится в работе у вас.",
+            show_alert=True
+        )
+        return
+
+    await state.set_state(ModeratorStates.WORKING_WITH_TICKET)
+    await state.set_data({"active_ticket_id": ticket.id})
+
+    # Отвечаем новым сообщением: кнопка может быть под фото или документом, которые нельзя заменить текстом
+    await callback_query.message.answer(
+        f"▶️ <b>Вы работаете с тикетом #{ticket.id}</b>\n\n"
+        f"👤 Пользователь: {ticket.user.full_name}\n"
+        f"📝 Тема: {ticket.subject or 'Не указана'}\n\n"
+        f"<i>Чтобы ответить пользователю, просто отправьте сообщение в этот чат.</i>",
+        reply_markup=KeyboardFactory.ticket_actions(TicketStatus.IN_PROGRESS, ticket.id)
+    )
+    await callback_query.answer()
+
+    logger.info(f"Moderator {user_id} switched to ticket #{ticket.id}")
+
+
 @router.message(F.text == "📨 Неназначенные тикеты")
 async def unassigned_tickets_button_wrapper(message: Message, state: FSMContext, **kwargs):
     """
@@ -7,14 +7,17 @@ from aiogram.filters import Command, CommandStart
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, update
+from sqlalchemy import select, func, update, union_all
 from sqlalchemy.orm import selectinload
 
-from models import User, Ticket, Message as TicketMessage, TicketStatus, MessageType, UserRole
+from models import User, Ticket, Message as TicketMessage, TicketStatus, MessageType, UserRole, ArchivedTicket
+from utils.assignment import get_assignment_engine
+from utils.cache import get_cache, get_moderator_roster
+from utils.presence import get_presence
 from utils.i18n import _
 from utils.keyboards import KeyboardFactory
 from utils.states import UserStates
-from utils.paginator import Paginator
+from utils.tickets import load_ticket_messages
 
 # Инициализация логгера
 logger = logging.getLogger(__name__)
@@ -22,6 +25,9 @@ logger = logging.getLogger(__name__)
 # Создание роутера
 router = Router()
 
+# Количество тикетов на одной странице истории
+HISTORY_PAGE_SIZE = 5
+
 
 @router.callback_query(F.data == "user:create_ticket")
 async def create_ticket_cmd_wrapper(callback_query: CallbackQuery, state: FSMContext, **kwargs):
@@ -213,19 +219,24 @@ async def _process_ticket_creation(message: Message, bot: Bot, session: AsyncSes
     # Возвращаем пользователя в главное меню
     await state.set_state(UserStates.MAIN_MENU)
 
-    # Отправляем уведомления всем модераторам
-    moderators_query = select(User).where(User.role == UserRole.MODERATOR)
-    moderators_result = await session.execute(moderators_query)
-    moderators = moderators_result.scalars().all()
+    # При автоматическом назначении тикет получит один свободный модератор
+    assignment_engine = get_assignment_engine()
+    if assignment_engine:
+        assignment_engine.wake()
+        logger.info(f"User {user_id} created ticket #{new_ticket.id}")
+        return
+
+    # Уведомляем доступных модераторов; если таких нет - всех, чтобы тикет не остался незамеченным
+    moderators = get_presence().moderators() or await get_moderator_roster(session)
 
     for moderator in moderators:
         # Создаем клавиатуру с кнопкой "Принять тикет"
-        keyboard = KeyboardFactory.ticket_actions(TicketStatus.OPEN, new_ticket.id, moderator.language)
+        keyboard = KeyboardFactory.ticket_actions(TicketStatus.OPEN, new_ticket.id, moderator["language"])
 
         # Отправляем уведомление
         try:
             await bot.send_message(
-                chat_id=moderator.telegram_id,
+                chat_id=moderator["telegram_id"],
                 text=f"📩 <b>Новый тикет #{new_ticket.id}</b>\n\n"
                      f"От: {user.full_name}\n"
                      f"Тема: {new_ticket.subject or 'Не указана'}\n\n"
@@ -233,7 +244,7 @@ async def _process_ticket_creation(message: Message, bot: Bot, session: AsyncSes
                 reply_markup=keyboard
             )
         except Exception as e:
-            logger.error(f"Failed to send notification to moderator {moderator.telegram_id}: {e}")
+            logger.error(f"Failed to send notification to moderator {moderator['telegram_id']}: {e}")
 
     logger.info(f"User {user_id} created ticket #{new_ticket.id}")
 
@@ -272,15 +283,9 @@ async def _process_ticket_history(callback_query: CallbackQuery, session: AsyncS
         )
         return
 
-    # Получаем закрытые тикеты пользователя
-    tickets_query = select(Ticket).where(
-        (Ticket.user_id == user.id) &
-        (Ticket.status == TicketStatus.CLOSED)
-    ).order_by(Ticket.created_at.desc())
-    tickets_result = await session.execute(tickets_query)
-    tickets = tickets_result.scalars().all()
+    page_view = await _render_ticket_history_page(session, user, 0)
 
-    if not tickets:
+    if not page_view:
         await callback_query.message.edit_text(
             _("ticket_history_title", user.language) + "\n\n" +
             _("no_closed_tickets", user.language),
@@ -289,56 +294,138 @@ async def _process_ticket_history(callback_query: CallbackQuery, session: AsyncS
         await callback_query.answer()
         return
 
-    # Сохраняем тикеты в state для пагинации
-    tickets_data = [
-        {
-            "id": ticket.id,
-            "text": f"Тикет #{ticket.id} - {ticket.subject or 'Без темы'}",
-            "subject": ticket.subject or _("no_subject", user.language),
-            "created_at": ticket.created_at.strftime("%d.%m.%Y %H:%M"),
-            "closed_at": ticket.closed_at.strftime("%d.%m.%Y %H:%M") if ticket.closed_at else "Не закрыт",
-            "rating": ticket.rating
-        }
-        for ticket in tickets
-    ]
-    await state.update_data(tickets=tickets_data, page=0)
+    message_text, keyboard, page = page_view
+
+    # В state храним только номер страницы: сама страница рендерится по запросу
+    await state.update_data(page=page)
+
+    # Отправляем сообщение с клавиатурой
+    await callback_query.message.edit_text(message_text, reply_markup=keyboard)
+
+    await state.set_state(UserStates.VIEWING_TICKET_HISTORY)
+    await callback_query.answer()
+
+    logger.info(f"User {user_id} viewed ticket history")
+
+
+async def _render_ticket_history_page(session: AsyncSession, user: User, page: int):
+    """
+    Формирует одну страницу истории тикетов пользователя.
 
-    # Создаем пагинатор для тикетов
-    paginator = Paginator(tickets_data, page_size=5)
-    page_items = paginator.get_page(0)
+    Args:
+        session: Сессия БД
+        user: Пользователь
+        page: Номер страницы (начиная с 0)
+
+    Returns:
+        Optional[tuple]: (текст, клавиатура, фактический номер страницы) или None, если тикетов нет
+    """
+    # Закрытые тикеты пользователя: недавние в tickets, старые - в архиве
+    columns = ("id", "subject", "created_at", "closed_at", "rating")
+    history = union_all(
+        select(*[Ticket.__table__.c[name] for name in columns]).where(
+            (Ticket.user_id == user.id) & (Ticket.status == TicketStatus.CLOSED)
+        ),
+        select(*[ArchivedTicket.__table__.c[name] for name in columns]).where(
+            ArchivedTicket.user_id == user.id
+        )
+    ).subquery("history")
+
+    total_query = select(func.count()).select_from(history)
+    total = (await session.execute(total_query)).scalar() or 0
+
+    if not total:
+        return None
+
+    total_pages = (total + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+    page = max(0, min(page, total_pages - 1))
+
+    # Загружаем только тикеты текущей страницы
+    tickets_query = select(history).order_by(
+        history.c.created_at.desc(), history.c.id.desc()
+    ).offset(page * HISTORY_PAGE_SIZE).limit(HISTORY_PAGE_SIZE)
+    tickets_result = await session.execute(tickets_query)
+    tickets = tickets_result.all()
 
     # Формируем сообщение со списком тикетов
     message_text = _("ticket_history_title", user.language) + "\n\n"
 
-    for item in page_items:
-        rating_stars = "⭐" * int(item["rating"]) if item["rating"] else "Нет оценки"
+    for ticket in tickets:
+        rating_stars = "⭐" * int(ticket.rating) if ticket.rating else "Нет оценки"
+        closed_at = ticket.closed_at.strftime("%d.%m.%Y %H:%M") if ticket.closed_at else "Не закрыт"
         message_text += (
-            f"🔹 <b>Тикет #{item['id']}</b>\n"
-            f"📝 {item['subject']}\n"
-            f"📅 Создан: {item['created_at']}\n"
-            f"🔒 Закрыт: {item['closed_at']}\n"
+            f"🔹 <b>Тикет #{ticket.id}</b>\n"
+            f"📝 {ticket.subject or _('no_subject', user.language)}\n"
+            f"📅 Создан: {ticket.created_at.strftime('%d.%m.%Y %H:%M')}\n"
+            f"🔒 Закрыт: {closed_at}\n"
             f"⭐ Оценка: {rating_stars}\n\n"
         )
 
-    message_text += _("page_info", user.language, current_page=1, total_pages=paginator.total_pages)
+    message_text += _("page_info", user.language, current_page=page + 1, total_pages=total_pages)
 
-    # Отправляем сообщение с клавиатурой
-    await callback_query.message.edit_text(
-        message_text,
-        reply_markup=KeyboardFactory.paginated_list(
-            tickets_data,
-            0,
-            page_size=5,
-            action_prefix="ticket",
-            back_callback="user:back_to_menu",
-            language=user.language
-        )
+    kb_items = [
+        {"id": ticket.id, "text": f"Тикет #{ticket.id} - {ticket.subject or 'Без темы'}"}
+        for ticket in tickets
+    ]
+    keyboard = KeyboardFactory.paginated_list(
+        kb_items,
+        page,
+        page_size=HISTORY_PAGE_SIZE,
+        action_prefix="ticket",
+        back_callback="user:back_to_menu",
+        language=user.language,
+        total_pages=total_pages
     )
 
-    await state.set_state(UserStates.VIEWING_TICKET_HISTORY)
-    await callback_query.answer()
+    return message_text, keyboard, page
 
-    logger.info(f"User {user_id} viewed ticket history")
+
+@router.callback_query(UserStates.VIEWING_TICKET_HISTORY, F.data.startswith("page:"))
+async def ticket_history_page_wrapper(callback_query: CallbackQuery, state: FSMContext, **kwargs):
+    """
+    Обертка для обработчика переключения страниц истории тикетов
+    """
+    session = kwargs.get("session")
+    if not session:
+        logger.error("Сессия не передана в обработчик ticket_history_page!")
+        await callback_query.answer()
+        return
+
+    return await _process_ticket_history_page(callback_query, session, state)
+
+
+async def _process_ticket_history_page(callback_query: CallbackQuery, session: AsyncSession, state: FSMContext):
+    """
+    Реализация обработчика переключения страниц истории тикетов
+    """
+    user_id = callback_query.from_user.id
+    page = int(callback_query.data.split(":")[1])
+
+    # Получаем пользователя из БД
+    query = select(User).where(User.telegram_id == user_id)
+    result = await session.execute(query)
+    user = result.scalar_one_or_none()
+
+    if not user:
+        await callback_query.answer()
+        return
+
+    page_view = await _render_ticket_history_page(session, user, page)
+
+    if not page_view:
+        await callback_query.message.edit_text(
+            _("ticket_history_title", user.language) + "\n\n" +
+            _("no_closed_tickets", user.language),
+            reply_markup=KeyboardFactory.back_button("user:back_to_menu", user.language)
+        )
+        await callback_query.answer()
+        return
+
+    message_text, keyboard, page = page_view
+    await state.update_data(page=page)
+
+    await callback_query.message.edit_text(message_text, reply_markup=keyboard)
+    await callback_query.answer()
 
 
 @router.callback_query(F.data == "user:active_ticket")
@@ -433,11 +520,7 @@ async def _process_active_ticket(callback_query: CallbackQuery, bot: Bot, sessio
     )
 
     # Получаем сообщения тикета
-    messages_query = select(TicketMessage).where(
-        TicketMessage.ticket_id == ticket.id
-    ).order_by(TicketMessage.sent_at.asc())
-    messages_result = await session.execute(messages_query)
-    messages = messages_result.scalars().all()
+    messages = await load_ticket_messages(session, ticket)
 
     # Отправляем историю сообщений
     if messages:
@@ -625,7 +708,9 @@ async def _process_ticket_message(message: Message, bot: Bot, session: AsyncSess
     # Отправляем подтверждение пользователю
     await message.answer(_("user_message_sent", user.language))
 
-    # Отправляем сообщение модератору
+    # Отправляем сообщение модератору. Кнопка переключает модератора на этот тикет,
+    # если он ведет несколько тикетов одновременно
+    reply_markup = KeyboardFactory.reply_in_ticket(ticket.id, ticket.moderator.language)
     try:
         # Отправляем в зависимости от типа сообщения
         if message_type == MessageType.TEXT:
@@ -633,7 +718,8 @@ async def _process_ticket_message(message: Message, bot: Bot, session: AsyncSess
                 chat_id=ticket.moderator.telegram_id,
                 text=f"📨 <b>Новое сообщение в тикете #{ticket.id}</b>\n\n"
                      f"От: {user.full_name}\n\n"
-                     f"{text}"
+                     f"{text}",
+                reply_markup=reply_markup
             )
         elif message_type == MessageType.PHOTO:
             await bot.send_photo(
@@ -641,7 +727,8 @@ async def _process_ticket_message(message: Message, bot: Bot, session: AsyncSess
                 photo=file_id,
                 caption=f"📨 <b>Новое сообщение в тикете #{ticket.id}</b>\n\n"
                         f"От: {user.full_name}\n\n"
-                        f"{message.caption or ''}"
+                        f"{message.caption or ''}",
+                reply_markup=reply_markup
             )
         elif message_type == MessageType.DOCUMENT:
             await bot.send_document(
@@ -649,7 +736,8 @@ async def _process_ticket_message(message: Message, bot: Bot, session: AsyncSess
                 document=file_id,
                 caption=f"📨 <b>Новое сообщение в тикете #{ticket.id}</b>\n\n"
                         f"От: {user.full_name}\n\n"
-                        f"{message.caption or ''}"
+                        f"{message.caption or ''}",
+                reply_markup=reply_markup
             )
         elif message_type == MessageType.VIDEO:
             await bot.send_video(
@@ -657,7 +745,8 @@ async def _process_ticket_message(message: Message, bot: Bot, session: AsyncSess
                 video=file_id,
                 caption=f"📨 <b>Новое сообщение в тикете #{ticket.id}</b>\n\n"
                         f"От: {user.full_name}\n\n"
-                        f"{message.caption or ''}"
+                        f"{message.caption or ''}",
+                reply_markup=reply_markup
             )
     except Exception as e:
         logger.error(f"Failed to send message to moderator {ticket.moderator.telegram_id}: {e}")
@@ -1020,6 +1109,7 @@ async def _process_language_selection(callback_query: CallbackQuery, session: As
     # Обновляем язык пользователя
     user.language = selected_language
     await session.commit()
+    await get_cache().invalidate_user(user_id)
 
     # Формируем приветственное сообщение в зависимости от выбранного языка
     if selected_language == "ru":
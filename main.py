@@ -5,12 +5,27 @@ from pathlib import Path
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
-from aiogram.fsm.storage.memory import MemoryStorage
 
 from config import load_config
+import database
 from database import init_db, create_tables
 from middlewares import setup_middlewares
+from utils.archive import setup_archive_job
+from utils.assignment import setup_assignment_engine
+from utils.cache import setup_cache, get_cache
+from utils.fsm_storage import create_storage
 from utils.i18n import setup_i18n
+from utils.keyboards import KeyboardFactory
+from utils.locale_watcher import LocaleWatcher
+from utils.metrics import setup_metrics_server
+from utils.overload import get_overload_controller
+from utils.partitions import setup_partition_maintainer
+from utils.presence import setup_presence
+from utils.retention import setup_retention_job
+from utils.search import setup_search
+from utils.slow_queries import get_slow_query_log
+from utils.tickets import setup_ticket_queue
+from utils.rate_limiter import get_rate_limiter
 
 # Настройка логирования
 logging.basicConfig(
@@ -52,12 +67,34 @@ async def main():
 
     await init_db(config)  # Сначала инициализируем БД
     await create_tables()
+    await setup_search(database.engine)
+
+    # Инициализация кэша (в памяти или в Redis)
+    setup_cache(config)
+
+    # Шаг приоритета в очереди неназначенных тикетов
+    setup_ticket_queue(config)
+
+    # Индекс присутствия модераторов восстанавливается из users.last_activity
+    presence = setup_presence(config)
+    async with database.async_session_factory() as session:
+        await presence.warmup(session)
+
     # Инициализация i18n
-    setup_i18n(
+    i18n = setup_i18n(
         locales_dir=str(Path(__file__).parent / 'locales'),
         default_language=config.localization.default_language
     )
 
+    # Готовые клавиатуры содержат переводы - сбрасываем их после перезагрузки
+    i18n.add_reload_callback(KeyboardFactory.clear_cache)
+
+    # Перезагрузка переводов при изменении файлов локализации
+    locale_watcher = None
+    if config.localization.reload_interval > 0:
+        locale_watcher = LocaleWatcher(i18n, config.localization.reload_interval)
+        locale_watcher.start()
+
     # Создание экземпляра бота с использованием DefaultBotProperties
     bot = Bot(
         token=config.tg_bot.token,
@@ -65,7 +102,8 @@ async def main():
     )
 
     # Создание диспетчера
-    storage = MemoryStorage()
+    # Хранилище FSM вытесняет состояния неактивных пользователей
+    storage = create_storage(config)
     dp = Dispatcher(storage=storage)
 
     # Настройка middleware
@@ -74,6 +112,40 @@ async def main():
     # Регистрация всех обработчиков
     register_handlers(dp)
 
+    # Замеры нагрузки для отклонения второстепенных запросов при перегрузке
+    get_overload_controller().start()
+
+    # Автоматическое назначение тикетов свободным модераторам
+    assignment_engine = setup_assignment_engine(bot, storage, config)
+    if assignment_engine:
+        assignment_engine.start()
+
+    # Обслуживание помесячных секций messages (если таблица секционирована).
+    # Определяется до запуска архивации: она не удаляет сообщения из секционированной таблицы
+    partition_maintainer = await setup_partition_maintainer(config)
+    if partition_maintainer:
+        partition_maintainer.start()
+
+    # Перенос старых закрытых тикетов в архивные таблицы
+    archive_job = setup_archive_job(config)
+    if archive_job:
+        archive_job.start()
+
+    # Удаление сообщений старше срока хранения их типа
+    retention_job = setup_retention_job(config)
+    if retention_job:
+        retention_job.start()
+
+    # Метрики в формате Prometheus (/metrics)
+    metrics_server = setup_metrics_server(config, storage)
+    if metrics_server:
+        await metrics_server.start()
+
+    # Периодический отчет журнала медленных запросов (журнал подключается в setup_middlewares)
+    slow_query_log = get_slow_query_log()
+    if slow_query_log:
+        slow_query_log.start()
+
     try:
         logger.info("Бот запущен")
 
@@ -84,7 +156,25 @@ async def main():
         await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     finally:
         logger.info("Бот остановлен")
+        if locale_watcher:
+            await locale_watcher.stop()
+        await get_overload_controller().stop()
+        if assignment_engine:
+            await assignment_engine.stop()
+        if archive_job:
+            await archive_job.stop()
+        if retention_job:
+            await retention_job.stop()
+        if metrics_server:
+            await metrics_server.stop()
+        if slow_query_log:
+            await slow_query_log.stop()
+        if partition_maintainer:
+            await partition_maintainer.stop()
         await bot.session.close()
+        await get_cache().close()
+        if get_rate_limiter():
+            await get_rate_limiter().close()
 
 
 if __name__ == "__main__":
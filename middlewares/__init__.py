@@ -5,11 +5,41 @@ from config import Config
 from middlewares.database import DatabaseMiddleware
 from middlewares.i18n import I18nMiddleware
 from middlewares.user_activity import UserActivityMiddleware
-from middlewares.throttling import ThrottlingMiddleware
+from middlewares.throttling import ThrottlingMiddleware, build_route_costs
+from middlewares.overload import InflightMiddleware, LoadSheddingMiddleware, build_low_priority_routes
+from middlewares.metrics import UpdateMetricsMiddleware, HandlerMetricsMiddleware, TelegramMetricsMiddleware
+from middlewares.query_budget import QueryBudgetMiddleware, QueryHandlerMiddleware
+from utils.i18n import get_i18n
+from utils.metrics import get_metrics
+from utils.query_budget import setup_query_budget
+from utils.slow_queries import setup_slow_query_log
+from utils.overload import setup_overload_controller
+from utils.rate_limiter import setup_rate_limiter
 
 
 # middlewares/__init__.py
 async def setup_middlewares(dp: Dispatcher, bot: Bot, config: Optional[Config] = None):
+    # Подсчет апдейтов в обработке - самый внешний уровень
+    overload = setup_overload_controller(config)
+    dp.update.outer_middleware.register(InflightMiddleware(overload))
+
+    # Метрики апдейтов, обработчиков и запросов к Telegram Bot API
+    if config and config.metrics.enabled:
+        metrics = get_metrics()
+        dp.update.outer_middleware.register(UpdateMetricsMiddleware(metrics))
+        dp.message.middleware.register(HandlerMetricsMiddleware(metrics))
+        dp.callback_query.middleware.register(HandlerMetricsMiddleware(metrics))
+        bot.session.middleware(TelegramMetricsMiddleware(metrics))
+
+    # Учет запросов к БД на каждый апдейт, поиск повторяющихся запросов (N+1)
+    # и журнал медленных запросов; оба используют контекст апдейта с именем обработчика
+    budget = setup_query_budget(config)
+    slow_query_log = setup_slow_query_log(config)
+    if budget or slow_query_log:
+        dp.update.outer_middleware.register(QueryBudgetMiddleware(budget))
+        dp.message.middleware.register(QueryHandlerMiddleware())
+        dp.callback_query.middleware.register(QueryHandlerMiddleware())
+
     # Регистрируем middleware для базы данных
     dp.update.middleware.register(DatabaseMiddleware())
 
@@ -20,5 +50,31 @@ async def setup_middlewares(dp: Dispatcher, bot: Bot, config: Optional[Config] =
     dp.message.middleware.register(UserActivityMiddleware())
     dp.callback_query.middleware.register(UserActivityMiddleware())
 
-    dp.message.middleware.register(ThrottlingMiddleware(rate_limit=0.5))
-    dp.callback_query.middleware.register(ThrottlingMiddleware(rate_limit=0.5))
\ No newline at end of file
+    # Один ограничитель на сообщения и callback-запросы. Регистрируется как outer,
+    # чтобы отклоненные запросы не проходили фильтры и не обращались к БД
+    limiter = setup_rate_limiter(config, build_route_costs())
+
+    # Тексты кнопок в стоимости маршрутов обновляются вместе с переводами
+    def _refresh_route_costs():
+        limiter.route_costs = build_route_costs()
+
+    get_i18n().add_reload_callback(_refresh_route_costs)
+
+    throttling = ThrottlingMiddleware(
+        limiter,
+        notify_interval=config.throttling.notify_interval if config else 10.0
+    )
+    dp.message.outer_middleware.register(throttling)
+    dp.callback_query.outer_middleware.register(throttling)
+
+    # При перегрузке второстепенные запросы отклоняются до фильтров и обращений к БД
+    # Тексты кнопок второстепенных маршрутов тоже берутся из переводов
+    shedding = LoadSheddingMiddleware(overload)
+
+    def _refresh_low_priority_routes():
+        shedding.routes = build_low_priority_routes()
+
+    get_i18n().add_reload_callback(_refresh_low_priority_routes)
+
+    dp.message.outer_middleware.register(shedding)
+    dp.callback_query.outer_middleware.register(shedding)
\ No newline at end of file
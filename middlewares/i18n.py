@@ -2,16 +2,17 @@ from typing import Dict, Any, Callable, Awaitable, Optional, Union
 from aiogram import BaseMiddleware
 from aiogram.types import Message, CallbackQuery, TelegramObject
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
-from models import User
-from utils.i18n import get_i18n
+from utils.cache import get_cached_user
+from utils.i18n import set_current_language, reset_current_language
 
 
 class I18nMiddleware(BaseMiddleware):
     """
     Middleware для работы с локализацией.
-    Устанавливает текущий язык пользователя на основе данных из БД.
+    Устанавливает язык пользователя для текущего апдейта на основе данных из БД.
+    Язык хранится в contextvar, поэтому _() и KeyboardFactory используют его,
+    даже если язык не передан явно.
     """
 
     async def __call__(
@@ -35,19 +36,20 @@ class I18nMiddleware(BaseMiddleware):
             # Если сессии нет, передаем управление дальше
             return await handler(event, data)
 
-        # Получаем пользователя из БД
-        query = select(User).where(User.telegram_id == user_id)
-        result = await session.execute(query)
-        user = result.scalar_one_or_none()
+        # Получаем пользователя из кэша (БД - только при промахе)
+        user = await get_cached_user(session, user_id)
 
-        # Если пользователь найден, устанавливаем его язык
-        if user:
-            # Сохраняем язык пользователя в data
-            data["user_language"] = user.language
+        # Если пользователь не найден, используется язык по умолчанию
+        if not user:
+            return await handler(event, data)
 
-            # Устанавливаем текущий язык в i18n менеджере
-            i18n = get_i18n()
-            i18n.current_language = user.language
+        # Сохраняем язык пользователя в data
+        data["user_language"] = user["language"]
 
-        # Передаем управление дальше
-        return await handler(event, data)
\ No newline at end of file
+        # Устанавливаем язык только для текущего апдейта
+        token = set_current_language(user["language"])
+        try:
+            # Передаем управление дальше
+            return await handler(event, data)
+        finally:
+            reset_current_language(token)
\ No newline at end of file
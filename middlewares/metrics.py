@@ -0,0 +1,128 @@
+import time
+from typing import Dict, Any, Callable, Awaitable
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.exceptions import (
+    TelegramBadRequest, TelegramUnauthorizedError, TelegramForbiddenError, TelegramNotFound,
+    TelegramConflictError, TelegramEntityTooLarge, TelegramRetryAfter, TelegramServerError,
+    TelegramNetworkError,
+)
+from aiogram.methods import TelegramMethod, Response
+from aiogram.types import TelegramObject, Update
+
+from utils.metrics import MetricsRegistry
+
+# Коды ответа Telegram Bot API по типу исключения aiogram
+TELEGRAM_ERROR_CODES = (
+    (TelegramBadRequest, "400"),
+    (TelegramUnauthorizedError, "401"),
+    (TelegramForbiddenError, "403"),
+    (TelegramNotFound, "404"),
+    (TelegramConflictError, "409"),
+    (TelegramEntityTooLarge, "413"),
+    (TelegramRetryAfter, "429"),
+    (TelegramServerError, "5xx"),
+    (TelegramNetworkError, "network"),
+)
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """
+    Middleware для подсчета апдейтов по типу и результату (handled, unhandled, error)
+    и длительности их обработки.
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        """
+        Инициализирует middleware.
+
+        Args:
+            registry: Реестр метрик
+        """
+        self.registry = registry
+        super().__init__()
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        update_type = event.event_type if isinstance(event, Update) else type(event).__name__
+        outcome = "error"
+        started = time.perf_counter()
+        try:
+            result = await handler(event, data)
+            outcome = "unhandled" if result is UNHANDLED else "handled"
+            return result
+        finally:
+            self.registry.update_duration.observe(time.perf_counter() - started, update_type)
+            self.registry.updates.inc(update_type, outcome)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Middleware для замера длительности каждого обработчика (метка - имя функции обработчика).
+    Регистрируется как внутренний, чтобы обработчик был уже выбран фильтрами.
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        """
+        Инициализирует middleware.
+
+        Args:
+            registry: Реестр метрик
+        """
+        self.registry = registry
+        super().__init__()
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = getattr(handler_object.callback, "__name__", "unknown") if handler_object else "unknown"
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            self.registry.handler_duration.observe(time.perf_counter() - started, name)
+
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    """
+    Middleware сессии бота для подсчета запросов к Telegram Bot API по методу
+    и коду ответа и длительности запросов.
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        """
+        Инициализирует middleware.
+
+        Args:
+            registry: Реестр метрик
+        """
+        self.registry = registry
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType,
+            bot: Bot,
+            method: TelegramMethod
+    ) -> Response:
+        name = type(method).__name__
+        code = "error"
+        started = time.perf_counter()
+        try:
+            response = await make_request(bot, method)
+            code = "200"
+            return response
+        except Exception as e:
+            code = next((error_code for error, error_code in TELEGRAM_ERROR_CODES if isinstance(e, error)), "error")
+            raise
+        finally:
+            self.registry.telegram_duration.observe(time.perf_counter() - started, name)
+            self.registry.telegram_requests.inc(name, code)
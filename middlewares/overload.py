@@ -0,0 +1,137 @@
+import logging
+from typing import Dict, Any, Callable, Awaitable, FrozenSet, Optional
+from aiogram import BaseMiddleware
+from aiogram.types import Message, CallbackQuery, TelegramObject
+
+from utils.cache import get_cache
+from utils.i18n import _, get_i18n
+from utils.overload import OverloadController
+
+logger = logging.getLogger(__name__)
+
+# Второстепенные маршруты (тяжелые отчеты), которые отклоняются первыми при перегрузке:
+# callback data (с параметрами сравнивается префикс до последнего двоеточия, например page:N) и команды.
+# Создание тикетов и переписка по тикетам сюда не входят
+LOW_PRIORITY_ROUTES: FrozenSet[str] = frozenset({
+    "admin:stats",
+    "mod:my_stats",
+    "user:ticket_history",
+    "page",
+    "/i18n_report",
+})
+
+# Кнопки Reply Keyboard тех же отчетов: ключи перевода, текст берется на всех языках
+LOW_PRIORITY_BUTTONS: FrozenSet[str] = frozenset({
+    "menu_general_stats",
+    "menu_my_stats",
+    "menu_ticket_history",
+})
+
+
+def build_low_priority_routes() -> FrozenSet[str]:
+    """
+    Собирает второстепенные маршруты: callback data, команды и тексты кнопок на всех языках.
+
+    Returns:
+        FrozenSet[str]: Маршруты, которые можно отклонять при перегрузке
+    """
+    i18n = get_i18n()
+    buttons = {text for key in LOW_PRIORITY_BUTTONS for text in i18n.get_variants(key)}
+    return LOW_PRIORITY_ROUTES | buttons
+
+
+class InflightMiddleware(BaseMiddleware):
+    """
+    Middleware для подсчета апдейтов, которые обрабатываются в данный момент.
+    """
+
+    def __init__(self, controller: OverloadController):
+        """
+        Инициализирует middleware.
+
+        Args:
+            controller: Контроллер перегрузки
+        """
+        self.controller = controller
+        super().__init__()
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        self.controller.inflight += 1
+        try:
+            return await handler(event, data)
+        finally:
+            self.controller.inflight -= 1
+
+
+class LoadSheddingMiddleware(BaseMiddleware):
+    """
+    Middleware для отклонения второстепенных запросов при перегрузке.
+    Вместо обработки пользователь сразу получает ответ "сервис занят, повторите позже",
+    без обращения к БД.
+    """
+
+    def __init__(self, controller: OverloadController, routes: Optional[FrozenSet[str]] = None):
+        """
+        Инициализирует middleware.
+
+        Args:
+            controller: Контроллер перегрузки
+            routes: Маршруты (callback data, префиксы callback data или текст сообщения),
+                которые можно отклонять (по умолчанию - build_low_priority_routes())
+        """
+        self.controller = controller
+        self.routes = routes if routes is not None else build_low_priority_routes()
+        super().__init__()
+
+    def is_low_priority(self, route: Optional[str]) -> bool:
+        """
+        Проверяет, можно ли отклонить маршрут при перегрузке.
+
+        Args:
+            route: Callback data или текст сообщения
+
+        Returns:
+            bool: True для второстепенного маршрута
+        """
+        if not route:
+            return False
+        if route in self.routes:
+            return True
+        return ":" in route and route.rsplit(":", 1)[0] in self.routes
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        if not self.controller.overloaded:
+            return await handler(event, data)
+
+        if isinstance(event, Message):
+            route = event.text
+        elif isinstance(event, CallbackQuery):
+            route = event.data
+        else:
+            return await handler(event, data)
+
+        if not self.is_low_priority(route):
+            return await handler(event, data)
+
+        self.controller.stats["shed"] += 1
+
+        # Язык берем только из кэша, чтобы не нагружать БД
+        user = await get_cache().get_user(event.from_user.id) if event.from_user else None
+        text = _("error_busy_retry", user["language"] if user else None)
+
+        try:
+            await event.answer(text)
+        except Exception as e:
+            logger.error(f"Не удалось отправить ответ о перегрузке: {e}")
+
+        return None
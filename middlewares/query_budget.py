@@ -0,0 +1,67 @@
+from typing import Dict, Any, Callable, Awaitable, Optional
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from utils.metrics import get_metrics
+from utils.query_budget import QueryBudget, start_update, finish_update, current_update
+
+
+class QueryBudgetMiddleware(BaseMiddleware):
+    """
+    Middleware для учета запросов к БД на каждый апдейт: задает счетчик запросов
+    в контексте обработки и после нее проверяет бюджет (utils.query_budget).
+    По этому же контексту журнал медленных запросов (utils.slow_queries) определяет
+    обработчик, поэтому без бюджета middleware только задает контекст.
+    """
+
+    def __init__(self, budget: Optional[QueryBudget] = None):
+        """
+        Инициализирует middleware.
+
+        Args:
+            budget: Бюджет запросов (None - только контекст апдейта)
+        """
+        self.budget = budget
+        super().__init__()
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        update_id = update_type = None
+        if isinstance(event, Update):
+            update_id = event.update_id
+            try:
+                update_type = event.event_type
+            except LookupError:
+                # Апдейт неизвестного этой версии aiogram типа
+                pass
+        queries, token = start_update(update_id, update_type)
+        try:
+            return await handler(event, data)
+        finally:
+            finish_update(token)
+            if self.budget is not None:
+                self.budget.check(queries)
+                get_metrics().update_queries.observe(queries.count, queries.handler or "none")
+
+
+class QueryHandlerMiddleware(BaseMiddleware):
+    """
+    Middleware для записи имени выбранного обработчика в счетчик запросов апдейта,
+    чтобы сводка и метрики показывали, какой обработчик выполнил запросы.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        queries = current_update()
+        handler_object = data.get("handler")
+        if queries is not None and handler_object is not None:
+            queries.handler = getattr(handler_object.callback, "__name__", None)
+        return await handler(event, data)
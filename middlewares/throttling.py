@@ -1,26 +1,71 @@
-import time
-from typing import Dict, Any, Callable, Awaitable, Union
+import logging
+from typing import Dict, Any, Callable, Awaitable, Optional
 from aiogram import BaseMiddleware
 from aiogram.types import Message, CallbackQuery, TelegramObject
 from cachetools import TTLCache
 
+from utils.cache import get_cache
+from utils.i18n import _, get_i18n
+from utils.rate_limiter import TokenBucketLimiter
+
+logger = logging.getLogger(__name__)
+
+# Стоимость маршрутов (callback data) в токенах (по умолчанию - 1).
+# Экраны статистики и истории выполняют тяжелые запросы к БД, поэтому стоят дороже
+DEFAULT_ROUTE_COSTS: Dict[str, float] = {
+    "admin:stats": 3,
+    "mod:my_stats": 3,
+    "user:ticket_history": 2,
+    "mod:unassigned_tickets": 2,
+    "page": 1.5,
+}
+
+# Те же экраны, открытые кнопкой Reply Keyboard: ключ перевода текста кнопки -> стоимость.
+# Текст кнопки берется из каталогов всех языков (см. build_route_costs)
+BUTTON_ROUTE_COSTS: Dict[str, float] = {
+    "menu_general_stats": 3,
+    "menu_my_stats": 3,
+    "menu_ticket_history": 2,
+    "menu_unassigned_tickets": 2,
+}
+
+
+def build_route_costs() -> Dict[str, float]:
+    """
+    Собирает стоимость маршрутов: callback data и тексты кнопок на всех языках.
+
+    Returns:
+        Dict[str, float]: Маршрут (callback data или текст кнопки) -> стоимость
+    """
+    costs = dict(DEFAULT_ROUTE_COSTS)
+    i18n = get_i18n()
+    for key, cost in BUTTON_ROUTE_COSTS.items():
+        for text in i18n.get_variants(key):
+            costs[text] = cost
+    return costs
+
 
 class ThrottlingMiddleware(BaseMiddleware):
     """
     Middleware для защиты от спама.
-    Ограничивает частоту запросов от пользователей.
+    Ограничивает частоту запросов от пользователей с помощью общего для
+    сообщений и callback-запросов ограничителя (token bucket).
     """
 
-    def __init__(self, rate_limit: float = 0.5):
+    def __init__(self, limiter: TokenBucketLimiter, notify_interval: float = 10.0):
         """
-        Инициализирует middleware с указанием ограничения.
+        Инициализирует middleware.
 
         Args:
-            rate_limit: Минимальный интервал между запросами в секундах
+            limiter: Ограничитель частоты запросов
+            notify_interval: Интервал в секундах, чаще которого пользователь
+                не получает уведомление об ограничении
         """
-        self.rate_limit = rate_limit
-        # TTLCache: максимальное количество элементов, время жизни элемента в секундах
-        self.cache = TTLCache(maxsize=10000, ttl=rate_limit)
+        self.limiter = limiter
+        self.notify_interval = notify_interval
+        # Пользователи, которые уже получили уведомление в текущем интервале
+        self._notified = TTLCache(maxsize=10000, ttl=notify_interval)
+        self.stats: Dict[str, int] = {"notified": 0}
         super().__init__()
 
     async def __call__(
@@ -29,36 +74,69 @@ class ThrottlingMiddleware(BaseMiddleware):
             event: TelegramObject,
             data: Dict[str, Any]
     ) -> Any:
-        # Получаем telegram_id пользователя
+        # Определяем пользователя и маршрут
         if isinstance(event, Message):
-            user_id = event.from_user.id
+            route = event.text
         elif isinstance(event, CallbackQuery):
-            user_id = event.from_user.id
+            route = event.data
         else:
             # Если не Message и не CallbackQuery, просто передаем управление дальше
             return await handler(event, data)
 
-        # Получаем текущее время
-        current_time = time.time()
-
-        # Проверяем, было ли недавно сообщение от этого пользователя
-        if user_id in self.cache:
-            # Определяем, сколько времени прошло с последнего запроса
-            last_time = self.cache[user_id]
-            elapsed = current_time - last_time
-
-            # Если прошло меньше времени, чем ограничение, игнорируем запрос
-            if elapsed < self.rate_limit:
-                # Для CallbackQuery отправляем уведомление
-                if isinstance(event, CallbackQuery):
-                    await event.answer(
-                        f"Пожалуйста, не так быстро! Подождите {self.rate_limit - elapsed:.1f} сек.",
-                        show_alert=True
-                    )
-                return None
-
-        # Обновляем время последнего запроса
-        self.cache[user_id] = current_time
-
-        # Передаем управление дальше
-        return await handler(event, data)
\ No newline at end of file
+        if not event.from_user:
+            return await handler(event, data)
+        user_id = event.from_user.id
+
+        wait = await self.limiter.acquire(user_id, self.limiter.cost_for(route))
+        if not wait:
+            # Передаем управление дальше
+            return await handler(event, data)
+
+        self.limiter.record_throttled(self._route_key(event, route))
+
+        # Уведомляем пользователя не чаще одного раза за интервал,
+        # чтобы спам не превращался в поток запросов к Telegram API
+        if user_id not in self._notified:
+            self._notified[user_id] = True
+            self.stats["notified"] += 1
+            await self._notify(event, user_id, wait)
+
+        return None
+
+    def _route_key(self, event: TelegramObject, route: Optional[str]) -> str:
+        """
+        Ключ маршрута для статистики отказов. Текст сообщения и callback data задает
+        пользователь, поэтому в статистику попадают только известные маршруты
+        и префиксы callback data, а не произвольные строки.
+        """
+        if route and route in self.limiter.route_costs:
+            return route
+        if isinstance(event, CallbackQuery):
+            if route and ":" in route:
+                return route.rsplit(":", 1)[0]
+            return "callback"
+        return "message"
+
+    async def _notify(self, event: TelegramObject, user_id: int, wait: float) -> None:
+        """Отправляет пользователю уведомление об ограничении."""
+        # Язык берем только из кэша, чтобы не обращаться к БД для отклоненного запроса
+        user = await get_cache().get_user(user_id)
+        language = user["language"] if user else None
+        text = _("error_throttled", language, seconds=f"{wait:.1f}")
+
+        try:
+            if isinstance(event, CallbackQuery):
+                await event.answer(text, show_alert=True)
+            else:
+                await event.answer(text)
+        except Exception as e:
+            logger.error(f"Не удалось отправить уведомление об ограничении пользователю {user_id}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Возвращает счетчики ограничителя и уведомлений.
+
+        Returns:
+            Dict[str, Any]: Статистика
+        """
+        return {**self.limiter.get_stats(), **self.stats}
@@ -6,6 +6,7 @@ from sqlalchemy import select, update
 from datetime import datetime
 
 from models import User
+from utils.presence import get_presence
 
 
 class UserActivityMiddleware(BaseMiddleware):
@@ -29,6 +30,9 @@ class UserActivityMiddleware(BaseMiddleware):
             # Если не Message и не CallbackQuery, просто передаем управление дальше
             return await handler(event, data)
 
+        # Индекс присутствия обновляется в памяти, без обращения к БД
+        get_presence().touch(user_id)
+
         # Получаем сессию БД
         session = data.get("session")
         if not session:
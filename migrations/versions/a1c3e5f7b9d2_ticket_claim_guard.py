@@ -0,0 +1,59 @@
+"""ticket claim guard
+
+Revision ID: a1c3e5f7b9d2
+Revises: 
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c3e5f7b9d2'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "uq_tickets_active_moderator"
+
+
+def upgrade():
+    # Таблицы могли быть созданы через create_tables(), поэтому проверяем текущую схему
+    inspector = sa.inspect(op.get_bind())
+    columns = {column["name"] for column in inspector.get_columns("tickets")}
+
+    if "active_moderator_id" not in columns:
+        op.add_column(
+            "tickets",
+            sa.Column(
+                "active_moderator_id",
+                sa.Integer(),
+                sa.Computed("CASE WHEN status = 'IN_PROGRESS' THEN moderator_id END", persisted=False),
+                nullable=True
+            )
+        )
+
+    indexes = {index["name"] for index in inspector.get_indexes("tickets")}
+    if INDEX_NAME in indexes:
+        return
+
+    # Уникальный индекс не создастся, если у какого-то модератора уже несколько тикетов в работе
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT moderator_id, COUNT(*) FROM tickets "
+        "WHERE status = 'IN_PROGRESS' AND moderator_id IS NOT NULL "
+        "GROUP BY moderator_id HAVING COUNT(*) > 1"
+    )).fetchall()
+    if duplicates:
+        details = ", ".join(f"модератор {row[0]}: {row[1]} тикетов" for row in duplicates)
+        raise RuntimeError(
+            f"Нельзя создать {INDEX_NAME}: у модераторов несколько тикетов в работе ({details}). "
+            f"Переназначьте или закройте лишние тикеты и повторите миграцию."
+        )
+
+    op.create_index(INDEX_NAME, "tickets", ["active_moderator_id"], unique=True)
+
+
+def downgrade():
+    op.drop_index(INDEX_NAME, table_name="tickets")
+    op.drop_column("tickets", "active_moderator_id")
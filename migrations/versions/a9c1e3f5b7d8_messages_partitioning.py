@@ -0,0 +1,81 @@
+"""messages partitioning
+
+Revision ID: a9c1e3f5b7d8
+Revises: f8b0d2e4a6c7
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+from config import load_config
+from utils.partitions import initial_partitions
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c1e3f5b7d8'
+down_revision = 'f8b0d2e4a6c7'
+branch_labels = None
+depends_on = None
+
+
+def _is_partitioned(bind):
+    return bool(bind.execute(sa.text(
+        "SELECT COUNT(*) FROM information_schema.partitions "
+        "WHERE table_schema = DATABASE() AND table_name = 'messages' AND partition_name IS NOT NULL"
+    )).scalar())
+
+
+def upgrade():
+    bind = op.get_bind()
+    # Таблицы могли быть созданы через create_tables(), поэтому проверяем текущую схему
+    inspector = sa.inspect(bind)
+
+    message_indexes = {index["name"] for index in inspector.get_indexes("messages")}
+    if "ix_messages_ticket_sent" not in message_indexes:
+        op.create_index("ix_messages_ticket_sent", "messages", ["ticket_id", "sent_at"])
+
+    # Секционирование только для MySQL и только при MESSAGES_PARTITIONING=true
+    partitions = load_config().partitions
+    if bind.dialect.name != "mysql" or not partitions.enabled or _is_partitioned(bind):
+        return
+
+    # Ограничения MySQL для секционированных таблиц: нет внешних ключей и FULLTEXT-индексов,
+    # а каждый уникальный ключ (включая первичный) содержит столбец секционирования.
+    # Каскадное удаление сообщений выполняет ORM (Ticket.messages) и задача архивации,
+    # поиск по живым сообщениям переходит на LIKE по недавним секциям (utils.search)
+    for foreign_key in inspector.get_foreign_keys("messages"):
+        op.drop_constraint(foreign_key["name"], "messages", type_="foreignkey")
+
+    if "ft_messages_text" in message_indexes:
+        op.drop_index("ft_messages_text", table_name="messages")
+
+    op.execute("UPDATE messages SET sent_at = NOW() WHERE sent_at IS NULL")
+    op.alter_column("messages", "sent_at", existing_type=sa.DateTime(), nullable=False,
+                    server_default=sa.text("CURRENT_TIMESTAMP"))
+    op.execute("ALTER TABLE messages DROP PRIMARY KEY, ADD PRIMARY KEY (id, sent_at)")
+
+    # По секции на каждый месяц от самого старого сообщения и на months_ahead месяцев вперед.
+    # Таблица перестраивается целиком, миграцию лучше запускать в период низкой нагрузки
+    oldest = bind.execute(sa.text("SELECT MIN(sent_at) FROM messages")).scalar()
+    definitions = initial_partitions(oldest, datetime.now(), partitions.months_ahead)
+    op.execute(f"ALTER TABLE messages PARTITION BY RANGE COLUMNS(sent_at) ({', '.join(definitions)})")
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == "mysql" and _is_partitioned(bind):
+        op.execute("ALTER TABLE messages REMOVE PARTITIONING")
+        op.execute("ALTER TABLE messages DROP PRIMARY KEY, ADD PRIMARY KEY (id)")
+        op.alter_column("messages", "sent_at", existing_type=sa.DateTime(), nullable=True,
+                        server_default=None)
+        op.create_index("ft_messages_text", "messages", ["text"], mysql_prefix="FULLTEXT")
+        # Сообщения архивных тикетов оставались в секциях до их удаления (копии есть в messages_archive)
+        op.execute("DELETE FROM messages WHERE ticket_id NOT IN (SELECT id FROM tickets)")
+        op.create_foreign_key(None, "messages", "tickets", ["ticket_id"], ["id"], ondelete="CASCADE")
+        op.create_foreign_key(None, "messages", "users", ["sender_id"], ["id"])
+
+    op.drop_index("ix_messages_ticket_sent", table_name="messages")
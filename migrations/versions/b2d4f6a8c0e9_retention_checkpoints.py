@@ -0,0 +1,34 @@
+"""retention checkpoints
+
+Revision ID: b2d4f6a8c0e9
+Revises: a9c1e3f5b7d8
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2d4f6a8c0e9'
+down_revision = 'a9c1e3f5b7d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Таблица могла быть создана через create_tables(), поэтому проверяем текущую схему
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("retention_checkpoints"):
+        op.create_table(
+            "retention_checkpoints",
+            sa.Column("policy", sa.String(64), primary_key=True),
+            sa.Column("last_id", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("deleted", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("updated_at", sa.DateTime()),
+        )
+
+
+def downgrade():
+    op.drop_table("retention_checkpoints")
@@ -0,0 +1,39 @@
+"""ticket queue order
+
+Revision ID: b4d6f8a0c2e1
+Revises: a1c3e5f7b9d2
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4d6f8a0c2e1'
+down_revision = 'a1c3e5f7b9d2'
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "ix_tickets_queue"
+
+
+def upgrade():
+    # Таблицы могли быть созданы через create_tables(), поэтому проверяем текущую схему
+    inspector = sa.inspect(op.get_bind())
+    columns = {column["name"] for column in inspector.get_columns("tickets")}
+
+    if "queue_at" not in columns:
+        op.add_column("tickets", sa.Column("queue_at", sa.DateTime(), nullable=True))
+
+        # До этой миграции приоритет нигде не выставлялся, поэтому позиция в очереди - время создания
+        op.execute("UPDATE tickets SET queue_at = created_at WHERE queue_at IS NULL")
+
+    indexes = {index["name"] for index in inspector.get_indexes("tickets")}
+    if INDEX_NAME not in indexes:
+        op.create_index(INDEX_NAME, "tickets", ["status", "moderator_id", "queue_at"])
+
+
+def downgrade():
+    op.drop_index(INDEX_NAME, table_name="tickets")
+    op.drop_column("tickets", "queue_at")
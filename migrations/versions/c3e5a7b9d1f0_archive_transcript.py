@@ -0,0 +1,33 @@
+"""archive transcript
+
+Revision ID: c3e5a7b9d1f0
+Revises: b2d4f6a8c0e9
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e5a7b9d1f0'
+down_revision = 'b2d4f6a8c0e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Столбец мог быть создан через create_tables(), поэтому проверяем текущую схему
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("tickets_archive")}
+
+    if "transcript" not in columns:
+        op.add_column(
+            "tickets_archive",
+            sa.Column("transcript", sa.LargeBinary().with_variant(mysql.MEDIUMBLOB(), "mysql"), nullable=True)
+        )
+
+
+def downgrade():
+    # Перед откатом сжатую переписку нужно распаковать в messages_archive, иначе она будет потеряна
+    op.drop_column("tickets_archive", "transcript")
@@ -0,0 +1,59 @@
+"""moderator capacity
+
+Revision ID: c7e9a1b3d5f4
+Revises: b4d6f8a0c2e1
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e9a1b3d5f4'
+down_revision = 'b4d6f8a0c2e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Таблицы могли быть созданы через create_tables(), поэтому проверяем текущую схему
+    inspector = sa.inspect(op.get_bind())
+
+    # Правило "один тикет на модератора" заменяется счетчиком users.active_tickets
+    ticket_indexes = {index["name"] for index in inspector.get_indexes("tickets")}
+    if "uq_tickets_active_moderator" in ticket_indexes:
+        op.drop_index("uq_tickets_active_moderator", table_name="tickets")
+
+    ticket_columns = {column["name"] for column in inspector.get_columns("tickets")}
+    if "active_moderator_id" in ticket_columns:
+        op.drop_column("tickets", "active_moderator_id")
+
+    user_columns = {column["name"] for column in inspector.get_columns("users")}
+    if "max_active_tickets" not in user_columns:
+        op.add_column("users", sa.Column("max_active_tickets", sa.Integer(), nullable=False, server_default="1"))
+    if "active_tickets" not in user_columns:
+        op.add_column("users", sa.Column("active_tickets", sa.Integer(), nullable=False, server_default="0"))
+
+    # Заполняем счетчик по тикетам, которые сейчас в работе
+    op.execute(
+        "UPDATE users SET active_tickets = ("
+        "SELECT COUNT(*) FROM tickets "
+        "WHERE tickets.moderator_id = users.id AND tickets.status = 'IN_PROGRESS')"
+    )
+
+
+def downgrade():
+    op.drop_column("users", "active_tickets")
+    op.drop_column("users", "max_active_tickets")
+
+    op.add_column(
+        "tickets",
+        sa.Column(
+            "active_moderator_id",
+            sa.Integer(),
+            sa.Computed("CASE WHEN status = 'IN_PROGRESS' THEN moderator_id END", persisted=False),
+            nullable=True
+        )
+    )
+    op.create_index("uq_tickets_active_moderator", "tickets", ["active_moderator_id"], unique=True)
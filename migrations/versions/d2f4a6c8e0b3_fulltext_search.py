@@ -0,0 +1,43 @@
+"""fulltext search
+
+Revision ID: d2f4a6c8e0b3
+Revises: c7e9a1b3d5f4
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f4a6c8e0b3'
+down_revision = 'c7e9a1b3d5f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    # В SQLite полнотекстовый индекс (FTS5) создает utils.search.setup_search() при запуске
+    if bind.dialect.name != "mysql":
+        return
+
+    inspector = sa.inspect(bind)
+
+    # Первый FULLTEXT-индекс на таблице InnoDB перестраивает ее (добавляется FTS_DOC_ID),
+    # поэтому на большой таблице messages миграцию лучше запускать в период низкой нагрузки
+    ticket_indexes = {index["name"] for index in inspector.get_indexes("tickets")}
+    if "ft_tickets_subject" not in ticket_indexes:
+        op.create_index("ft_tickets_subject", "tickets", ["subject"], mysql_prefix="FULLTEXT")
+
+    message_indexes = {index["name"] for index in inspector.get_indexes("messages")}
+    if "ft_messages_text" not in message_indexes:
+        op.create_index("ft_messages_text", "messages", ["text"], mysql_prefix="FULLTEXT")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "mysql":
+        return
+
+    op.drop_index("ft_messages_text", table_name="messages")
+    op.drop_index("ft_tickets_subject", table_name="tickets")
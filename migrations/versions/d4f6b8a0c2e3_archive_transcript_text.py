@@ -0,0 +1,73 @@
+"""archive transcript text
+
+Revision ID: d4f6b8a0c2e3
+Revises: c3e5a7b9d1f0
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+from utils.transcript import unpack_transcript, transcript_text
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f6b8a0c2e3'
+down_revision = 'c3e5a7b9d1f0'
+branch_labels = None
+depends_on = None
+
+# Сколько архивных тикетов со сжатой перепиской заполняется за один запрос
+BACKFILL_BATCH_SIZE = 500
+
+
+def upgrade():
+    bind = op.get_bind()
+    # Столбец мог быть создан через create_tables(), поэтому проверяем текущую схему
+    inspector = sa.inspect(bind)
+    columns = {column["name"] for column in inspector.get_columns("tickets_archive")}
+
+    if "transcript_text" not in columns:
+        op.add_column(
+            "tickets_archive",
+            sa.Column("transcript_text", sa.Text().with_variant(mysql.MEDIUMTEXT(), "mysql"), nullable=True)
+        )
+
+    # Блоки, записанные до этой миграции (версия 1), содержат текст: копируем его в transcript_text,
+    # чтобы поиск находил и эти тикеты. Сами блоки остаются в версии 1 и читаются без transcript_text
+    archive = sa.table("tickets_archive", sa.column("id", sa.Integer()), sa.column("transcript", sa.LargeBinary()),
+                       sa.column("transcript_text", sa.Text()))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(archive.c.id, archive.c.transcript).where(
+                (archive.c.id > last_id) &
+                archive.c.transcript.isnot(None) &
+                archive.c.transcript_text.is_(None)
+            ).order_by(archive.c.id).limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            sa.update(archive).where(archive.c.id == sa.bindparam("ticket_id"))
+            .values(transcript_text=sa.bindparam("packed_text")),
+            [
+                {"ticket_id": ticket_id, "packed_text": transcript_text(unpack_transcript(transcript))}
+                for ticket_id, transcript in rows
+            ]
+        )
+        last_id = rows[-1].id
+
+    # В SQLite полнотекстовый индекс (FTS5) создает utils.search.setup_search() при запуске
+    if bind.dialect.name == "mysql":
+        indexes = {index["name"] for index in inspector.get_indexes("tickets_archive")}
+        if "ft_tickets_archive_transcript_text" not in indexes:
+            op.create_index("ft_tickets_archive_transcript_text", "tickets_archive", ["transcript_text"],
+                            mysql_prefix="FULLTEXT")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "mysql":
+        op.drop_index("ft_tickets_archive_transcript_text", table_name="tickets_archive")
+    op.drop_column("tickets_archive", "transcript_text")
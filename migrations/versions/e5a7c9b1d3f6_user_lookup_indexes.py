@@ -0,0 +1,55 @@
+"""user lookup indexes
+
+Revision ID: e5a7c9b1d3f6
+Revises: d2f4a6c8e0b3
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a7c9b1d3f6'
+down_revision = 'd2f4a6c8e0b3'
+branch_labels = None
+depends_on = None
+
+
+def _index_names(bind, table):
+    """Имена индексов таблицы, включая индексы по выражению (инспектор SQLAlchemy их пропускает)."""
+    if bind.dialect.name == "mysql":
+        rows = bind.execute(sa.text(
+            "SELECT DISTINCT index_name FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = :table"
+        ), {"table": table})
+        return {row[0] for row in rows}
+    if bind.dialect.name == "sqlite":
+        return {row[1] for row in bind.execute(sa.text(f"PRAGMA index_list({table})"))}
+    return {index["name"] for index in sa.inspect(bind).get_indexes(table)}
+
+
+def upgrade():
+    # Таблицы могли быть созданы через create_tables(), поэтому проверяем текущую схему
+    bind = op.get_bind()
+
+    # Индексы по выражению lower(...) требуют MySQL 8.0.13+
+    user_indexes = _index_names(bind, "users")
+    if "ix_users_username_lower" not in user_indexes:
+        op.create_index("ix_users_username_lower", "users", [sa.func.lower(sa.column("username"))])
+    if "ix_users_first_name_lower" not in user_indexes:
+        op.create_index("ix_users_first_name_lower", "users", [sa.func.lower(sa.column("first_name"))])
+
+    ticket_indexes = _index_names(bind, "tickets")
+    if "ix_tickets_user_created" not in ticket_indexes:
+        op.create_index("ix_tickets_user_created", "tickets", ["user_id", "created_at"])
+
+
+def downgrade():
+    # В MySQL составной индекс может обслуживать внешний ключ tickets.user_id -
+    # перед удалением создаем отдельный индекс для него
+    if op.get_bind().dialect.name == "mysql":
+        op.create_index("ix_tickets_user_id", "tickets", ["user_id"])
+    op.drop_index("ix_tickets_user_created", table_name="tickets")
+    op.drop_index("ix_users_first_name_lower", table_name="users")
+    op.drop_index("ix_users_username_lower", table_name="users")
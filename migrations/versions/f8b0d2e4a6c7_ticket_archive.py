@@ -0,0 +1,72 @@
+"""ticket archive
+
+Revision ID: f8b0d2e4a6c7
+Revises: e5a7c9b1d3f6
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f8b0d2e4a6c7'
+down_revision = 'e5a7c9b1d3f6'
+branch_labels = None
+depends_on = None
+
+TICKET_STATUS = sa.Enum("OPEN", "IN_PROGRESS", "RESOLVED", "CLOSED", name="ticketstatus")
+MESSAGE_TYPE = sa.Enum("TEXT", "PHOTO", "VIDEO", "DOCUMENT", "AUDIO", "VOICE", "SYSTEM", name="messagetype")
+
+
+def upgrade():
+    bind = op.get_bind()
+    # Таблицы могли быть созданы через create_tables(), поэтому проверяем текущую схему
+    inspector = sa.inspect(bind)
+    is_mysql = bind.dialect.name == "mysql"
+
+    if not inspector.has_table("tickets_archive"):
+        op.create_table(
+            "tickets_archive",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("moderator_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="SET NULL"), nullable=True),
+            sa.Column("status", TICKET_STATUS, nullable=False),
+            sa.Column("subject", sa.String(255), nullable=True),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+            sa.Column("closed_at", sa.DateTime(), nullable=True),
+            sa.Column("rating", sa.Float(), nullable=True),
+            sa.Column("priority", sa.Integer()),
+            sa.Column("is_archived", sa.Boolean()),
+            sa.Column("comments", sa.Text(), nullable=True),
+            sa.Column("archived_at", sa.DateTime()),
+        )
+        op.create_index("ix_tickets_archive_user_created", "tickets_archive", ["user_id", "created_at"])
+        op.create_index("ix_tickets_archive_moderator", "tickets_archive", ["moderator_id"])
+        if is_mysql:
+            op.create_index("ft_tickets_archive_subject", "tickets_archive", ["subject"], mysql_prefix="FULLTEXT")
+
+    if not inspector.has_table("messages_archive"):
+        op.create_table(
+            "messages_archive",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+            sa.Column("ticket_id", sa.Integer(), sa.ForeignKey("tickets_archive.id", ondelete="CASCADE"),
+                      nullable=False),
+            sa.Column("sender_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("message_type", MESSAGE_TYPE, nullable=False),
+            sa.Column("text", sa.Text(), nullable=True),
+            sa.Column("file_id", sa.String(255), nullable=True),
+            sa.Column("sent_at", sa.DateTime()),
+            sa.Column("is_read", sa.Integer()),
+            sa.Column("media_group_id", sa.String(255), nullable=True),
+        )
+        op.create_index("ix_messages_archive_ticket_id", "messages_archive", ["ticket_id"])
+        if is_mysql:
+            op.create_index("ft_messages_archive_text", "messages_archive", ["text"], mysql_prefix="FULLTEXT")
+
+
+def downgrade():
+    # Перед откатом архивные тикеты нужно вернуть в tickets/messages, иначе они будут потеряны
+    op.drop_table("messages_archive")
+    op.drop_table("tickets_archive")
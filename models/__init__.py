@@ -3,9 +3,13 @@
 from models.user import User, UserRole
 from models.ticket import Ticket, TicketStatus
 from models.message import Message, MessageType
+from models.archive import ArchivedTicket, ArchivedMessage
+from models.retention import RetentionCheckpoint
 
 __all__ = [
     'User', 'UserRole',
     'Ticket', 'TicketStatus',
     'Message', 'MessageType',
+    'ArchivedTicket', 'ArchivedMessage',
+    'RetentionCheckpoint',
 ]
\ No newline at end of file
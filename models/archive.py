@@ -0,0 +1,103 @@
+from sqlalchemy import Column, Integer, String, Boolean, Enum, DateTime, ForeignKey, Float, Text, Index, \
+    LargeBinary, func
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import relationship, deferred
+
+from database import Base
+from models.ticket import TicketStatus
+from models.message import MessageType
+from utils.transcript import unpack_transcript
+
+
+class ArchivedTicket(Base):
+    """
+    Архивный тикет: закрытый тикет, перенесенный из tickets задачей архивации
+    (utils.archive.ArchiveJob). Столбцы и ID совпадают с исходным тикетом,
+    поэтому архивный тикет отображается тем же кодом, что и обычный.
+
+    Сообщения архивного тикета хранятся либо строками messages_archive, либо, если включено
+    сжатие (ARCHIVE_COMPRESS), одним сжатым блоком transcript (формат - utils.transcript).
+    Блок не загружается вместе с тикетом и распаковывается при первом обращении к messages.
+    Текст сообщений хранится не в блоке, а в transcript_text: по нему строится полнотекстовый
+    индекс, чтобы поиск находил такие тикеты так же, как тикеты с messages_archive.
+    """
+    __tablename__ = "tickets_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    moderator_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    status = Column(Enum(TicketStatus), nullable=False, default=TicketStatus.CLOSED)
+    subject = Column(String(255), nullable=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    closed_at = Column(DateTime, nullable=True)
+    rating = Column(Float, nullable=True)
+    priority = Column(Integer, default=0)
+    is_archived = Column(Boolean, default=True)  # Всегда True: тикет перенесен в архив
+    comments = Column(Text, nullable=True)
+    archived_at = Column(DateTime, default=func.now())  # Время переноса в архив
+    # Сжатая переписка тикета (None - сообщения хранятся в messages_archive)
+    transcript = deferred(Column(LargeBinary().with_variant(mysql.MEDIUMBLOB(), "mysql"), nullable=True))
+    # Тексты сообщений сжатой переписки, по ним же работает поиск (utils.transcript.transcript_text)
+    transcript_text = deferred(Column(Text().with_variant(mysql.MEDIUMTEXT(), "mysql"), nullable=True))
+
+    __table_args__ = (
+        # История тикетов пользователя, сначала новые
+        Index("ix_tickets_archive_user_created", "user_id", "created_at"),
+        # Статистика модераторов по закрытым тикетам
+        Index("ix_tickets_archive_moderator", "moderator_id"),
+        # Полнотекстовый поиск по теме (utils.search). В SQLite вместо него используется FTS5
+        Index("ft_tickets_archive_subject", "subject", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+        # Полнотекстовый поиск по тексту сжатой переписки
+        Index("ft_tickets_archive_transcript_text", "transcript_text",
+              mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
+
+    # Отношения
+    user = relationship("User", foreign_keys=[user_id])
+    moderator = relationship("User", foreign_keys=[moderator_id])
+    message_rows = relationship("ArchivedMessage", back_populates="ticket", cascade="all, delete-orphan",
+                                order_by="ArchivedMessage.sent_at")
+
+    @property
+    def messages(self):
+        """Сообщения тикета: распакованные из transcript или строки messages_archive."""
+        if self.transcript is None:
+            return self.message_rows
+
+        if getattr(self, "_transcript_messages", None) is None:
+            self._transcript_messages = [
+                ArchivedMessage(ticket_id=self.id, **{**message, "message_type": MessageType(message["message_type"])})
+                for message in unpack_transcript(self.transcript, self.transcript_text)
+            ]
+        return self._transcript_messages
+
+    def __repr__(self):
+        return f"<ArchivedTicket #{self.id}: {self.status.value}>"
+
+
+class ArchivedMessage(Base):
+    """Сообщение архивного тикета (перенесено из messages вместе с тикетом)"""
+    __tablename__ = "messages_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    ticket_id = Column(Integer, ForeignKey("tickets_archive.id", ondelete="CASCADE"), nullable=False, index=True)
+    sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    message_type = Column(Enum(MessageType), nullable=False, default=MessageType.TEXT)
+    text = Column(Text, nullable=True)
+    file_id = Column(String(255), nullable=True)
+    sent_at = Column(DateTime)
+    is_read = Column(Integer, default=0)
+    media_group_id = Column(String(255), nullable=True)
+
+    __table_args__ = (
+        # Полнотекстовый поиск по тексту сообщений (utils.search). В SQLite вместо него используется FTS5
+        Index("ft_messages_archive_text", "text", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
+
+    # Отношения
+    ticket = relationship("ArchivedTicket", back_populates="message_rows")
+    sender = relationship("User")
+
+    def __repr__(self):
+        return f"<ArchivedMessage #{self.id}: {self.message_type.value}>"
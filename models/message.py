@@ -1,6 +1,6 @@
 import enum
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, func
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, func, Index
 from sqlalchemy.orm import relationship
 
 from database import Base
@@ -31,6 +31,13 @@ class Message(Base):
     is_read = Column(Integer, default=0)  # 0 - не прочитано, 1 - прочитано пользователем, 2 - прочитано модератором
     media_group_id = Column(String(255), nullable=True)  # ID группы медиа (для группы фото/видео)
 
+    __table_args__ = (
+        # Сообщения тикета по времени: ticket_id = ? AND sent_at >= ? ORDER BY sent_at (utils.tickets.load_ticket_messages)
+        Index("ix_messages_ticket_sent", "ticket_id", "sent_at"),
+        # Полнотекстовый поиск по тексту сообщений (utils.search). В SQLite вместо него используется FTS5
+        Index("ft_messages_text", "text", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
+
     # Отношения
     ticket = relationship("Ticket", back_populates="messages")
     sender = relationship("User")
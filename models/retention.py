@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, func
+
+from database import Base
+
+
+class RetentionCheckpoint(Base):
+    """
+    Прогресс удаления устаревших сообщений по одной политике хранения
+    (utils.retention.RetentionJob): все сообщения политики с id <= last_id уже обработаны,
+    поэтому прерванная очистка продолжается с того же места. Для messages_archive, где id
+    не растут со временем архивации, last_id отмечает прогресс текущего прохода и сбрасывается
+    в 0 после его завершения.
+    """
+    __tablename__ = "retention_checkpoints"
+
+    policy = Column(String(64), primary_key=True)  # "<таблица>:<тип сообщения>", например "messages:system"
+    last_id = Column(Integer, nullable=False, default=0)
+    deleted = Column(Integer, nullable=False, default=0)  # Сколько сообщений удалено всего
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<RetentionCheckpoint {self.policy}: {self.last_id}>"
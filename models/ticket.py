@@ -1,6 +1,6 @@
 import enum
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, Enum, DateTime, ForeignKey, Float, func, Text
+from sqlalchemy import Column, Integer, String, Boolean, Enum, DateTime, ForeignKey, Float, func, Text, Index
 from sqlalchemy.orm import relationship
 
 from database import Base
@@ -28,9 +28,22 @@ class Ticket(Base):
     closed_at = Column(DateTime, nullable=True)
     rating = Column(Float, nullable=True)
     priority = Column(Integer, default=0)  # Приоритет тикета: 0 - обычный, 1 - высокий, 2 - срочный
-    is_archived = Column(Boolean, default=False)  # Флаг архивации тикета
+    # Позиция в очереди: время создания, сдвинутое назад на priority шагов (см. utils.tickets.queue_position).
+    # Очередь сортируется по этому столбцу, поэтому старые тикеты со временем обгоняют новые приоритетные
+    queue_at = Column(DateTime, default=func.now())
+    # Флаг архивации: в tickets всегда False, перенесенные в tickets_archive тикеты получают True
+    is_archived = Column(Boolean, default=False)
     comments = Column(Text, nullable=True)  # Внутренние комментарии для модераторов
 
+    __table_args__ = (
+        # Очередь неназначенных тикетов: status = OPEN AND moderator_id IS NULL ORDER BY queue_at
+        Index("ix_tickets_queue", "status", "moderator_id", "queue_at"),
+        # Тикеты пользователя, сначала новые: user_id = ? ORDER BY created_at DESC
+        Index("ix_tickets_user_created", "user_id", "created_at"),
+        # Полнотекстовый поиск по теме (utils.search). В SQLite вместо него используется FTS5
+        Index("ft_tickets_subject", "subject", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
+
     # Отношения
     user = relationship("User", back_populates="tickets", foreign_keys=[user_id])
     moderator = relationship("User", back_populates="assigned_tickets", foreign_keys=[moderator_id])
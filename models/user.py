@@ -3,7 +3,7 @@
 
 import enum
 from datetime import datetime
-from sqlalchemy import Column, Integer, BigInteger, String, Boolean, Enum, DateTime, func
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, Enum, DateTime, Index, func
 from sqlalchemy.orm import relationship
 
 from database import Base
@@ -31,6 +31,10 @@ class User(Base):
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     last_activity = Column(DateTime, default=func.now())
+    # Сколько тикетов модератор может вести одновременно и сколько ведет сейчас.
+    # Счетчик меняется только условными UPDATE в utils.tickets
+    max_active_tickets = Column(Integer, nullable=False, default=1, server_default="1")
+    active_tickets = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Отношения
     tickets = relationship("Ticket", back_populates="user", foreign_keys="[Ticket.user_id]",
@@ -59,4 +63,11 @@ class User(Base):
 
     def update_activity(self):
         """Обновляет время последней активности пользователя"""
-        self.last_activity = datetime.now()
\ No newline at end of file
+        self.last_activity = datetime.now()
+
+
+# Поиск пользователя администратором по началу username или имени без учета регистра
+# (utils.search.find_users): запрос сравнивает lower(...) с диапазоном, поэтому используются
+# индексы по выражению. В MySQL они поддерживаются начиная с 8.0.13
+Index("ix_users_username_lower", func.lower(User.username))
+Index("ix_users_first_name_lower", func.lower(User.first_name))
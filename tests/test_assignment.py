@@ -0,0 +1,65 @@
+import os
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from utils.assignment import AssignmentEngine
+from utils.i18n import setup_i18n
+from utils.states import ModeratorStates
+
+LOCALES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "locales")
+
+TICKET = {"id": 42, "user_name": "Ivan", "subject": "Оплата", "user_telegram_id": 100}
+MODERATOR = {"id": 2, "telegram_id": 200, "full_name": "Anna", "language": "ru"}
+
+
+class FakeBot:
+    id = 1
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, reply_markup=None):
+        self.sent.append(SimpleNamespace(chat_id=chat_id, text=text, reply_markup=reply_markup))
+
+
+def _notify(state, data):
+    async def scenario():
+        bot, storage = FakeBot(), MemoryStorage()
+        fsm = FSMContext(storage=storage, key=StorageKey(bot_id=bot.id, chat_id=200, user_id=200))
+        if state is not None:
+            await fsm.set_state(state)
+        await fsm.set_data(data)
+
+        await AssignmentEngine(bot, storage)._notify(TICKET, MODERATOR)
+
+        moderator_message = next(message for message in bot.sent if message.chat_id == 200)
+        buttons = [button.callback_data for row in moderator_message.reply_markup.inline_keyboard for button in row]
+        return await fsm.get_state(), await fsm.get_data(), buttons
+
+    setup_i18n(LOCALES_DIR, "ru")
+    return asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("state", [None, ModeratorStates.MAIN_MENU])
+def test_idle_moderator_switches_to_assigned_ticket(state):
+    current, data, buttons = _notify(state, {})
+    assert current == ModeratorStates.WORKING_WITH_TICKET.state
+    assert data == {"active_ticket_id": 42}
+    assert "mod:switch_ticket:42" not in buttons
+
+
+@pytest.mark.parametrize("state, data", [
+    (ModeratorStates.WORKING_WITH_TICKET, {"active_ticket_id": 7}),
+    (ModeratorStates.REASSIGNING_TICKET, {"active_ticket_id": 7, "reassigning_ticket_id": 7}),
+    (ModeratorStates.VIEWING_STATISTICS, {"page": 1}),
+])
+def test_busy_moderator_keeps_state_and_gets_switch_button(state, data):
+    current, stored, buttons = _notify(state, data)
+    assert current == state.state
+    assert stored == data
+    assert buttons == ["mod:switch_ticket:42"]
@@ -0,0 +1,64 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fakeredis import FakeAsyncRedis
+
+from models import UserRole
+from utils.cache import CacheClient, RedisCacheClient
+
+
+def _user(telegram_id: int, role: UserRole = UserRole.USER, language: str = "ru"):
+    return SimpleNamespace(id=telegram_id + 1000, telegram_id=telegram_id, role=role,
+                           language=language, full_name=f"Пользователь {telegram_id}")
+
+
+@pytest.fixture(params=["memory", "redis"])
+def make_cache(request):
+    def make():
+        if request.param == "redis":
+            return RedisCacheClient(FakeAsyncRedis(), ttl=60)
+        return CacheClient(ttl=60)
+    return make
+
+
+def test_user_get_set_and_invalidate(make_cache):
+    async def scenario():
+        cache = make_cache()
+        assert await cache.get_user(5) is None
+
+        snapshot = await cache.set_user(_user(5, language="uk"))
+        assert snapshot["language"] == "uk"
+        assert await cache.get_user(5) == snapshot
+
+        await cache.invalidate_user(5)
+        assert await cache.get_user(5) is None
+        await cache.close()
+
+    asyncio.run(scenario())
+
+
+def test_moderators_get_set_and_invalidate(make_cache):
+    async def scenario():
+        cache = make_cache()
+        assert await cache.get_moderators() is None
+
+        moderators = await cache.set_moderators([_user(1, UserRole.MODERATOR), _user(2, UserRole.MODERATOR)])
+        assert [moderator["telegram_id"] for moderator in await cache.get_moderators()] == [1, 2]
+        assert moderators[0]["role"] == UserRole.MODERATOR.value
+
+        await cache.invalidate_moderators()
+        assert await cache.get_moderators() is None
+        await cache.close()
+
+    asyncio.run(scenario())
+
+
+def test_redis_cache_entries_expire():
+    async def scenario():
+        cache = RedisCacheClient(FakeAsyncRedis(), ttl=60)
+        await cache.set_user(_user(7))
+        assert 0 < await cache.redis.ttl("cache:user:7") <= 60
+        await cache.close()
+
+    asyncio.run(scenario())
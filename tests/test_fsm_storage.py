@@ -0,0 +1,56 @@
+import asyncio
+
+from aiogram.fsm.storage.base import StorageKey
+from fakeredis import FakeAsyncRedis
+
+from utils.fsm_storage import EvictingStorage
+from utils.redis_storage import RedisStorage
+
+
+def _key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+
+
+def test_overflow_demotes_to_redis_and_restores():
+    async def scenario():
+        persistent = RedisStorage(FakeAsyncRedis())
+        storage = EvictingStorage(idle_ttl=0, max_entries=2, persistent=persistent)
+
+        for user_id in (1, 2, 3):
+            await storage.set_state(_key(user_id), "Form:waiting")
+            await storage.set_data(_key(user_id), {"page": user_id})
+
+        # Самая старая запись вытеснена в Redis
+        assert len(storage) == 2
+        assert storage.stats["demoted"] == 1
+        assert await persistent.get_state_and_data(_key(1)) == ("Form:waiting", {"page": 1})
+
+        # При обращении запись возвращается в память, а копия в Redis удаляется
+        assert await storage.get_data(_key(1)) == {"page": 1}
+        assert await storage.get_state(_key(1)) == "Form:waiting"
+        assert storage.stats["restored"] == 1
+        assert await persistent.get_state_and_data(_key(1)) == (None, {})
+
+        # Возврат записи вытеснил следующую по давности
+        assert storage.stats["demoted"] == 2
+        assert await persistent.get_state_and_data(_key(2)) == ("Form:waiting", {"page": 2})
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+def test_idle_records_are_demoted():
+    async def scenario():
+        persistent = RedisStorage(FakeAsyncRedis())
+        storage = EvictingStorage(idle_ttl=0.05, max_entries=0, persistent=persistent)
+
+        await storage.set_data(_key(1), {"page": 4})
+        await asyncio.sleep(0.1)
+        await storage.get_state(_key(2))
+
+        assert len(storage) == 0
+        assert storage.stats["evicted_idle"] == 1
+        assert await storage.get_data(_key(1)) == {"page": 4}
+        await storage.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,37 @@
+import asyncio
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from utils.metrics import METRICS_PREFIX, MetricsRegistry, instrument_engine
+
+
+def _run_queries(registry: MetricsRegistry, forget_start: bool = False):
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        instrument_engine(engine, registry)
+
+        if forget_start:
+            # Запрос, начатый до подключения метрик: отметки времени начала нет
+            @event.listens_for(engine.sync_engine, "before_cursor_execute")
+            def _forget(conn, cursor, statement, parameters, context, executemany):
+                conn.info["metrics_started"].clear()
+
+        async with engine.connect() as connection:
+            assert (await connection.execute(text("SELECT 1"))).scalar() == 1
+            assert (await connection.execute(text("SELECT 2"))).scalar() == 2
+        await engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_instrumented_engine_counts_queries():
+    registry = MetricsRegistry()
+    _run_queries(registry)
+    assert f"{METRICS_PREFIX}db_queries_total{{operation=\"SELECT\"}} 2" in registry.render()
+
+
+def test_after_cursor_execute_without_start_is_skipped():
+    registry = MetricsRegistry()
+    _run_queries(registry, forget_start=True)
+    assert f"{METRICS_PREFIX}db_queries_total{{operation=\"SELECT\"}}" not in registry.render()
@@ -0,0 +1,38 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from handlers import moderator as moderator_handlers
+from models import User, UserRole
+from utils.cache import user_snapshot
+from utils.presence import PresenceIndex
+
+
+def _moderator(user_id: int, name: str, last_activity: datetime) -> User:
+    return User(id=user_id, telegram_id=user_id + 100, first_name=name, role=UserRole.MODERATOR,
+                language="ru", is_active=True, last_activity=last_activity, max_active_tickets=2)
+
+
+def test_reassign_candidates_include_offline_moderators(monkeypatch):
+    now = datetime.now()
+    moderators = [
+        _moderator(1, "Current", now),
+        _moderator(2, "Online", now),
+        _moderator(3, "Zoe", now - timedelta(days=3)),
+        _moderator(4, "Anna", now - timedelta(days=1)),
+    ]
+    presence = PresenceIndex(online_after=300, idle_after=1800)
+    for moderator in moderators:
+        presence.upsert(moderator)
+
+    async def roster(session):
+        return [user_snapshot(moderator) for moderator in moderators]
+
+    monkeypatch.setattr(moderator_handlers, "get_presence", lambda: presence)
+    monkeypatch.setattr(moderator_handlers, "get_moderator_roster", roster)
+
+    candidates = asyncio.run(moderator_handlers._reassign_candidates(None, current_moderator_id=1))
+
+    assert [(mod["full_name"], mod["status"]) for mod in candidates] == [
+        ("Online", "online"), ("Anna", "offline"), ("Zoe", "offline"),
+    ]
+    assert candidates[0]["load"] == 0
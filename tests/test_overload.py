@@ -0,0 +1,59 @@
+import os
+import asyncio
+
+from aiogram.types import CallbackQuery, Message
+
+from middlewares.overload import LoadSheddingMiddleware
+from utils.i18n import setup_i18n
+from utils.overload import OverloadController
+
+LOCALES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "locales")
+USER = {"id": 5, "is_bot": False, "first_name": "T"}
+
+
+def _message(text: str) -> Message:
+    return Message.model_validate({
+        "message_id": 1, "date": 0, "chat": {"id": 5, "type": "private"}, "from": USER, "text": text,
+    })
+
+
+def _callback(data: str) -> CallbackQuery:
+    return CallbackQuery.model_validate({"id": "1", "from": USER, "chat_instance": "1", "data": data})
+
+
+def test_low_priority_routes_in_every_locale_and_by_prefix():
+    setup_i18n(LOCALES_DIR, "ru")
+    shedding = LoadSheddingMiddleware(OverloadController())
+
+    for route in ("📋 История тикетов", "📋 Ticket History", "📋 Історія тікетів",
+                  "📈 General Statistics", "📊 My Statistics",
+                  "admin:stats", "page:0", "page:12", "/i18n_report"):
+        assert shedding.is_low_priority(route), route
+
+    for route in ("✏️ Создать тикет", "mod:take_ticket:5", "rating:5", "привет", None, ""):
+        assert not shedding.is_low_priority(route), route
+
+
+def test_sheds_only_when_overloaded():
+    handled = []
+
+    async def handler(event, data):
+        handled.append(event)
+        return True
+
+    async def scenario():
+        setup_i18n(LOCALES_DIR, "ru")
+        controller = OverloadController()
+        shedding = LoadSheddingMiddleware(controller)
+
+        assert await shedding(handler, _message("📋 Ticket History"), {}) is True
+
+        controller.overloaded = True
+        # Ответ о перегрузке без бота не отправится - ошибка только пишется в лог
+        assert await shedding(handler, _callback("page:3"), {}) is None
+        assert await shedding(handler, _message("📈 Загальна статистика"), {}) is None
+        assert await shedding(handler, _callback("mod:take_ticket:5"), {}) is True
+        assert controller.stats["shed"] == 2
+        assert len(handled) == 2
+
+    asyncio.run(scenario())
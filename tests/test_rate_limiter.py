@@ -0,0 +1,62 @@
+import asyncio
+
+from fakeredis import FakeAsyncRedis
+
+from utils.rate_limiter import RedisTokenBucketLimiter
+
+
+class BrokenRedis(FakeAsyncRedis):
+    """Redis, на котором любой скрипт завершается ошибкой соединения"""
+
+    async def evalsha(self, *args, **kwargs):
+        raise ConnectionError("redis недоступен")
+
+
+def test_lua_bucket_is_shared_between_instances():
+    async def scenario():
+        redis = FakeAsyncRedis()
+        first = RedisTokenBucketLimiter(redis, rate=1.0, burst=3.0)
+        second = RedisTokenBucketLimiter(redis, rate=1.0, burst=3.0)
+
+        # Запросы пользователя распределены между экземплярами, корзина одна
+        assert await first.acquire(42) == 0
+        assert await second.acquire(42) == 0
+        assert await first.acquire(42) == 0
+        wait = await second.acquire(42)
+        assert 0 < wait <= 1.0
+
+        # Отказ общей корзины запоминается локально, Redis повторно не спрашивается
+        remote = second.stats["remote"]
+        assert await second.acquire(42) > 0
+        assert second.stats["remote"] == remote
+        assert second.stats["local_rejected"] == 1
+
+        # Корзина другого пользователя не затронута
+        assert await second.acquire(43) == 0
+        assert await redis.ttl("throttle:42") > 0
+        await first.close()
+
+    asyncio.run(scenario())
+
+
+def test_lua_bucket_charges_route_cost():
+    async def scenario():
+        limiter = RedisTokenBucketLimiter(FakeAsyncRedis(), rate=1.0, burst=5.0)
+        assert await limiter.acquire(1, cost=4.0) == 0
+        wait = await limiter.acquire(1, cost=4.0)
+        assert 2.9 < wait <= 3.0
+        await limiter.close()
+
+    asyncio.run(scenario())
+
+
+def test_falls_back_to_local_bucket_without_redis():
+    async def scenario():
+        limiter = RedisTokenBucketLimiter(BrokenRedis(), rate=1.0, burst=2.0)
+        assert await limiter.acquire(1) == 0
+        assert await limiter.acquire(1) == 0
+        assert await limiter.acquire(1) > 0
+        assert limiter.stats["fallback"] == 2
+        await limiter.close()
+
+    asyncio.run(scenario())
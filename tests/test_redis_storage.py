@@ -0,0 +1,79 @@
+import asyncio
+
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+from fakeredis import FakeAsyncRedis
+
+from utils.redis_storage import RedisStorage
+
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+
+class Form(StatesGroup):
+    waiting = State()
+
+
+class CountingRedis(FakeAsyncRedis):
+    """fakeredis, который считает сетевые запросы (команды и конвейеры)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.round_trips = 0
+
+    async def execute_command(self, *args, **options):
+        self.round_trips += 1
+        return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        pipe = super().pipeline(transaction, shard_hint)
+        execute = pipe.execute
+
+        async def counted_execute(*args, **kwargs):
+            self.round_trips += 1
+            return await execute(*args, **kwargs)
+
+        pipe.execute = counted_execute
+        return pipe
+
+
+def test_state_and_data_round_trip():
+    async def scenario():
+        storage = RedisStorage(FakeAsyncRedis(), ttl=60)
+
+        await storage.set_state_and_data(KEY, Form.waiting, {"page": 2, "текст": "привет"})
+        assert await storage.get_state_and_data(KEY) == (Form.waiting.state, {"page": 2, "текст": "привет"})
+        assert 0 < await storage.redis.ttl(storage.key_builder.build(KEY, "data")) <= 60
+
+        # Пустые состояние и данные удаляют ключи
+        await storage.set_state_and_data(KEY, None, {})
+        assert await storage.get_state_and_data(KEY) == (None, {})
+        assert await storage.redis.keys("*") == []
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+def test_get_state_prefetches_data():
+    async def scenario():
+        redis = CountingRedis()
+        storage = RedisStorage(redis)
+        await storage.set_state(KEY, Form.waiting)
+        await storage.set_data(KEY, {"page": 1})
+
+        # Как в обработке апдейта: состояние (FSMContextMiddleware), затем данные (обработчик)
+        redis.round_trips = 0
+        assert await storage.get_state(KEY) == Form.waiting.state
+        assert await storage.get_data(KEY) == {"page": 1}
+        assert redis.round_trips == 1
+
+        # Прочитанные заранее данные отдаются один раз
+        assert await storage.get_data(KEY) == {"page": 1}
+        assert redis.round_trips == 2
+
+        # Запись сбрасывает прочитанные заранее данные
+        await storage.get_state(KEY)
+        await storage.set_data(KEY, {"page": 3})
+        assert await storage.get_data(KEY) == {"page": 3}
+        await storage.close()
+
+    asyncio.run(scenario())
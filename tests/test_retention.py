@@ -0,0 +1,96 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import database
+from database import Base
+from models import User, UserRole, ArchivedTicket, ArchivedMessage, MessageType
+from utils.archive import find_ticket
+from utils.retention import RetentionJob
+from utils.search import setup_search, search_tickets
+from utils.transcript import pack_transcript, transcript_text
+
+OLD = datetime.now() - timedelta(days=200)
+FRESH = datetime.now() - timedelta(days=1)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'retention.db'}")
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "async_session_factory",
+                        sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+
+    async def create():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        await setup_search(engine)
+        async with database.async_session_factory() as session:
+            session.add(User(id=1, telegram_id=1, role=UserRole.USER, language="ru"))
+            await session.commit()
+
+    asyncio.run(create())
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+async def _archive(ticket_id: int, messages):
+    """Архивирует тикет с сообщениями [(id, тип, sent_at)], как это делает ArchiveJob."""
+    async with database.async_session_factory() as session:
+        session.add(ArchivedTicket(id=ticket_id, user_id=1, created_at=OLD, closed_at=OLD))
+        for message_id, message_type, sent_at in messages:
+            session.add(ArchivedMessage(id=message_id, ticket_id=ticket_id, sender_id=1,
+                                        message_type=message_type, text="text", sent_at=sent_at))
+        await session.commit()
+
+
+async def _archived_ids():
+    async with database.async_session_factory() as session:
+        return sorted((await session.execute(select(ArchivedMessage.id))).scalars())
+
+
+def test_archive_purged_after_checkpoint_passed_its_ids(db):
+    async def scenario():
+        job = RetentionJob({"system": 90}, batch_size=100)
+
+        # Свежее сообщение в начале таблицы не останавливает проход по архиву
+        await _archive(1, [(5, MessageType.SYSTEM, FRESH), (300, MessageType.SYSTEM, OLD)])
+        assert await job.run_once() == 1
+        assert await _archived_ids() == [5]
+
+        # Долго открытый тикет с малыми id архивирован после первого запуска
+        await _archive(2, [(10, MessageType.SYSTEM, OLD), (11, MessageType.TEXT, OLD),
+                           (12, MessageType.SYSTEM, OLD)])
+        assert await job.run_once() == 2
+        assert await _archived_ids() == [5, 11]
+
+    asyncio.run(scenario())
+
+
+def test_compressed_transcript_purged_and_reindexed(db):
+    async def scenario():
+        messages = [
+            {"id": 1, "sender_id": 1, "message_type": "system", "text": "ticket assigned", "sent_at": OLD},
+            {"id": 2, "sender_id": 1, "message_type": "text", "text": "printer broken", "sent_at": OLD},
+            {"id": 3, "sender_id": 1, "message_type": "system", "text": "ticket rated", "sent_at": FRESH},
+        ]
+        async with database.async_session_factory() as session:
+            session.add(ArchivedTicket(id=7, user_id=1, created_at=OLD, closed_at=OLD,
+                                       transcript=pack_transcript(messages),
+                                       transcript_text=transcript_text(messages)))
+            await session.commit()
+            assert [ticket_id for ticket_id, _ in await search_tickets(session, "assigned")] == [7]
+
+        assert await RetentionJob({"system": 90}, batch_size=100).run_once() == 1
+
+        async with database.async_session_factory() as session:
+            ticket = await find_ticket(session, 7)
+            assert [message.id for message in ticket.messages] == [2, 3]
+            assert await search_tickets(session, "assigned") == []
+            assert [ticket_id for ticket_id, _ in await search_tickets(session, "printer")] == [7]
+
+    asyncio.run(scenario())
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import database
+from database import Base
+from models import User, UserRole, Ticket, TicketStatus, Message, MessageType
+from utils.archive import ArchiveJob
+from utils.search import find_users, search_tickets, setup_search
+
+# Латиница: lower() в SQLite не меняет регистр кириллицы (в MySQL меняет)
+USERS = [
+    (1, "Ivan", "Petrov", "ivan_p"),
+    (2, "Ivan", "Sidorov", "ivan100"),
+    (3, "Ivan", "P_trov", None),
+    (4, "Maria", "Ivanova", "maria"),
+]
+
+
+def _find(query: str):
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+        session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as session:
+            for telegram_id, first_name, last_name, username in USERS:
+                session.add(User(telegram_id=telegram_id, first_name=first_name, last_name=last_name,
+                                 username=username, role=UserRole.USER, language="ru"))
+            await session.commit()
+            users = await find_users(session, query)
+
+        await engine.dispose()
+        return sorted(user.telegram_id for user in users)
+
+    return asyncio.run(scenario())
+
+
+def test_first_and_last_name_prefix():
+    assert _find("ivan") == [1, 2, 3]
+    assert _find("Ivan PET") == [1]
+    assert _find("@IVAN") == [1, 2]
+    assert _find("4") == [4]
+
+
+def test_wildcards_are_literal():
+    # % и _ не должны работать как шаблоны LIKE
+    assert _find("ivan %") == []
+    assert _find("ivan p_") == [3]
+    assert _find("@ivan_") == [1]
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_archived_message_text_is_searchable(tmp_path, monkeypatch, compress):
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'search.db'}")
+        monkeypatch.setattr(database, "async_session_factory",
+                            sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        await setup_search(engine)
+
+        closed_at = datetime.now() - timedelta(days=200)
+        async with database.async_session_factory() as session:
+            session.add(User(id=1, telegram_id=1, role=UserRole.USER, language="ru"))
+            for ticket_id, words in ((1, "printer jammed again"), (2, "refund for order")):
+                session.add(Ticket(id=ticket_id, user_id=1, status=TicketStatus.CLOSED, subject="help",
+                                   created_at=closed_at, closed_at=closed_at))
+                session.add(Message(ticket_id=ticket_id, sender_id=1, message_type=MessageType.TEXT,
+                                    text=words, sent_at=closed_at))
+            await session.commit()
+
+        assert await ArchiveJob(after_days=90, pause=0, compress=compress).run_once() == 2
+
+        async with database.async_session_factory() as session:
+            found = {query: [ticket_id for ticket_id, _ in await search_tickets(session, query)]
+                     for query in ("printer", "refund", "help")}
+
+        await engine.dispose()
+        return found
+
+    assert asyncio.run(scenario()) == {"printer": [1], "refund": [2], "help": [2, 1]}
@@ -0,0 +1,86 @@
+import asyncio
+
+from aiogram.types import Update
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from middlewares.query_budget import QueryBudgetMiddleware
+from utils.query_budget import current_update
+from utils.slow_queries import SlowQueryLog, fingerprint, query_source
+
+
+def test_fingerprint_collapses_values():
+    assert fingerprint("SELECT * FROM users WHERE id IN (1, 2, 3) AND name = 'x'") == \
+        fingerprint("SELECT * FROM users WHERE id IN (7) AND name = 'y'")
+
+
+def test_instrumented_engine_records_queries():
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        log = SlowQueryLog(threshold=0)
+        log.instrument(engine)
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+            await connection.execute(text("SELECT 2"))
+        await engine.dispose()
+        return log
+
+    log = asyncio.run(scenario())
+    [entry] = [entry for entry in log.top() if entry["fingerprint"] == "SELECT ?"]
+    assert entry["count"] == 2
+    assert entry["handlers"] == [("background", 2)]
+
+
+def test_after_cursor_execute_without_start_is_skipped():
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        log = SlowQueryLog(threshold=0)
+        log.instrument(engine)
+
+        # Запрос, начатый до подключения журнала: отметки времени начала нет
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def _forget(conn, cursor, statement, parameters, context, executemany):
+            conn.info["slow_log_started"].clear()
+
+        async with engine.connect() as connection:
+            assert (await connection.execute(text("SELECT 1"))).scalar() == 1
+        await engine.dispose()
+        return log
+
+    log = asyncio.run(scenario())
+    assert log.top() == []
+
+
+def test_fast_fingerprints_are_evicted_for_slow_ones():
+    log = SlowQueryLog(threshold=1, max_fingerprints=2)
+    log.record("SELECT a FROM t", 0.01)
+    log.record("SELECT b FROM t", 0.01)
+    log.record("SELECT a FROM t", 0.01)
+    log.record("SELECT c FROM t", 2)
+    log.record("SELECT d FROM t", 3)
+
+    assert [entry["fingerprint"] for entry in log.top()] == ["SELECT d FROM t", "SELECT c FROM t"]
+    assert log.evicted == 2
+    assert log.dropped == 0
+
+    # Оба места заняты медленными отпечатками - новый не учитывается, медленные не теряются
+    log.record("SELECT e FROM t", 5)
+    assert log.dropped == 1
+    assert len(log.top()) == 2
+
+
+def test_queries_before_handler_are_labelled_by_update_type():
+    update = Update.model_validate({"update_id": 1, "callback_query": {
+        "id": "1", "chat_instance": "1", "from": {"id": 100, "is_bot": False, "first_name": "Ivan"},
+    }})
+
+    async def inner(event, data):
+        queries = current_update()
+        before = query_source(queries)
+        queries.handler = "moderator.take_ticket"
+        return before, query_source(queries)
+
+    before, after = asyncio.run(QueryBudgetMiddleware()(inner, update, {}))
+    assert before == "update:callback_query"
+    assert after == "moderator.take_ticket"
+    assert query_source(None) == "background"
@@ -0,0 +1,60 @@
+import os
+import asyncio
+
+from aiogram.types import CallbackQuery, Message
+
+from middlewares.throttling import ThrottlingMiddleware, build_route_costs
+from utils.i18n import setup_i18n
+from utils.rate_limiter import MAX_THROTTLED_ROUTES, TokenBucketLimiter
+
+LOCALES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "locales")
+USER = {"id": 5, "is_bot": False, "first_name": "T"}
+
+
+def _message(text: str) -> Message:
+    return Message.model_validate({
+        "message_id": 1, "date": 0, "chat": {"id": 5, "type": "private"}, "from": USER, "text": text,
+    })
+
+
+def _callback(data: str) -> CallbackQuery:
+    return CallbackQuery.model_validate({"id": "1", "from": USER, "chat_instance": "1", "data": data})
+
+
+def test_button_costs_cover_all_languages():
+    setup_i18n(LOCALES_DIR, "ru")
+    limiter = TokenBucketLimiter(route_costs=build_route_costs())
+
+    for text in ("📈 Общая статистика", "📈 General Statistics", "📈 Загальна статистика"):
+        assert limiter.cost_for(text) == 3
+    for text in ("📋 История тикетов", "📋 Ticket History", "📋 Історія тікетів"):
+        assert limiter.cost_for(text) == 2
+    assert limiter.cost_for("page:3") == 1.5
+    assert limiter.cost_for("любой текст") == 1
+
+
+def test_throttled_route_stats_are_bounded():
+    async def handler(event, data):
+        return True
+
+    async def scenario():
+        setup_i18n(LOCALES_DIR, "ru")
+        limiter = TokenBucketLimiter(rate=0.001, burst=1, route_costs=build_route_costs())
+        middleware = ThrottlingMiddleware(limiter)
+        # Уведомление уже отправлено - бот для ответа не нужен
+        middleware._notified[USER["id"]] = True
+
+        for i in range(500):
+            await middleware(handler, _message(f"спам {i}"), {})
+            await middleware(handler, _callback(f"x{i}:{i}"), {})
+        await middleware(handler, _message("📈 General Statistics"), {})
+        await middleware(handler, _callback("page:7"), {})
+
+        routes = limiter.throttled_routes
+        assert len(routes) <= MAX_THROTTLED_ROUTES + 3
+        assert routes["message"] == 500 - 1
+        assert routes["other"] > 0
+        assert routes["📈 General Statistics"] == 1
+        assert routes["page"] == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,85 @@
+import json
+import zlib
+import struct
+from datetime import datetime
+
+import pytest
+
+from utils.transcript import TRANSCRIPT_FIELDS, pack_transcript, unpack_transcript, transcript_text
+
+MESSAGES = [
+    {"id": 1, "sender_id": 10, "message_type": "text", "text": "Здравствуйте! Не проходит оплата картой.",
+     "file_id": None, "sent_at": datetime(2025, 3, 1, 12, 0, 5), "is_read": True, "media_group_id": None},
+    {"id": 2, "sender_id": 20, "message_type": "text", "text": "Hi, could you share the order number?",
+     "file_id": None, "sent_at": datetime(2025, 3, 1, 12, 1, 30, 250000), "is_read": True, "media_group_id": None},
+    {"id": 3, "sender_id": 10, "message_type": "photo", "text": "[ФОТО] Київ, вул. Хрещатик, 1 🧾",
+     "file_id": "AgACAgIAAxkBAAI", "sent_at": datetime(2025, 3, 1, 12, 2), "is_read": False,
+     "media_group_id": "13570"},
+    {"id": 4, "sender_id": 20, "message_type": "system", "text": "Тикет закрыт модератором\nпо просьбе",
+     "file_id": None, "sent_at": None, "is_read": False, "media_group_id": None},
+    {"id": 5, "sender_id": 10, "message_type": "photo", "text": None,
+     "file_id": "AgACAgIAAxkBAAJ", "sent_at": datetime(2025, 3, 1, 12, 3), "is_read": False, "media_group_id": None},
+    {"id": 6, "sender_id": 10, "message_type": "text", "text": "",
+     "file_id": None, "sent_at": datetime(2025, 3, 1, 12, 4), "is_read": False, "media_group_id": None},
+]
+
+
+def test_round_trip():
+    blob = pack_transcript(MESSAGES)
+    text = transcript_text(MESSAGES)
+    assert blob[:2] == b"TR"
+    # Текст хранится только в transcript_text
+    assert "Хрещатик".encode("utf-8") not in zlib.decompress(blob[12:])
+    assert "Хрещатик" in text
+    assert unpack_transcript(blob, text) == MESSAGES
+    assert list(unpack_transcript(blob, text)[0]) == list(TRANSCRIPT_FIELDS)
+
+
+def test_empty_round_trip():
+    assert transcript_text([]) is None
+    assert unpack_transcript(pack_transcript([]), None) == []
+
+
+def test_version_1_blob_keeps_text():
+    rows = [[message[field] for field in TRANSCRIPT_FIELDS] for message in MESSAGES]
+    for row in rows:
+        row[5] = row[5].isoformat() if row[5] else None
+    raw = json.dumps(rows, ensure_ascii=False).encode("utf-8")
+    blob = struct.pack(">2sBBII", b"TR", 1, 1, len(rows), len(raw)) + zlib.compress(raw)
+    assert unpack_transcript(blob) == MESSAGES
+
+
+@pytest.mark.parametrize("text", [None, "", "другой текст", transcript_text(MESSAGES) + "!",
+                                  transcript_text(MESSAGES)[:-1]])
+def test_text_mismatch_raises_value_error(text):
+    with pytest.raises(ValueError):
+        unpack_transcript(pack_transcript(MESSAGES), text)
+
+
+def _with_header(blob: bytes, **changes) -> bytes:
+    header = struct.Struct(">2sBBII")
+    fields = dict(zip(("magic", "version", "codec", "count", "length"), header.unpack_from(blob)))
+    fields.update(changes)
+    return header.pack(*fields.values()) + blob[header.size:]
+
+
+def _flip_byte(blob: bytes, index: int) -> bytes:
+    return blob[:index] + bytes([blob[index] ^ 0xFF]) + blob[index + 1:]
+
+
+@pytest.mark.parametrize("corrupt", [
+    lambda blob: b"",
+    lambda blob: blob[:7],
+    lambda blob: _with_header(blob, magic=b"XX"),
+    lambda blob: _with_header(blob, version=3),
+    lambda blob: _with_header(blob, codec=7),
+    lambda blob: _with_header(blob, count=5),
+    lambda blob: _with_header(blob, length=1),
+    lambda blob: blob[:-4],
+    lambda blob: _flip_byte(blob, 12),
+    lambda blob: _flip_byte(blob, len(blob) // 2),
+], ids=["empty", "short-header", "magic", "version", "codec", "count", "length",
+        "truncated-body", "body-header", "body-middle"])
+def test_corrupted_blob_raises_value_error(corrupt):
+    with pytest.raises(ValueError):
+        unpack_transcript(corrupt(pack_transcript(MESSAGES)), transcript_text(MESSAGES))
@@ -0,0 +1,332 @@
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Union
+
+from sqlalchemy import select, insert, update, delete, literal, union_all, bindparam, Boolean, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, undefer
+
+import database
+from config import Config
+from models import Ticket, TicketStatus, Message as TicketMessage, ArchivedTicket, ArchivedMessage
+from utils.partitions import messages_partitioned
+from utils.tickets import load_ticket_messages, MESSAGES_TIME_MARGIN
+from utils.transcript import pack_transcript, transcript_text
+
+logger = logging.getLogger(__name__)
+
+# Общие столбцы живых и архивных таблиц
+_TICKET_COLUMNS = (
+    "id", "user_id", "moderator_id", "status", "subject", "created_at",
+    "updated_at", "closed_at", "rating", "priority", "comments",
+)
+_MESSAGE_COLUMNS = (
+    "id", "ticket_id", "sender_id", "message_type", "text", "file_id",
+    "sent_at", "is_read", "media_group_id",
+)
+
+
+class ArchiveJob:
+    """
+    Переносит закрытые тикеты старше after_days дней вместе с сообщениями
+    в таблицы tickets_archive и messages_archive.
+
+    Перенос идет порциями по batch_size тикетов: каждая порция - отдельная транзакция
+    (INSERT ... SELECT в архив и DELETE из живых таблиц), поэтому блокировки короткие,
+    а прерванный перенос продолжается со следующей порции. Между порциями задача
+    делает паузу, чтобы не занимать БД надолго. Живые таблицы tickets и messages
+    содержат только тикеты в работе и недавно закрытые, а история и поиск
+    читают архив вместе с ними.
+
+    При compress=True сообщения тикета не копируются в messages_archive, а упаковываются
+    в один сжатый блок tickets_archive.transcript (utils.transcript), а их текст -
+    в tickets_archive.transcript_text, по которому работает полнотекстовый поиск.
+    """
+
+    def __init__(
+            self,
+            after_days: int = 90,
+            batch_size: int = 200,
+            interval: float = 3600.0,
+            pause: float = 0.5,
+            compress: bool = False
+    ):
+        """
+        Инициализирует задачу архивации.
+
+        Args:
+            after_days: Через сколько дней после закрытия тикет переносится в архив
+            batch_size: Сколько тикетов переносится за одну транзакцию
+            interval: Интервал запуска переноса в секундах
+            pause: Пауза между порциями в секундах
+            compress: Упаковывать переписку тикета в сжатый блок вместо строк messages_archive
+        """
+        self.after_days = after_days
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pause = pause
+        self.compress = compress
+
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats: Dict[str, Any] = {
+            "runs": 0, "tickets": 0, "messages": 0, "errors": 0, "last_run_seconds": 0.0,
+        }
+
+    async def archive_batch(self, session: AsyncSession) -> int:
+        """
+        Переносит в архив одну порцию закрытых тикетов.
+
+        Args:
+            session: Сессия БД
+
+        Returns:
+            int: Количество перенесенных тикетов
+        """
+        cutoff = datetime.now() - timedelta(days=self.after_days)
+
+        # Строки блокируются до конца транзакции, чтобы тикет не переоткрыли во время переноса
+        ids_query = select(Ticket.id, Ticket.created_at).where(
+            (Ticket.status == TicketStatus.CLOSED) &
+            (Ticket.closed_at < cutoff)
+        ).order_by(Ticket.id).limit(self.batch_size).with_for_update(skip_locked=True)
+        rows = (await session.execute(ids_query)).all()
+
+        if not rows:
+            await session.rollback()
+            return 0
+
+        ticket_ids = [row.id for row in rows]
+        # Сообщения не старше своих тикетов: условие по sent_at отсекает старые секции messages
+        oldest = min((row.created_at for row in rows if row.created_at), default=None)
+
+        tickets = Ticket.__table__
+        messages = TicketMessage.__table__
+
+        await session.execute(
+            insert(ArchivedTicket.__table__).from_select(
+                [*_TICKET_COLUMNS, "is_archived", "archived_at"],
+                select(
+                    *[tickets.c[name] for name in _TICKET_COLUMNS],
+                    literal(True, Boolean),
+                    func.now()
+                ).where(tickets.c.id.in_(ticket_ids))
+            )
+        )
+        messages_filter = messages.c.ticket_id.in_(ticket_ids)
+        if oldest is not None:
+            messages_filter &= messages.c.sent_at >= oldest - MESSAGES_TIME_MARGIN
+
+        if self.compress:
+            moved_messages = await self._pack_messages(session, ticket_ids, messages_filter)
+        else:
+            result = await session.execute(
+                insert(ArchivedMessage.__table__).from_select(
+                    list(_MESSAGE_COLUMNS),
+                    select(*[messages.c[name] for name in _MESSAGE_COLUMNS]).where(messages_filter)
+                )
+            )
+            moved_messages = max(result.rowcount or 0, 0)
+
+        # В секционированной таблице сообщения не удаляются построчно: они уходят вместе
+        # с устаревшей секцией (utils.partitions.PartitionMaintainer)
+        if not messages_partitioned():
+            await session.execute(delete(messages).where(messages_filter))
+        await session.execute(delete(tickets).where(tickets.c.id.in_(ticket_ids)))
+        await session.commit()
+
+        self.stats["tickets"] += len(ticket_ids)
+        self.stats["messages"] += moved_messages
+        return len(ticket_ids)
+
+    @staticmethod
+    async def _pack_messages(session: AsyncSession, ticket_ids: List[int], messages_filter) -> int:
+        """
+        Упаковывает сообщения тикетов порции в tickets_archive.transcript, а их текст -
+        в tickets_archive.transcript_text. Возвращает количество сообщений.
+        """
+        messages = TicketMessage.__table__
+        rows = await session.execute(
+            select(*[messages.c[name] for name in _MESSAGE_COLUMNS]).where(messages_filter)
+            .order_by(messages.c.ticket_id, messages.c.sent_at, messages.c.id)
+        )
+
+        by_ticket = {ticket_id: [] for ticket_id in ticket_ids}
+        for row in rows.mappings():
+            message = dict(row)
+            message["message_type"] = message["message_type"].value
+            by_ticket[message.pop("ticket_id")].append(message)
+
+        archive = ArchivedTicket.__table__
+        await session.execute(
+            update(archive).where(archive.c.id == bindparam("ticket_id")).values(
+                transcript=bindparam("packed"), transcript_text=bindparam("packed_text")
+            ),
+            [
+                {
+                    "ticket_id": ticket_id,
+                    "packed": pack_transcript(ticket_messages),
+                    "packed_text": transcript_text(ticket_messages),
+                }
+                for ticket_id, ticket_messages in by_ticket.items()
+            ]
+        )
+        return sum(len(ticket_messages) for ticket_messages in by_ticket.values())
+
+    async def run_once(self) -> int:
+        """
+        Переносит в архив все подходящие тикеты порциями.
+
+        Returns:
+            int: Количество перенесенных тикетов
+        """
+        started = time.monotonic()
+        total = 0
+
+        while True:
+            async with database.async_session_factory() as session:
+                moved = await self.archive_batch(session)
+            total += moved
+
+            if moved < self.batch_size:
+                break
+            await asyncio.sleep(self.pause)
+
+        self.stats["runs"] += 1
+        self.stats["last_run_seconds"] = round(time.monotonic() - started, 3)
+        if total:
+            logger.info(f"Архивация: перенесено тикетов - {total} за {self.stats['last_run_seconds']} сек")
+        return total
+
+    async def _run(self) -> None:
+        """Цикл архивации."""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Ошибка при архивации тикетов: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> asyncio.Task:
+        """
+        Запускает архивацию в фоновой задаче.
+
+        Returns:
+            asyncio.Task: Фоновая задача
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self) -> None:
+        """Останавливает архивацию."""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Возвращает счетчики архивации.
+
+        Returns:
+            Dict[str, Any]: Статистика архивации
+        """
+        return {"after_days": self.after_days, **self.stats}
+
+
+def closed_tickets():
+    """
+    Возвращает подзапрос закрытых тикетов из живой и архивной таблиц
+    (столбцы id, user_id, moderator_id, rating, closed_at) для статистики.
+
+    Returns:
+        Subquery: Подзапрос closed_tickets
+    """
+    columns = ("id", "user_id", "moderator_id", "rating", "closed_at")
+    live = select(*[Ticket.__table__.c[name] for name in columns]).where(Ticket.status == TicketStatus.CLOSED)
+    archived = select(*[ArchivedTicket.__table__.c[name] for name in columns])
+    return union_all(live, archived).subquery("closed_tickets")
+
+
+async def find_ticket(session: AsyncSession, ticket_id: int) -> Optional[Union[Ticket, ArchivedTicket]]:
+    """
+    Загружает тикет с пользователем, модератором и сообщениями из живой таблицы,
+    а если его там нет - из архива.
+
+    Args:
+        session: Сессия БД
+        ticket_id: ID тикета
+
+    Returns:
+        Optional[Union[Ticket, ArchivedTicket]]: Тикет или None, если он не найден
+    """
+    query = select(Ticket).where(Ticket.id == ticket_id).options(
+        selectinload(Ticket.user),
+        selectinload(Ticket.moderator)
+    )
+    ticket = (await session.execute(query)).scalar_one_or_none()
+    if ticket is not None:
+        await load_ticket_messages(session, ticket)
+        return ticket
+
+    query = select(ArchivedTicket).where(ArchivedTicket.id == ticket_id).options(
+        selectinload(ArchivedTicket.user),
+        selectinload(ArchivedTicket.moderator),
+        selectinload(ArchivedTicket.message_rows),
+        undefer(ArchivedTicket.transcript),
+        undefer(ArchivedTicket.transcript_text)
+    )
+    return (await session.execute(query)).scalar_one_or_none()
+
+
+# Глобальный экземпляр задачи архивации
+_archive_job = None
+
+
+def setup_archive_job(config: Optional[Config] = None) -> Optional[ArchiveJob]:
+    """
+    Инициализирует глобальную задачу архивации.
+
+    Args:
+        config: Объект конфигурации (если None, используются значения по умолчанию)
+
+    Returns:
+        Optional[ArchiveJob]: Экземпляр задачи или None, если архивация отключена
+    """
+    global _archive_job
+
+    if config is None:
+        _archive_job = ArchiveJob()
+    elif not config.archive.enabled:
+        _archive_job = None
+        return None
+    else:
+        _archive_job = ArchiveJob(
+            after_days=config.archive.after_days,
+            batch_size=config.archive.batch_size,
+            interval=config.archive.interval,
+            compress=config.archive.compress,
+        )
+
+    logger.info(f"Архивация тикетов: через {_archive_job.after_days} дн. после закрытия, "
+                f"порциями по {_archive_job.batch_size}{', со сжатием переписки' if _archive_job.compress else ''}")
+    return _archive_job
+
+
+def get_archive_job() -> Optional[ArchiveJob]:
+    """
+    Возвращает глобальную задачу архивации.
+
+    Returns:
+        Optional[ArchiveJob]: Экземпляр задачи или None, если архивация отключена
+    """
+    return _archive_job
@@ -0,0 +1,361 @@
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+import database
+from config import Config
+from models import Ticket, TicketStatus, Message as TicketMessage, MessageType
+from utils.i18n import _, get_i18n
+from utils.keyboards import KeyboardFactory
+from utils.presence import get_presence
+from utils.states import ModeratorStates
+from utils.tickets import ClaimResult, claim_ticket
+
+logger = logging.getLogger(__name__)
+
+# Политики выбора модератора
+POLICY_LEAST_LOADED = "least_loaded"
+POLICY_ROUND_ROBIN = "round_robin"
+POLICY_LANGUAGE = "language"
+POLICIES = (POLICY_LEAST_LOADED, POLICY_ROUND_ROBIN, POLICY_LANGUAGE)
+
+# Состояния, в которых модератор ничем не занят: назначенный тикет сразу становится активным.
+# В остальных (ответ в другом тикете, выбор модератора для переназначения, ввод комментария и т.п.)
+# состояние не меняется, а к новому тикету модератор переходит кнопкой из уведомления
+IDLE_STATES = frozenset({None, ModeratorStates.MAIN_MENU.state})
+
+
+class AssignmentEngine:
+    """
+    Автоматически назначает открытые тикеты свободным модераторам.
+
+    Фоновая задача раз в interval секунд (или сразу после wake()) берет модераторов
+    из индекса присутствия (без запроса к таблице users) и сверяет их нагрузку
+    с БД одним запросом. Свободным считается активный за последние
+    idle_timeout секунд модератор, у которого тикетов в работе меньше его лимита.
+    Открытые тикеты назначаются в порядке очереди (tickets.queue_at, с учетом приоритета)
+    по выбранной политике:
+    - least_loaded - модератору с наименьшей нагрузкой относительно лимита, при равенстве - тому,
+      кто дольше не получал тикет;
+    - round_robin - модераторам по кругу;
+    - language - модератору с языком пользователя, если такой свободен,
+      иначе как least_loaded.
+
+    Назначение выполняется тем же условным UPDATE, что и ручное принятие тикета,
+    поэтому оно не конфликтует с модераторами, которые берут тикеты сами.
+    """
+
+    def __init__(
+            self,
+            bot: Bot,
+            storage: BaseStorage,
+            policy: str = POLICY_LEAST_LOADED,
+            interval: float = 5.0,
+            idle_timeout: float = 900.0
+    ):
+        """
+        Инициализирует планировщик.
+
+        Args:
+            bot: Экземпляр бота
+            storage: Хранилище FSM (для перевода модератора в режим работы с тикетом)
+            policy: Политика выбора модератора
+            interval: Интервал проверки очереди в секундах
+            idle_timeout: Сколько секунд без активности модератор считается отошедшим
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Неизвестная политика назначения: {policy}. Доступны: {', '.join(POLICIES)}")
+
+        self.bot = bot
+        self.storage = storage
+        self.policy = policy
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+
+        # ID модератора -> снимок из индекса присутствия ("telegram_id", "language", "load", "capacity", ...)
+        self.moderators: Dict[int, Dict[str, Any]] = {}
+        self._last_assigned: Dict[int, float] = {}
+        self._last_round_robin = 0
+
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats: Dict[str, int] = {"runs": 0, "assigned": 0, "conflicts": 0, "errors": 0}
+
+    def wake(self) -> None:
+        """Запускает внеочередную проверку очереди (например, после создания тикета)."""
+        self._wakeup.set()
+
+    async def _refresh_moderators(self, session) -> None:
+        """Обновляет представление о модераторах: нагрузку и активность."""
+        presence = get_presence()
+        await presence.refresh_load(session)
+
+        self.moderators = {
+            moderator["id"]: moderator
+            for moderator in presence.moderators(active_within=self.idle_timeout)
+        }
+
+    def _free_moderators(self) -> List[Dict[str, Any]]:
+        """Возвращает модераторов, которые могут принять тикет."""
+        return [m for m in self.moderators.values() if m["load"] < m["capacity"]]
+
+    def _least_loaded(self, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Выбирает модератора с наименьшей нагрузкой, при равенстве - дольше не получавшего тикет."""
+        return min(candidates, key=lambda m: (m["load"] / m["capacity"], self._last_assigned.get(m["id"], 0.0), m["id"]))
+
+    def pick_moderator(self, language: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Выбирает модератора для тикета по политике.
+
+        Args:
+            language: Язык пользователя, создавшего тикет
+
+        Returns:
+            Optional[Dict[str, Any]]: Модератор или None, если свободных нет
+        """
+        free = self._free_moderators()
+        if not free:
+            return None
+
+        if self.policy == POLICY_ROUND_ROBIN:
+            free.sort(key=lambda m: m["id"])
+            for moderator in free:
+                if moderator["id"] > self._last_round_robin:
+                    return moderator
+            return free[0]
+
+        if self.policy == POLICY_LANGUAGE:
+            same_language = [m for m in free if m["language"] == language]
+            return self._least_loaded(same_language or free)
+
+        return self._least_loaded(free)
+
+    async def assign_pending(self) -> int:
+        """
+        Назначает открытые тикеты свободным модераторам.
+
+        Returns:
+            int: Количество назначенных тикетов
+        """
+        assigned = []
+
+        async with database.async_session_factory() as session:
+            await self._refresh_moderators(session)
+
+            free_slots = sum(m["capacity"] - m["load"] for m in self._free_moderators())
+            if not free_slots:
+                return 0
+
+            tickets_query = select(Ticket).where(
+                (Ticket.status == TicketStatus.OPEN) &
+                (Ticket.moderator_id == None)
+            ).order_by(
+                Ticket.queue_at.asc(), Ticket.id.asc()
+            ).limit(free_slots).options(selectinload(Ticket.user))
+            # Данные тикетов сохраняем до UPDATE: при конфликте сессия откатывается,
+            # и загруженные объекты становятся недоступны
+            tickets = [
+                {
+                    "id": ticket.id,
+                    "subject": ticket.subject,
+                    "user_name": ticket.user.full_name,
+                    "user_telegram_id": ticket.user.telegram_id,
+                    "user_language": ticket.user.language,
+                }
+                for ticket in (await session.execute(tickets_query)).scalars().all()
+            ]
+
+            for ticket_info in tickets:
+                while True:
+                    moderator = self.pick_moderator(ticket_info["user_language"])
+                    if moderator is None:
+                        break
+
+                    claim = await claim_ticket(session, ticket_info["id"], moderator["id"])
+
+                    if claim == ClaimResult.BUSY:
+                        # Модератор успел взять тикеты сам - пробуем следующего
+                        self.stats["conflicts"] += 1
+                        moderator["load"] = moderator["capacity"]
+                        continue
+
+                    if claim == ClaimResult.CLAIMED:
+                        session.add(TicketMessage(
+                            ticket_id=ticket_info["id"],
+                            sender_id=moderator["id"],
+                            message_type=MessageType.SYSTEM,
+                            text=_("moderator_took_ticket", get_i18n().default_language,
+                                   moderator_name=moderator["full_name"])
+                        ))
+                        await session.commit()
+
+                        moderator["load"] += 1
+                        get_presence().adjust_load(moderator["id"], 1)
+                        self._last_assigned[moderator["id"]] = time.monotonic()
+                        if self.policy == POLICY_ROUND_ROBIN:
+                            self._last_round_robin = moderator["id"]
+                        assigned.append((ticket_info, moderator))
+                    else:
+                        # Тикет уже взят вручную или закрыт
+                        self.stats["conflicts"] += 1
+                    break
+
+                if moderator is None:
+                    break
+
+        for ticket_info, moderator in assigned:
+            await self._notify(ticket_info, moderator)
+
+        self.stats["assigned"] += len(assigned)
+        return len(assigned)
+
+    async def _notify(self, ticket: Dict[str, Any], moderator: Dict[str, Any]) -> None:
+        """Уведомляет модератора и пользователя о назначении тикета."""
+        # Свободного модератора переводим в режим работы с тикетом, как при ручном принятии.
+        # Если он занят другим действием (состояние не из IDLE_STATES), состояние и данные не трогаем -
+        # к новому тикету он переключится кнопкой
+        state = FSMContext(
+            storage=self.storage,
+            key=StorageKey(bot_id=self.bot.id, chat_id=moderator["telegram_id"], user_id=moderator["telegram_id"])
+        )
+        if await state.get_state() in IDLE_STATES:
+            await state.set_state(ModeratorStates.WORKING_WITH_TICKET)
+            await state.set_data({"active_ticket_id": ticket["id"]})
+            keyboard = KeyboardFactory.ticket_actions(TicketStatus.IN_PROGRESS, ticket["id"], moderator["language"])
+            hint = "Чтобы ответить пользователю, просто отправьте сообщение в этот чат."
+        else:
+            keyboard = KeyboardFactory.reply_in_ticket(ticket["id"], moderator["language"])
+            hint = "Чтобы ответить пользователю, перейдите к тикету кнопкой ниже."
+
+        try:
+            await self.bot.send_message(
+                chat_id=moderator["telegram_id"],
+                text=f"📩 <b>Вам назначен тикет #{ticket['id']}</b>\n\n"
+                     f"От: {ticket['user_name']}\n"
+                     f"Тема: {ticket['subject'] or 'Не указана'}\n\n"
+                     f"<i>{hint}</i>",
+                reply_markup=keyboard
+            )
+        except Exception as e:
+            logger.error(f"Failed to send notification to moderator {moderator['telegram_id']}: {e}")
+
+        try:
+            await self.bot.send_message(
+                chat_id=ticket["user_telegram_id"],
+                text=f"🔔 <b>Ваш тикет #{ticket['id']} принят в работу</b>\n\n"
+                     f"Модератор {moderator['full_name']} начал работу с вашим запросом.\n"
+                     f"Вы можете продолжить общение через бота.",
+            )
+        except Exception as e:
+            logger.error(f"Failed to send notification to user {ticket['user_telegram_id']}: {e}")
+
+        logger.info(f"Ticket #{ticket['id']} assigned to moderator {moderator['telegram_id']} ({self.policy})")
+
+    async def _run(self) -> None:
+        """Цикл назначения."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            self.stats["runs"] += 1
+            try:
+                await self.assign_pending()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Ошибка при автоматическом назначении тикетов: {e}")
+
+    def start(self) -> asyncio.Task:
+        """
+        Запускает назначение в фоновой задаче.
+
+        Returns:
+            asyncio.Task: Фоновая задача
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self) -> None:
+        """Останавливает назначение."""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Возвращает счетчики планировщика.
+
+        Returns:
+            Dict[str, Any]: Статистика планировщика
+        """
+        return {
+            "policy": self.policy,
+            "moderators_online": len(self.moderators),
+            "moderators_free": len(self._free_moderators()),
+            **self.stats,
+        }
+
+
+# Глобальный экземпляр планировщика
+_assignment_engine = None
+
+
+def setup_assignment_engine(bot: Bot, storage: BaseStorage,
+                            config: Optional[Config] = None) -> Optional[AssignmentEngine]:
+    """
+    Инициализирует глобальный планировщик назначения тикетов.
+
+    Args:
+        bot: Экземпляр бота
+        storage: Хранилище FSM
+        config: Объект конфигурации (если None, используются значения по умолчанию)
+
+    Returns:
+        Optional[AssignmentEngine]: Экземпляр планировщика или None, если назначение отключено
+    """
+    global _assignment_engine
+
+    if config is None:
+        _assignment_engine = AssignmentEngine(bot, storage)
+    elif not config.assignment.enabled:
+        _assignment_engine = None
+        return None
+    else:
+        _assignment_engine = AssignmentEngine(
+            bot,
+            storage,
+            policy=config.assignment.policy,
+            interval=config.assignment.interval,
+            idle_timeout=config.assignment.idle_timeout,
+        )
+
+    logger.info(f"Автоматическое назначение тикетов: политика {_assignment_engine.policy}, "
+                f"интервал {_assignment_engine.interval} сек")
+    return _assignment_engine
+
+
+def get_assignment_engine() -> Optional[AssignmentEngine]:
+    """
+    Возвращает глобальный планировщик назначения тикетов.
+
+    Returns:
+        Optional[AssignmentEngine]: Экземпляр планировщика или None, если назначение отключено
+    """
+    return _assignment_engine
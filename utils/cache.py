@@ -0,0 +1,251 @@
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from cachetools import TTLCache
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import Config
+from models import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+# Ключ кэша со списком модераторов
+MODERATORS_KEY = "moderators"
+
+
+def user_snapshot(user) -> Dict[str, Any]:
+    """
+    Формирует компактный снимок пользователя для кэша.
+
+    Args:
+        user: Объект User
+
+    Returns:
+        Dict[str, Any]: Данные пользователя, достаточные для ролей, языка и уведомлений
+    """
+    return {
+        "id": user.id,
+        "telegram_id": user.telegram_id,
+        "role": user.role.value,
+        "language": user.language,
+        "full_name": user.full_name,
+    }
+
+
+class CacheClient:
+    """
+    Кэш для частых запросов: пользователь по telegram_id (роль, язык) и список модераторов.
+    Хранит данные в памяти процесса.
+    """
+
+    def __init__(self, ttl: int = 300, maxsize: int = 100_000):
+        """
+        Инициализирует кэш.
+
+        Args:
+            ttl: Время жизни записей в секундах
+            maxsize: Максимальное количество записей
+        """
+        self.ttl = ttl
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: Any) -> None:
+        self._cache[key] = value
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._cache.pop(key, None)
+
+    async def close(self) -> None:
+        pass
+
+    @staticmethod
+    def _user_key(telegram_id: int) -> str:
+        return f"user:{telegram_id}"
+
+    async def get_user(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает снимок пользователя из кэша.
+
+        Args:
+            telegram_id: Telegram ID пользователя
+
+        Returns:
+            Optional[Dict[str, Any]]: Снимок пользователя или None при промахе
+        """
+        return await self.get(self._user_key(telegram_id))
+
+    async def set_user(self, user) -> Dict[str, Any]:
+        """
+        Сохраняет снимок пользователя в кэш.
+
+        Args:
+            user: Объект User
+
+        Returns:
+            Dict[str, Any]: Сохраненный снимок
+        """
+        snapshot = user_snapshot(user)
+        await self.set(self._user_key(user.telegram_id), snapshot)
+        return snapshot
+
+    async def invalidate_user(self, telegram_id: int) -> None:
+        """Удаляет пользователя из кэша (после смены роли или языка)"""
+        await self.delete(self._user_key(telegram_id))
+
+    async def get_moderators(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Возвращает список модераторов из кэша.
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: Снимки модераторов или None при промахе
+        """
+        return await self.get(MODERATORS_KEY)
+
+    async def set_moderators(self, moderators) -> List[Dict[str, Any]]:
+        """
+        Сохраняет список модераторов в кэш.
+
+        Args:
+            moderators: Список объектов User
+
+        Returns:
+            List[Dict[str, Any]]: Сохраненные снимки
+        """
+        snapshots = [user_snapshot(moderator) for moderator in moderators]
+        await self.set(MODERATORS_KEY, snapshots)
+        return snapshots
+
+    async def invalidate_moderators(self) -> None:
+        """Сбрасывает список модераторов (после назначения или снятия модератора)"""
+        await self.delete(MODERATORS_KEY)
+
+
+class RedisCacheClient(CacheClient):
+    """
+    Кэш в Redis, общий для нескольких экземпляров бота.
+    Клиент Redis передается извне; тесты (tests/test_cache.py) используют fakeredis.
+    """
+
+    def __init__(self, redis: Any, ttl: int = 300, prefix: str = "cache"):
+        """
+        Инициализирует кэш.
+
+        Args:
+            redis: Асинхронный клиент Redis (redis.asyncio.Redis или совместимый)
+            ttl: Время жизни записей в секундах
+            prefix: Префикс ключей
+        """
+        self.ttl = ttl
+        self.redis = redis
+        self.prefix = prefix
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = await self.redis.get(self._key(key))
+        return json.loads(value) if value else None
+
+    async def set(self, key: str, value: Any) -> None:
+        await self.redis.set(self._key(key), json.dumps(value, ensure_ascii=False), ex=self.ttl)
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.redis.delete(*(self._key(key) for key in keys))
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+
+
+async def get_cached_user(session: AsyncSession, telegram_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Возвращает снимок пользователя, обращаясь к БД только при промахе кэша.
+
+    Args:
+        session: Сессия БД
+        telegram_id: Telegram ID пользователя
+
+    Returns:
+        Optional[Dict[str, Any]]: Снимок пользователя или None, если пользователь не зарегистрирован
+    """
+    cache = get_cache()
+    snapshot = await cache.get_user(telegram_id)
+    if snapshot is not None:
+        return snapshot
+
+    query = select(User).where(User.telegram_id == telegram_id)
+    result = await session.execute(query)
+    user = result.scalar_one_or_none()
+
+    if not user:
+        return None
+
+    return await cache.set_user(user)
+
+
+async def get_moderator_roster(session: AsyncSession) -> List[Dict[str, Any]]:
+    """
+    Возвращает список модераторов, обращаясь к БД только при промахе кэша.
+
+    Args:
+        session: Сессия БД
+
+    Returns:
+        List[Dict[str, Any]]: Снимки модераторов
+    """
+    cache = get_cache()
+    moderators = await cache.get_moderators()
+    if moderators is not None:
+        return moderators
+
+    query = select(User).where(User.role == UserRole.MODERATOR)
+    result = await session.execute(query)
+    return await cache.set_moderators(result.scalars().all())
+
+
+# Глобальный экземпляр кэша
+_cache_client = None
+
+
+def setup_cache(config: Config) -> CacheClient:
+    """
+    Инициализирует глобальный кэш согласно конфигурации.
+
+    Args:
+        config: Объект конфигурации
+
+    Returns:
+        CacheClient: Экземпляр кэша
+    """
+    global _cache_client
+
+    if config.redis.url:
+        from redis.asyncio import Redis
+
+        _cache_client = RedisCacheClient(Redis.from_url(config.redis.url), ttl=config.redis.cache_ttl)
+        logger.info("Кэш: используется Redis")
+    else:
+        _cache_client = CacheClient(ttl=config.redis.cache_ttl)
+        logger.info("Кэш: используется память процесса")
+
+    return _cache_client
+
+
+def get_cache() -> CacheClient:
+    """
+    Возвращает глобальный кэш. Если кэш не настроен, создает кэш в памяти.
+
+    Returns:
+        CacheClient: Экземпляр кэша
+    """
+    global _cache_client
+
+    if _cache_client is None:
+        _cache_client = CacheClient()
+    return _cache_client
@@ -0,0 +1,231 @@
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from config import Config
+from utils.redis_storage import RedisStorage
+
+logger = logging.getLogger(__name__)
+
+
+class _Record:
+    """Запись FSM одного пользователя в памяти"""
+    __slots__ = ("state", "data", "last_access")
+
+    def __init__(self, state: Optional[str] = None, data: Optional[Dict[str, Any]] = None):
+        self.state = state
+        self.data = data or {}
+        self.last_access = time.monotonic()
+
+    def is_empty(self) -> bool:
+        return self.state is None and not self.data
+
+
+class EvictingStorage(BaseStorage):
+    """
+    Хранилище FSM в памяти с вытеснением неактивных записей.
+
+    Записи упорядочены по времени последнего обращения (LRU). Запись вытесняется,
+    если пользователь не обращался к боту дольше idle_ttl секунд или если
+    количество записей превысило max_entries. Вытесненная запись либо удаляется
+    (пользователь попадает в состояние по умолчанию - главное меню), либо
+    переносится в постоянное хранилище, если оно указано.
+    """
+
+    def __init__(
+            self,
+            idle_ttl: float = 7 * 24 * 3600,
+            max_entries: int = 100_000,
+            persistent: Optional[BaseStorage] = None
+    ):
+        """
+        Инициализирует хранилище.
+
+        Args:
+            idle_ttl: Время неактивности в секундах, после которого запись вытесняется
+            max_entries: Максимальное количество записей в памяти
+            persistent: Постоянное хранилище для вытесненных записей (опционально)
+        """
+        self.idle_ttl = idle_ttl
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self._records: "OrderedDict[StorageKey, _Record]" = OrderedDict()
+        self.stats: Dict[str, int] = {
+            "evicted_idle": 0,
+            "evicted_overflow": 0,
+            "demoted": 0,
+            "restored": 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    async def _get_record(self, key: StorageKey) -> Optional[_Record]:
+        """Возвращает запись и отмечает обращение к ней"""
+        await self._evict_idle()
+
+        record = self._records.get(key)
+        if record is not None:
+            record.last_access = time.monotonic()
+            self._records.move_to_end(key)
+            return record
+
+        # Запись могла быть вытеснена в постоянное хранилище
+        if self.persistent is not None:
+            state, data = await self._load_persistent(key)
+            if state is not None or data:
+                record = _Record(state, data)
+                self._records[key] = record
+                self.stats["restored"] += 1
+
+                # Актуальная копия теперь в памяти
+                await self._save_persistent(key, None, {})
+                await self._evict_overflow()
+                return record
+
+        return None
+
+    async def _load_persistent(self, key: StorageKey) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Читает запись из постоянного хранилища (одним запросом, если оно это умеет)"""
+        if isinstance(self.persistent, RedisStorage):
+            return await self.persistent.get_state_and_data(key)
+        return await self.persistent.get_state(key), await self.persistent.get_data(key)
+
+    async def _save_persistent(self, key: StorageKey, state: Optional[str], data: Dict[str, Any]) -> None:
+        """Записывает запись в постоянное хранилище (одним запросом, если оно это умеет)"""
+        if isinstance(self.persistent, RedisStorage):
+            await self.persistent.set_state_and_data(key, state, data)
+        else:
+            await self.persistent.set_state(key, state)
+            await self.persistent.set_data(key, data)
+
+    async def _put_record(self, key: StorageKey) -> _Record:
+        """Возвращает запись для изменения, создавая ее при необходимости"""
+        record = await self._get_record(key)
+        if record is None:
+            record = _Record()
+            self._records[key] = record
+            await self._evict_overflow()
+        return record
+
+    def _drop_if_empty(self, key: StorageKey, record: _Record) -> None:
+        """Пустые записи не храним: состояние по умолчанию не занимает память"""
+        if record.is_empty():
+            self._records.pop(key, None)
+
+    async def _evict(self, key: StorageKey, record: _Record) -> None:
+        """Вытесняет запись, при необходимости перенося ее в постоянное хранилище"""
+        if self.persistent is not None:
+            await self._save_persistent(key, record.state, record.data)
+            self.stats["demoted"] += 1
+
+    async def _evict_idle(self) -> None:
+        """Вытесняет записи, к которым не обращались дольше idle_ttl"""
+        if not self.idle_ttl:
+            return
+
+        deadline = time.monotonic() - self.idle_ttl
+        evicted = 0
+        while self._records:
+            key, record = next(iter(self._records.items()))
+            if record.last_access > deadline:
+                break
+            self._records.popitem(last=False)
+            await self._evict(key, record)
+            evicted += 1
+
+        if evicted:
+            self.stats["evicted_idle"] += evicted
+            logger.debug(f"FSM: вытеснено неактивных записей: {evicted}, осталось: {len(self._records)}")
+
+    async def _evict_overflow(self) -> None:
+        """Вытесняет самые старые записи сверх max_entries"""
+        evicted = 0
+        while self.max_entries and len(self._records) > self.max_entries:
+            key, record = self._records.popitem(last=False)
+            await self._evict(key, record)
+            evicted += 1
+
+        if evicted:
+            self.stats["evicted_overflow"] += evicted
+            logger.debug(f"FSM: вытеснено записей сверх лимита: {evicted}")
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        if state is None:
+            record = await self._get_record(key)
+            if record is None:
+                return
+        else:
+            record = await self._put_record(key)
+
+        record.state = state
+        self._drop_if_empty(key, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = await self._get_record(key)
+        return record.state if record else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not data:
+            record = await self._get_record(key)
+            if record is None:
+                return
+        else:
+            record = await self._put_record(key)
+
+        record.data = dict(data)
+        self._drop_if_empty(key, record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = await self._get_record(key)
+        return record.data.copy() if record else {}
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Возвращает счетчики вытеснения и текущий размер хранилища.
+
+        Returns:
+            Dict[str, int]: Статистика хранилища
+        """
+        return {"size": len(self._records), **self.stats}
+
+    async def close(self) -> None:
+        logger.info(f"FSM: статистика хранилища при остановке: {self.get_stats()}")
+        if self.persistent is not None:
+            await self.persistent.close()
+
+
+def create_storage(config: Config) -> BaseStorage:
+    """
+    Создает хранилище FSM согласно конфигурации.
+
+    Args:
+        config: Объект конфигурации
+
+    Returns:
+        BaseStorage: Хранилище FSM
+    """
+    if config.redis.url:
+        redis_storage = RedisStorage.from_url(config.redis.url, ttl=config.fsm.idle_ttl or None)
+
+        # Несколько экземпляров бота должны читать состояние напрямую из Redis
+        if config.redis.fsm_shared:
+            logger.info("FSM: используется общее хранилище Redis")
+            return redis_storage
+
+        logger.info("FSM: хранилище в памяти с вытеснением в Redis")
+        return EvictingStorage(
+            idle_ttl=config.fsm.idle_ttl,
+            max_entries=config.fsm.max_entries,
+            persistent=redis_storage,
+        )
+
+    return EvictingStorage(
+        idle_ttl=config.fsm.idle_ttl,
+        max_entries=config.fsm.max_entries,
+    )
@@ -1,11 +1,137 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Set, Tuple, Union, Callable
 import os
+import asyncio
 import json
+import sys
+import time
+import string
 import logging
+from collections import Counter
+from contextvars import ContextVar, Token
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Язык пользователя, чей апдейт сейчас обрабатывается.
+# У каждого апдейта свой контекст, поэтому параллельные апдейты не мешают друг другу
+_current_language: ContextVar[Optional[str]] = ContextVar("current_language", default=None)
+
+_formatter = string.Formatter()
+
+
+class _Template:
+    """
+    Заранее разобранная строка перевода с параметрами.
+
+    Простые поля вида {name} подставляются без повторного разбора строки.
+    Строки с индексами, атрибутами, спецификаторами формата или
+    преобразованиями ({0}, {user.name}, {count:>3}, {name!r})
+    форматируются обычным str.format.
+    """
+    __slots__ = ("source", "parts", "simple")
+
+    def __init__(self, source: str):
+        self.source = source
+        self.parts: List[Tuple[str, Optional[str]]] = []
+        self.simple = True
+
+        for literal, field_name, format_spec, conversion in _formatter.parse(source):
+            if field_name is not None and (
+                    format_spec or conversion or not field_name.isidentifier()
+            ):
+                self.simple = False
+            self.parts.append((literal, field_name))
+
+    def render(self, kwargs: Dict[str, Any]) -> str:
+        """
+        Подставляет параметры в строку.
+
+        Args:
+            kwargs: Параметры для форматирования строки
+
+        Returns:
+            str: Отформатированная строка
+
+        Raises:
+            KeyError: Если не передан параметр, который есть в строке
+        """
+        if not self.simple:
+            return self.source.format(**kwargs)
+
+        chunks = []
+        for literal, field_name in self.parts:
+            chunks.append(literal)
+            if field_name is not None:
+                chunks.append(format(kwargs[field_name], ""))
+        return "".join(chunks)
+
+
+# Запись каталога: строка без параметров или разобранный шаблон
+_Entry = Union[str, _Template]
+
+
+def _compile_entry(text: str) -> _Entry:
+    """Разбирает строку перевода (строки без фигурных скобок остаются как есть)"""
+    if "{" in text or "}" in text:
+        try:
+            return _Template(text)
+        except ValueError as e:
+            logger.error(f"Некорректный шаблон перевода '{text}': {e}")
+    return text
+
+
+def validate_translations(data: Any) -> None:
+    """
+    Проверяет содержимое файла локализации.
+
+    Args:
+        data: Загруженный JSON
+
+    Raises:
+        ValueError: Если файл не является объектом "ключ - строка"
+            или содержит некорректный шаблон
+    """
+    if not isinstance(data, dict):
+        raise ValueError("ожидается JSON-объект")
+
+    for key, text in data.items():
+        if not isinstance(text, str):
+            raise ValueError(f"значение ключа '{key}' не является строкой")
+        if "{" in text or "}" in text:
+            try:
+                _Template(text)
+            except ValueError as e:
+                raise ValueError(f"некорректный шаблон в ключе '{key}': {e}")
+
+
+class _Snapshot:
+    """
+    Неизменяемый набор переводов. Менеджер заменяет его целиком одним присваиванием,
+    поэтому get_text никогда не видит наполовину обновленные каталоги.
+    """
+    __slots__ = ("translations", "catalogs", "default")
+
+    def __init__(self, translations: Dict[str, Dict[str, str]], default_language: str):
+        self.translations = translations
+
+        # Плоские каталоги: для каждого языка ключи языка по умолчанию уже
+        # подставлены вместо отсутствующих, строки с параметрами разобраны
+        self.default: Dict[str, _Entry] = {
+            key: _compile_entry(text)
+            for key, text in translations.get(default_language, {}).items()
+        }
+
+        self.catalogs: Dict[str, Dict[str, _Entry]] = {}
+        for language, strings in translations.items():
+            if language == default_language:
+                self.catalogs[language] = self.default
+                continue
+
+            catalog = dict(self.default)
+            for key, text in strings.items():
+                catalog[key] = _compile_entry(text)
+            self.catalogs[language] = catalog
+
 
 class I18nManager:
     """
@@ -13,35 +139,111 @@ class I18nManager:
     Использует простой подход с JSON-файлами для хранения переводов.
     """
 
-    def __init__(self, locales_dir: str, default_language: str = "ru"):
+    def __init__(self, locales_dir: str, default_language: str = "ru", warn_interval: float = 3600):
         """
         Инициализирует менеджер локализации.
 
         Args:
             locales_dir: Путь к директории с файлами локализации
             default_language: Язык по умолчанию
+            warn_interval: Интервал в секундах, чаще которого предупреждение
+                об одном и том же отсутствующем переводе не пишется в лог
         """
         self.locales_dir = Path(locales_dir)
         self.default_language = default_language
-        self.translations: Dict[str, Dict[str, str]] = {}
+        self.warn_interval = warn_interval
+        self._reload_callbacks: List[Callable[[], Any]] = []
+
+        # Счетчики обращений к отсутствующим переводам: (язык, ключ) -> количество.
+        # Для неизвестного языка ключ - None
+        self.missing: Counter = Counter()
+        self._last_warning: Dict[Tuple[str, Optional[str]], float] = {}
 
         # Загружаем все доступные переводы
-        self._load_translations()
+        self._snapshot = _Snapshot({}, default_language)
+        self._snapshot = self._build_snapshot()
+
+    @property
+    def translations(self) -> Dict[str, Dict[str, str]]:
+        """Исходные переводы по языкам (как в JSON-файлах)."""
+        return self._snapshot.translations
+
+    def _load_translations(self) -> Dict[str, Dict[str, str]]:
+        """
+        Загружает все файлы переводов из директории locales.
+
+        Если файл не читается или не проходит проверку, для его языка
+        остаются переводы, загруженные ранее.
+
+        Returns:
+            Dict[str, Dict[str, str]]: Переводы по языкам
+        """
+        previous = self._snapshot.translations
+        translations: Dict[str, Dict[str, str]] = {}
 
-    def _load_translations(self) -> None:
-        """Загружает все файлы переводов из директории locales."""
         if not self.locales_dir.exists():
             logger.warning(f"Директория локализаций не найдена: {self.locales_dir}")
-            return
+            return dict(previous)
 
-        for locale_file in self.locales_dir.glob("*.json"):
+        for locale_file in sorted(self.locales_dir.glob("*.json")):
+            language = locale_file.stem  # Имя файла без расширения
             try:
-                language = locale_file.stem  # Имя файла без расширения
                 with open(locale_file, 'r', encoding='utf-8') as f:
-                    self.translations[language] = json.load(f)
+                    data = json.load(f)
+                validate_translations(data)
+                translations[language] = data
                 logger.info(f"Загружен файл локализации: {language}")
             except Exception as e:
                 logger.error(f"Ошибка при загрузке файла локализации {locale_file}: {e}")
+                if language in previous:
+                    logger.warning(f"Для языка {language} оставлены ранее загруженные переводы")
+                    translations[language] = previous[language]
+
+        # Без языка по умолчанию переводы не работают - не теряем его, даже если файл удален
+        if self.default_language not in translations and self.default_language in previous:
+            logger.error(f"Файл языка по умолчанию {self.default_language} не найден, "
+                         f"оставлены ранее загруженные переводы")
+            translations[self.default_language] = previous[self.default_language]
+
+        return translations
+
+    def _build_snapshot(self) -> _Snapshot:
+        """Читает файлы локализации и собирает новый набор каталогов."""
+        return _Snapshot(self._load_translations(), self.default_language)
+
+    def _swap(self, snapshot: _Snapshot) -> None:
+        """Подменяет каталоги и вызывает обработчики перезагрузки."""
+        self._snapshot = snapshot
+        logger.info(f"Каталоги переводов обновлены: {', '.join(snapshot.catalogs)}")
+
+        for callback in self._reload_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Ошибка в обработчике перезагрузки переводов: {e}", exc_info=True)
+
+    def add_reload_callback(self, callback: Callable[[], Any]) -> None:
+        """
+        Регистрирует функцию, которая вызывается после перезагрузки переводов
+        (например, для сброса кэшей с переведенными строками).
+
+        Args:
+            callback: Функция без аргументов
+        """
+        self._reload_callbacks.append(callback)
+
+    def reload(self) -> None:
+        """Перечитывает файлы локализации и подменяет каталоги."""
+        self._swap(self._build_snapshot())
+
+    async def reload_async(self) -> None:
+        """
+        Перечитывает файлы локализации в пуле потоков, не блокируя цикл событий,
+        и подменяет каталоги.
+        """
+        loop = asyncio.get_running_loop()
+        snapshot = await loop.run_in_executor(None, self._build_snapshot)
+        self._swap(snapshot)
 
     def get_text(self, key: str, language: str = None, **kwargs) -> str:
         """
@@ -49,46 +251,161 @@ class I18nManager:
 
         Args:
             key: Ключ перевода
-            language: Код языка (если None, используется язык по умолчанию)
+            language: Код языка (если None, используется язык текущего апдейта,
+                а если он не установлен - язык по умолчанию)
             **kwargs: Параметры для форматирования строки
 
         Returns:
             str: Переведенный текст
         """
-        # Если язык не указан, используем язык по умолчанию
-        lang = language or self.default_language
+        # Если язык не указан, берем язык текущего апдейта
+        if not language:
+            language = _current_language.get()
+
+        # Каталоги читаются из одного снимка, даже если параллельно идет перезагрузка
+        snapshot = self._snapshot
 
-        # Если указанного языка нет, используем язык по умолчанию
-        if lang not in self.translations:
-            logger.warning(f"Язык {lang} не найден, используем {self.default_language}")
-            lang = self.default_language
+        # Если и он не установлен, используем язык по умолчанию
+        if not language:
+            catalog = snapshot.default
+        else:
+            catalog = snapshot.catalogs.get(language)
 
-        # Получаем перевод по ключу
-        translation = self.translations.get(lang, {}).get(key)
+            # Если указанного языка нет, используем язык по умолчанию
+            if catalog is None:
+                self._record_missing(language, None)
+                catalog = snapshot.default
 
-        # Если перевод не найден, пробуем получить из языка по умолчанию
-        if translation is None and lang != self.default_language:
-            translation = self.translations.get(self.default_language, {}).get(key)
+        # Каталог уже содержит переводы языка по умолчанию для отсутствующих ключей
+        entry = catalog.get(key)
 
-        # Если перевод все равно не найден, возвращаем ключ
-        if translation is None:
-            logger.warning(f"Перевод для ключа '{key}' не найден")
+        # Если перевод не найден, возвращаем ключ
+        if entry is None:
+            self._record_missing(language or self.default_language, key)
             return key
 
+        if entry.__class__ is str:
+            return entry
+
         # Форматируем строку, если переданы параметры
         if kwargs:
             try:
-                return translation.format(**kwargs)
+                return entry.render(kwargs)
             except KeyError as e:
                 logger.error(f"Ошибка форматирования перевода '{key}': {e}")
-                return translation
 
-        return translation
+        return entry.source
 
     def get_all_languages(self) -> list:
         """Возвращает список всех доступных языков."""
         return list(self.translations.keys())
 
+    def get_variants(self, key: str) -> Set[str]:
+        """
+        Возвращает перевод ключа на всех языках (например, чтобы сопоставить
+        текст кнопки Reply Keyboard с маршрутом независимо от языка пользователя).
+
+        Args:
+            key: Ключ перевода
+
+        Returns:
+            Set[str]: Тексты перевода; для языков без перевода - текст языка по умолчанию
+        """
+        variants = set()
+        for catalog in self._snapshot.catalogs.values():
+            entry = catalog.get(key)
+            if entry is not None:
+                variants.add(entry if entry.__class__ is str else entry.source)
+        return variants
+
+    def _record_missing(self, language: str, key: Optional[str]) -> None:
+        """
+        Учитывает обращение к отсутствующему переводу.
+        Предупреждение пишется в лог не чаще одного раза за warn_interval для каждой пары (язык, ключ).
+
+        Args:
+            language: Код языка
+            key: Ключ перевода (None - неизвестный язык)
+        """
+        slot = (language, key)
+        self.missing[slot] += 1
+
+        now = time.monotonic()
+        last = self._last_warning.get(slot)
+        if last is not None and now - last < self.warn_interval:
+            return
+        self._last_warning[slot] = now
+
+        if key is None:
+            logger.warning(f"Язык {language} не найден, используем {self.default_language} "
+                           f"(обращений: {self.missing[slot]})")
+        else:
+            logger.warning(f"Перевод для ключа '{key}' не найден (язык: {language}, "
+                           f"обращений: {self.missing[slot]})")
+
+    def coverage_report(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Собирает отчет о полноте переводов.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Для каждого языка:
+                missing - ключи языка по умолчанию, которых нет в языке (используется перевод по умолчанию),
+                extra - ключи, которых нет в языке по умолчанию,
+                coverage - доля переведенных ключей.
+                Отдельно под ключом None - обращения к отсутствующим ключам и неизвестным языкам
+                во время работы: список ((язык, ключ), количество)
+        """
+        translations = self.translations
+        default_keys = set(translations.get(self.default_language, {}))
+
+        report: Dict[Any, Any] = {}
+        for language, strings in sorted(translations.items()):
+            keys = set(strings)
+            report[language] = {
+                "missing": sorted(default_keys - keys),
+                "extra": sorted(keys - default_keys),
+                "coverage": len(default_keys & keys) / len(default_keys) if default_keys else 1.0,
+            }
+
+        report[None] = self.missing.most_common()
+        return report
+
+    def format_coverage_report(self, limit: int = 20) -> str:
+        """
+        Формирует текстовый отчет о полноте переводов.
+
+        Args:
+            limit: Сколько ключей показывать в каждом списке
+
+        Returns:
+            str: Отчет
+        """
+        def _keys(keys: List[str]) -> str:
+            shown = ", ".join(keys[:limit])
+            if len(keys) > limit:
+                shown += f" ... (+{len(keys) - limit})"
+            return shown
+
+        report = self.coverage_report()
+        runtime_missing = report.pop(None)
+
+        lines = [f"Язык по умолчанию: {self.default_language}"]
+        for language, info in report.items():
+            lines.append(f"{language}: {info['coverage']:.0%}, нет переводов: {len(info['missing'])}, "
+                         f"лишних ключей: {len(info['extra'])}")
+            if info["missing"]:
+                lines.append(f"  нет: {_keys(info['missing'])}")
+            if info["extra"]:
+                lines.append(f"  лишние: {_keys(info['extra'])}")
+
+        if runtime_missing:
+            lines.append("Обращения к отсутствующим переводам:")
+            for (language, key), count in runtime_missing[:limit]:
+                target = f"{language}/{key}" if key is not None else f"{language} (неизвестный язык)"
+                lines.append(f"  {target}: {count}")
+
+        return "\n".join(lines)
+
 
 # Глобальный экземпляр менеджера локализации
 _i18n_manager = None
@@ -122,16 +439,58 @@ def get_i18n() -> I18nManager:
     return _i18n_manager
 
 
+def set_current_language(language: Optional[str]) -> Token:
+    """
+    Устанавливает язык для текущего апдейта.
+
+    Args:
+        language: Код языка
+
+    Returns:
+        Token: Токен для восстановления предыдущего значения через reset_current_language()
+    """
+    return _current_language.set(language)
+
+
+def reset_current_language(token: Token) -> None:
+    """
+    Восстанавливает язык, который был установлен до set_current_language().
+
+    Args:
+        token: Токен, полученный от set_current_language()
+    """
+    _current_language.reset(token)
+
+
+def get_current_language() -> Optional[str]:
+    """
+    Возвращает язык текущего апдейта.
+
+    Returns:
+        Optional[str]: Код языка или None, если язык не установлен
+    """
+    return _current_language.get()
+
+
 def _(key: str, language: str = None, **kwargs) -> str:
     """
     Функция-помощник для получения перевода.
 
     Args:
         key: Ключ перевода
-        language: Код языка (если None, используется язык по умолчанию)
+        language: Код языка (если None, используется язык текущего апдейта,
+            а если он не установлен - язык по умолчанию)
         **kwargs: Параметры для форматирования строки
 
     Returns:
         str: Переведенный текст
     """
-    return get_i18n().get_text(key, language, **kwargs)
\ No newline at end of file
+    return get_i18n().get_text(key, language, **kwargs)
+
+
+if __name__ == "__main__":
+    # Отчет о полноте переводов: python -m utils.i18n [директория] [язык по умолчанию]
+    logging.basicConfig(level=logging.ERROR)
+    locales = sys.argv[1] if len(sys.argv) > 1 else str(Path(__file__).parent.parent / "locales")
+    default = sys.argv[2] if len(sys.argv) > 2 else "ru"
+    print(I18nManager(locales, default).format_coverage_report(limit=1000))
@@ -1,4 +1,7 @@
-from typing import List, Optional, Union, Dict, Any
+import functools
+from typing import List, Optional, Union, Dict, Any, Callable
+
+from cachetools import LRUCache
 from aiogram.types import (
     InlineKeyboardMarkup, InlineKeyboardButton,
     ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
@@ -6,16 +9,49 @@ from aiogram.types import (
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from models import TicketStatus, UserRole
-from utils.i18n import _
+from utils.i18n import _, get_current_language
+
+# Готовые клавиатуры: (метод, аргументы, язык апдейта) -> разметка
+_markup_cache: LRUCache = LRUCache(maxsize=1024)
+
+
+def _memoized(func: Callable) -> Callable:
+    """
+    Кэширует клавиатуру, которую возвращает метод фабрики.
+
+    В ключ входят аргументы и язык текущего апдейта, так как при language=None
+    переводы берутся из него. Закэшированная разметка общая для всех вызовов,
+    поэтому изменять ее после получения нельзя.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (name, args, tuple(sorted(kwargs.items())), get_current_language())
+        markup = _markup_cache.get(key)
+        if markup is None:
+            markup = func(*args, **kwargs)
+            _markup_cache[key] = markup
+        return markup
+
+    return wrapper
 
 
 class KeyboardFactory:
     """
     Фабрика для создания клавиатур бота.
     Содержит методы для создания различных типов клавиатур.
+    Клавиатуры без переменных данных (меню, оценка, подтверждение и т.п.)
+    кэшируются; кэш сбрасывается при перезагрузке переводов.
     """
 
     @staticmethod
+    def clear_cache() -> None:
+        """Сбрасывает кэш готовых клавиатур (вызывается после перезагрузки переводов)."""
+        _markup_cache.clear()
+
+    @staticmethod
+    @_memoized
     def language_selection(user_language: str = None) -> InlineKeyboardMarkup:
         """
         Создает клавиатуру для выбора языка.
@@ -47,6 +83,7 @@ class KeyboardFactory:
         return kb.as_markup()
 
     @staticmethod
+    @_memoized
     def main_menu(role: UserRole, language: str = None) -> InlineKeyboardMarkup:
         """
         Создает главное меню в зависимости от роли пользователя.
@@ -118,6 +155,7 @@ class KeyboardFactory:
         return kb.as_markup()
 
     @staticmethod
+    @_memoized
     def main_reply_keyboard(role: UserRole, language: str = None) -> ReplyKeyboardMarkup:
         """
         Создает основную reply-клавиатуру в зависимости от роли пользователя.
@@ -190,6 +228,7 @@ class KeyboardFactory:
         return kb.as_markup()
 
     @staticmethod
+    @_memoized
     def rating_keyboard(language: str = None) -> InlineKeyboardMarkup:
         """
         Создает клавиатуру для оценки работы модератора.
@@ -214,6 +253,7 @@ class KeyboardFactory:
         return kb.as_markup()
 
     @staticmethod
+    @_memoized
     def back_button(callback_data: str = "back_to_menu", language: str = None) -> InlineKeyboardMarkup:
         """
         Создает клавиатуру только с кнопкой "Назад".
@@ -235,6 +275,29 @@ class KeyboardFactory:
         return kb.as_markup()
 
     @staticmethod
+    def reply_in_ticket(ticket_id: int, language: str = None) -> InlineKeyboardMarkup:
+        """
+        Создает клавиатуру с кнопкой перехода к тикету. Нужна модератору,
+        который ведет несколько тикетов и получает сообщения из каждого.
+
+        Args:
+            ticket_id: ID тикета
+            language: Язык модератора
+
+        Returns:
+            InlineKeyboardMarkup: Клавиатура с кнопкой "Ответить в тикете"
+        """
+        kb = InlineKeyboardBuilder()
+
+        kb.add(InlineKeyboardButton(
+            text=_("action_reply_in_ticket", language, ticket_id=ticket_id),
+            callback_data=f"mod:switch_ticket:{ticket_id}"
+        ))
+
+        return kb.as_markup()
+
+    @staticmethod
+    @_memoized
     def confirmation_keyboard(action: str, language: str = None) -> InlineKeyboardMarkup:
         """
         Создает клавиатуру для подтверждения действия.
@@ -269,7 +332,8 @@ class KeyboardFactory:
             page_size: int = 5,
             action_prefix: str = "item",
             back_callback: str = "back_to_menu",
-            language: str = None
+            language: str = None,
+            total_pages: Optional[int] = None
     ) -> InlineKeyboardMarkup:
         """
         Создает клавиатуру со списком элементов и кнопками пагинации.
@@ -281,6 +345,8 @@ class KeyboardFactory:
             action_prefix: Префикс для callback данных
             back_callback: Callback данные для кнопки "Назад"
             language: Язык пользователя
+            total_pages: Общее количество страниц. Если указано, items уже содержит
+                только элементы текущей страницы (страница отрисована по запросу)
 
         Returns:
             InlineKeyboardMarkup: Клавиатура со списком и пагинацией
@@ -288,9 +354,13 @@ class KeyboardFactory:
         kb = InlineKeyboardBuilder()
 
         # Вычисляем границы текущей страницы
-        total_pages = (len(items) + page_size - 1) // page_size if items else 0
-        start_idx = current_page * page_size
-        end_idx = min(start_idx + page_size, len(items))
+        if total_pages is None:
+            total_pages = (len(items) + page_size - 1) // page_size if items else 0
+            start_idx = current_page * page_size
+            end_idx = min(start_idx + page_size, len(items))
+        else:
+            start_idx = 0
+            end_idx = len(items)
 
         # Добавляем элементы текущей страницы
         for i in range(start_idx, end_idx):
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from utils.i18n import I18nManager
+
+logger = logging.getLogger(__name__)
+
+
+class LocaleWatcher:
+    """
+    Следит за файлами локализации и перезагружает переводы без перезапуска бота.
+
+    Раз в interval секунд сравнивает время изменения и размер файлов *.json.
+    Обращения к диску и сборка каталогов выполняются в пуле потоков, чтобы не
+    блокировать цикл событий. Перезагрузка выполняется, только когда файлы
+    не менялись между двумя проверками подряд: так не читается файл, который
+    редактор еще не дописал.
+    """
+
+    def __init__(self, i18n: I18nManager, interval: float = 5.0):
+        """
+        Инициализирует наблюдателя.
+
+        Args:
+            i18n: Менеджер локализации
+            interval: Интервал проверки файлов в секундах
+        """
+        self.i18n = i18n
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """Возвращает время изменения и размер каждого файла локализации."""
+        files = {}
+        locales_dir = Path(self.i18n.locales_dir)
+        if not locales_dir.exists():
+            return files
+
+        for locale_file in locales_dir.glob("*.json"):
+            try:
+                stat = locale_file.stat()
+            except OSError:
+                # Файл удален между glob и stat
+                continue
+            files[locale_file.name] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    async def _run(self) -> None:
+        """Цикл проверки файлов."""
+        loop = asyncio.get_running_loop()
+        applied = await loop.run_in_executor(None, self._scan)
+        last_seen = applied
+
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                current = await loop.run_in_executor(None, self._scan)
+
+                # Перезагружаем, когда изменения закончились
+                if current != applied and current == last_seen:
+                    logger.info("Файлы локализации изменены, перезагружаем переводы")
+                    await self.i18n.reload_async()
+                    applied = current
+
+                last_seen = current
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка при перезагрузке переводов: {e}", exc_info=True)
+
+    def start(self) -> asyncio.Task:
+        """
+        Запускает наблюдение в фоновой задаче.
+
+        Returns:
+            asyncio.Task: Фоновая задача
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Наблюдение за файлами локализации запущено (интервал {self.interval} сек)")
+        return self._task
+
+    async def stop(self) -> None:
+        """Останавливает наблюдение."""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
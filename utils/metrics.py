@@ -0,0 +1,424 @@
+import time
+import asyncio
+import logging
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from aiohttp import web
+from aiogram.fsm.storage.base import BaseStorage
+from sqlalchemy import event, select, func
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+import database
+from config import Config
+from models import Ticket, TicketStatus
+from utils.overload import get_overload_controller
+from utils.presence import get_presence, STATUS_ONLINE, STATUS_IDLE, STATUS_OFFLINE
+from utils.rate_limiter import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Префикс имен всех метрик бота
+METRICS_PREFIX = "support_bot_"
+
+# Границы гистограмм длительности (сек)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Границы гистограммы количества запросов к БД на апдейт
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 20, 30, 50, 100)
+
+# Сколько ждать сборщика значений при запросе /metrics (сек)
+COLLECT_TIMEOUT = 2.0
+
+# Типы SQL-запросов в метриках БД; остальные попадают в OTHER
+DB_OPERATIONS = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE"})
+
+Labels = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    """Число в формате Prometheus."""
+    if value == float("inf"):
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Метки в формате Prometheus: {name="value",...}."""
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    """Счетчик, который только растет (например, количество апдейтов)."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        Инициализирует метрику.
+
+        Args:
+            name: Имя метрики без префикса
+            documentation: Описание метрики
+            labelnames: Имена меток
+        """
+        self.name = METRICS_PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """Увеличивает значение для набора меток."""
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def set(self, *labels: str, value: float) -> None:
+        """Задает значение (для счетчиков, которые ведутся в другом объекте, например stats)."""
+        self._values[labels] = value
+
+    def render(self) -> List[str]:
+        """Строки метрики в текстовом формате Prometheus."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """Текущее значение (например, количество состояний FSM)."""
+    kind = "gauge"
+
+
+class Histogram:
+    """Распределение значений по корзинам (например, длительность обработки)."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        """
+        Инициализирует метрику.
+
+        Args:
+            name: Имя метрики без префикса
+            documentation: Описание метрики
+            labelnames: Имена меток
+            buckets: Верхние границы корзин по возрастанию
+        """
+        self.name = METRICS_PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Метки -> [количество в каждой корзине (последняя - +Inf), сумма, количество]
+        self._values: Dict[Labels, List[Any]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Добавляет значение для набора меток."""
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        """Строки метрики в текстовом формате Prometheus (корзины накопительные)."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        names = self.labelnames + ("le",)
+        for labels, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+Metric = Union[Counter, Gauge, Histogram]
+Collector = Callable[[], Union[None, Awaitable[None]]]
+
+
+class MetricsRegistry:
+    """
+    Метрики бота в памяти процесса.
+
+    Значения обновляются прямо в обработчиках и middleware (операции со словарем, без
+    ввода-вывода). Значения, которые ведутся другими объектами (размер FSM, счетчики
+    ограничителя, глубина очереди тикетов), снимаются сборщиками при запросе /metrics.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Collector] = []
+
+        self.updates = self.register(Counter(
+            "updates_total", "Обработанные апдейты по типу и результату", ("type", "outcome")))
+        self.update_duration = self.register(Histogram(
+            "update_duration_seconds", "Длительность обработки апдейта", ("type",)))
+        self.handler_duration = self.register(Histogram(
+            "handler_duration_seconds", "Длительность обработчика", ("handler",)))
+        self.db_queries = self.register(Counter(
+            "db_queries_total", "Запросы к БД по типу", ("operation",)))
+        self.db_errors = self.register(Counter(
+            "db_errors_total", "Ошибки запросов к БД по типу", ("operation",)))
+        self.db_duration = self.register(Histogram(
+            "db_query_duration_seconds", "Длительность запроса к БД", ("operation",), DB_LATENCY_BUCKETS))
+        self.update_queries = self.register(Histogram(
+            "update_db_queries", "Запросы к БД на один апдейт по обработчику", ("handler",), QUERY_COUNT_BUCKETS))
+        self.telegram_requests = self.register(Counter(
+            "telegram_requests_total", "Запросы к Telegram Bot API по методу и коду ответа", ("method", "code")))
+        self.telegram_duration = self.register(Histogram(
+            "telegram_request_duration_seconds", "Длительность запроса к Telegram Bot API", ("method",)))
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Добавляет метрику в реестр.
+
+        Args:
+            metric: Метрика
+
+        Returns:
+            Metric: Та же метрика
+        """
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Collector) -> None:
+        """
+        Добавляет сборщик, который обновляет метрики перед каждой выдачей /metrics.
+
+        Args:
+            collector: Функция или корутина без аргументов
+        """
+        self._collectors.append(collector)
+
+    async def collect(self) -> None:
+        """Запускает сборщики; ошибка или таймаут одного сборщика не мешает остальным."""
+        for collector in self._collectors:
+            try:
+                result = collector()
+                if asyncio.iscoroutine(result):
+                    await asyncio.wait_for(result, timeout=COLLECT_TIMEOUT)
+            except Exception as e:
+                logger.error(f"Ошибка сборщика метрик {getattr(collector, '__qualname__', collector)}: {e}")
+
+    def render(self) -> str:
+        """
+        Возвращает все метрики в текстовом формате Prometheus.
+
+        Returns:
+            str: Текст для ответа /metrics
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _db_operation(statement: str) -> str:
+    """Тип SQL-запроса по первому слову."""
+    words = statement.lstrip().split(None, 1)
+    operation = words[0].upper() if words else ""
+    return operation if operation in DB_OPERATIONS else "OTHER"
+
+
+def instrument_engine(engine: AsyncEngine, registry: "MetricsRegistry") -> None:
+    """
+    Подключает подсчет запросов к БД и их длительности через события SQLAlchemy.
+
+    Args:
+        engine: Движок БД
+        registry: Реестр метрик
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        # Движок мог быть подключен к метрикам, когда запрос уже выполнялся
+        started = conn.info.get("metrics_started")
+        if not started:
+            return
+        operation = _db_operation(statement)
+        registry.db_queries.inc(operation)
+        registry.db_duration.observe(time.perf_counter() - started.pop(), operation)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        started = context.connection.info.get("metrics_started") if context.connection is not None else None
+        if started:
+            started.pop()
+        registry.db_errors.inc(_db_operation(context.statement or ""))
+
+
+class QueueCollector:
+    """
+    Сборщик глубины очереди тикетов: открытые неназначенные тикеты и тикеты по статусам.
+    Запрос к БД выполняется не чаще раза в interval секунд, чтобы частый опрос
+    /metrics не нагружал БД; в остальное время отдаются последние значения.
+    """
+
+    def __init__(self, registry: MetricsRegistry, interval: float = 15.0):
+        self.interval = interval
+        self._checked = 0.0
+
+        self.queue_depth = registry.register(Gauge(
+            "ticket_queue_depth", "Открытые тикеты без модератора"))
+        self.tickets = registry.register(Gauge(
+            "tickets", "Тикеты в живой таблице по статусу", ("status",)))
+
+    async def __call__(self) -> None:
+        now = time.monotonic()
+        if now - self._checked < self.interval:
+            return
+        self._checked = now
+
+        async with database.async_session_factory() as session:
+            by_status = await session.execute(
+                select(Ticket.status, func.count(Ticket.id)).group_by(Ticket.status)
+            )
+            counts = {status: count for status, count in by_status.all()}
+            unassigned = await session.execute(
+                select(func.count(Ticket.id)).where(
+                    (Ticket.status == TicketStatus.OPEN) &
+                    (Ticket.moderator_id == None)
+                )
+            )
+            self.queue_depth.set(value=unassigned.scalar() or 0)
+
+        for status in TicketStatus:
+            self.tickets.set(status.value, value=counts.get(status, 0))
+
+
+def add_runtime_collectors(registry: MetricsRegistry, storage: Optional[BaseStorage] = None) -> None:
+    """
+    Добавляет сборщики для значений, которые ведутся другими объектами бота:
+    размер FSM, отклоненные ограничителем и при перегрузке запросы, апдейты в обработке,
+    задержка цикла событий, заполненность пула БД и присутствие сотрудников.
+
+    Args:
+        registry: Реестр метрик
+        storage: Хранилище FSM
+    """
+    fsm_states = registry.register(Gauge("fsm_states", "Состояния FSM в памяти процесса"))
+    throttled = registry.register(Counter("throttled_total", "Запросы, отклоненные ограничителем частоты"))
+    shed = registry.register(Counter("shed_total", "Запросы, отклоненные при перегрузке"))
+    inflight = registry.register(Gauge("inflight_updates", "Апдейты в обработке"))
+    loop_lag = registry.register(Gauge("event_loop_lag_seconds", "Задержка цикла событий (сглаженная)"))
+    pool_usage = registry.register(Gauge("db_pool_usage_ratio", "Заполненность пула соединений БД"))
+    overloaded = registry.register(Gauge("overloaded", "Режим перегрузки (1 - включен)"))
+    staff = registry.register(Gauge("staff", "Модераторы и администраторы по статусу присутствия", ("status",)))
+
+    def collect_runtime() -> None:
+        if storage is not None and hasattr(storage, "get_stats"):
+            fsm_states.set(value=storage.get_stats()["size"])
+
+        limiter = get_rate_limiter()
+        if limiter is not None:
+            throttled.set(value=limiter.stats["throttled"])
+
+        controller = get_overload_controller()
+        if controller is not None:
+            shed.set(value=controller.stats["shed"])
+            inflight.set(value=controller.inflight)
+            loop_lag.set(value=controller.loop_lag)
+            pool_usage.set(value=controller.pool_usage)
+            overloaded.set(value=int(controller.overloaded))
+
+        presence = get_presence().get_stats()
+        for status in (STATUS_ONLINE, STATUS_IDLE, STATUS_OFFLINE):
+            staff.set(status, value=presence[status])
+
+    registry.add_collector(collect_runtime)
+
+
+class MetricsServer:
+    """HTTP-сервер (aiohttp) с метриками в формате Prometheus по адресу /metrics."""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9101):
+        """
+        Инициализирует сервер.
+
+        Args:
+            registry: Реестр метрик
+            host: Адрес, на котором слушает сервер
+            port: Порт
+        """
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        """Отдает метрики."""
+        await self.registry.collect()
+        return web.Response(
+            body=self.registry.render().encode("utf-8"),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+        )
+
+    async def start(self) -> None:
+        """Запускает сервер."""
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle_metrics)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Метрики доступны по адресу http://{self.host}:{self.port}/metrics")
+
+    async def stop(self) -> None:
+        """Останавливает сервер."""
+        if self._runner is None:
+            return
+        await self._runner.cleanup()
+        self._runner = None
+
+
+# Глобальный реестр метрик
+_metrics = MetricsRegistry()
+
+
+def setup_metrics_server(config: Optional[Config] = None,
+                         storage: Optional[BaseStorage] = None) -> Optional[MetricsServer]:
+    """
+    Подключает сбор метрик БД и процесса и создает сервер /metrics.
+
+    Args:
+        config: Объект конфигурации
+        storage: Хранилище FSM
+
+    Returns:
+        Optional[MetricsServer]: Сервер или None, если метрики отключены
+    """
+    if config is None or not config.metrics.enabled:
+        return None
+
+    instrument_engine(database.engine, _metrics)
+    add_runtime_collectors(_metrics, storage)
+    _metrics.add_collector(QueueCollector(_metrics, interval=config.metrics.db_interval))
+
+    return MetricsServer(_metrics, host=config.metrics.host, port=config.metrics.port)
+
+
+def get_metrics() -> MetricsRegistry:
+    """
+    Возвращает глобальный реестр метрик.
+
+    Returns:
+        MetricsRegistry: Реестр метрик
+    """
+    return _metrics
@@ -0,0 +1,180 @@
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+import database
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class OverloadController:
+    """
+    Определяет перегрузку бота по трем сигналам:
+    - задержка цикла событий (насколько позже запланированного просыпается таймер);
+    - заполненность пула соединений БД (занятые соединения / (pool_size + max_overflow));
+    - количество апдейтов, которые обрабатываются в данный момент.
+
+    Сигналы снимаются фоновой задачей раз в sample_interval секунд. Режим перегрузки
+    включается, когда хотя бы один сигнал превысил порог, и выключается только после
+    recover_after секунд без превышений, чтобы не переключаться на каждом замере.
+    """
+
+    def __init__(
+            self,
+            lag_threshold: float = 0.2,
+            pool_threshold: float = 0.9,
+            inflight_threshold: int = 100,
+            sample_interval: float = 0.5,
+            recover_after: float = 5.0
+    ):
+        """
+        Инициализирует контроллер.
+
+        Args:
+            lag_threshold: Порог задержки цикла событий в секундах
+            pool_threshold: Порог заполненности пула соединений (0..1)
+            inflight_threshold: Порог количества одновременно обрабатываемых апдейтов
+            sample_interval: Интервал замеров в секундах
+            recover_after: Сколько секунд без превышений нужно для выхода из режима перегрузки
+        """
+        self.lag_threshold = lag_threshold
+        self.pool_threshold = pool_threshold
+        self.inflight_threshold = inflight_threshold
+        self.sample_interval = sample_interval
+        self.recover_after = recover_after
+
+        self.inflight = 0
+        self.loop_lag = 0.0
+        self.pool_usage = 0.0
+        self.overloaded = False
+        self._last_pressure = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats: Dict[str, int] = {"shed": 0, "overload_episodes": 0}
+
+    @staticmethod
+    def _sample_pool() -> float:
+        """Возвращает заполненность пула соединений БД (0..1)."""
+        engine = database.engine
+        if engine is None:
+            return 0.0
+
+        pool = engine.pool
+        try:
+            capacity = pool.size() + max(pool._max_overflow, 0)
+            return pool.checkedout() / capacity if capacity else 0.0
+        except (AttributeError, TypeError):
+            # Пул без ограничения размера (например, NullPool)
+            return 0.0
+
+    def _update(self, now: float) -> None:
+        """Пересчитывает режим перегрузки по последним замерам."""
+        reasons = []
+        if self.loop_lag > self.lag_threshold:
+            reasons.append(f"задержка цикла событий {self.loop_lag * 1000:.0f} мс")
+        if self.pool_usage >= self.pool_threshold:
+            reasons.append(f"пул БД занят на {self.pool_usage:.0%}")
+        if self.inflight > self.inflight_threshold:
+            reasons.append(f"в обработке {self.inflight} апдейтов")
+
+        if reasons:
+            self._last_pressure = now
+            if not self.overloaded:
+                self.overloaded = True
+                self.stats["overload_episodes"] += 1
+                logger.warning(f"Перегрузка: {', '.join(reasons)}. Второстепенные запросы отклоняются")
+        elif self.overloaded and now - self._last_pressure >= self.recover_after:
+            self.overloaded = False
+            logger.info(f"Нагрузка снизилась, отклонено запросов за время перегрузки: {self.stats['shed']}")
+
+    async def _run(self) -> None:
+        """Цикл замеров."""
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.sample_interval)
+            lag = max(loop.time() - started - self.sample_interval, 0.0)
+
+            # Сглаживаем задержку, чтобы единичный всплеск не включал режим перегрузки
+            self.loop_lag = 0.5 * self.loop_lag + 0.5 * lag
+            self.pool_usage = self._sample_pool()
+            self._update(time.monotonic())
+
+    def start(self) -> asyncio.Task:
+        """
+        Запускает замеры в фоновой задаче.
+
+        Returns:
+            asyncio.Task: Фоновая задача
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self) -> None:
+        """Останавливает замеры."""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Возвращает текущие сигналы и счетчики.
+
+        Returns:
+            Dict[str, Any]: Статистика контроллера
+        """
+        return {
+            "overloaded": self.overloaded,
+            "loop_lag": round(self.loop_lag, 4),
+            "pool_usage": round(self.pool_usage, 3),
+            "inflight": self.inflight,
+            **self.stats,
+        }
+
+
+# Глобальный экземпляр контроллера
+_overload_controller = None
+
+
+def setup_overload_controller(config: Optional[Config] = None) -> OverloadController:
+    """
+    Инициализирует глобальный контроллер перегрузки.
+
+    Args:
+        config: Объект конфигурации (если None, используются значения по умолчанию)
+
+    Returns:
+        OverloadController: Экземпляр контроллера
+    """
+    global _overload_controller
+
+    if config is None:
+        _overload_controller = OverloadController()
+    else:
+        _overload_controller = OverloadController(
+            lag_threshold=config.overload.lag_threshold,
+            pool_threshold=config.overload.pool_threshold,
+            inflight_threshold=config.overload.inflight_threshold,
+            sample_interval=config.overload.sample_interval,
+            recover_after=config.overload.recover_after,
+        )
+    return _overload_controller
+
+
+def get_overload_controller() -> Optional[OverloadController]:
+    """
+    Возвращает глобальный контроллер перегрузки.
+
+    Returns:
+        Optional[OverloadController]: Экземпляр контроллера или None, если он не настроен
+    """
+    return _overload_controller
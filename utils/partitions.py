@@ -0,0 +1,331 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+import database
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Секционируемая таблица и столбец секционирования
+PARTITIONED_TABLE = "messages"
+PARTITION_COLUMN = "sent_at"
+
+# Последняя секция без верхней границы, из которой выделяются новые месяцы
+MAXVALUE_PARTITION = "pmax"
+
+
+def month_start(value: datetime, shift: int = 0) -> datetime:
+    """
+    Возвращает начало месяца, сдвинутого на shift месяцев от value.
+
+    Args:
+        value: Дата внутри месяца
+        shift: Сдвиг в месяцах (может быть отрицательным)
+
+    Returns:
+        datetime: Первое число месяца, 00:00
+    """
+    month = value.year * 12 + value.month - 1 + shift
+    return datetime(month // 12, month % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    """Имя секции с сообщениями за месяц: p202610."""
+    return f"p{month:%Y%m}"
+
+
+def partition_definition(month: datetime) -> str:
+    """Определение секции за месяц: сообщения до начала следующего месяца."""
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN ('{month_start(month, 1):%Y-%m-%d %H:%M:%S}')"
+
+
+def initial_partitions(oldest: Optional[datetime], now: datetime, months_ahead: int) -> List[str]:
+    """
+    Определения секций для первичного секционирования таблицы: по месяцу
+    от самого старого сообщения до months_ahead месяцев вперед, плюс pmax.
+
+    Args:
+        oldest: Время самого старого сообщения (None, если таблица пуста)
+        now: Текущее время
+        months_ahead: Сколько будущих месяцев создать заранее
+
+    Returns:
+        List[str]: Определения секций для PARTITION BY RANGE COLUMNS
+    """
+    month = month_start(oldest or now)
+    last = month_start(now, months_ahead)
+
+    definitions = []
+    while month <= last:
+        definitions.append(partition_definition(month))
+        month = month_start(month, 1)
+    definitions.append(f"PARTITION {MAXVALUE_PARTITION} VALUES LESS THAN (MAXVALUE)")
+    return definitions
+
+
+def plan_maintenance(
+        partitions: List[Tuple[str, Optional[datetime]]],
+        now: datetime,
+        months_ahead: int,
+        retention_months: int
+) -> Tuple[List[datetime], List[str]]:
+    """
+    Определяет, какие секции нужно создать и какие устарели.
+
+    Args:
+        partitions: Существующие секции (имя, верхняя граница или None для MAXVALUE)
+        now: Текущее время
+        months_ahead: Сколько будущих месяцев должно быть создано заранее
+        retention_months: Сколько месяцев хранить сообщения (0 - не удалять секции)
+
+    Returns:
+        Tuple[List[datetime], List[str]]: Месяцы для новых секций и имена устаревших секций
+    """
+    bounds = [upper for _name, upper in partitions if upper is not None]
+    highest = max(bounds) if bounds else month_start(now)
+
+    to_add = []
+    month = highest
+    while month <= month_start(now, months_ahead):
+        to_add.append(month)
+        month = month_start(month, 1)
+
+    to_drop = []
+    if retention_months > 0:
+        # Секция устарела, если все ее сообщения старше срока хранения
+        cutoff = month_start(now, -retention_months)
+        to_drop = [name for name, upper in partitions if upper is not None and upper <= cutoff]
+
+    return to_add, to_drop
+
+
+async def get_partitions(conn: AsyncConnection) -> List[Tuple[str, Optional[datetime]]]:
+    """
+    Возвращает секции таблицы messages в MySQL по порядку.
+
+    Args:
+        conn: Соединение с БД
+
+    Returns:
+        List[Tuple[str, Optional[datetime]]]: Пары (имя секции, верхняя граница или None для MAXVALUE).
+            Пустой список, если таблица не секционирована
+    """
+    rows = await conn.execute(text(
+        "SELECT partition_name, partition_description FROM information_schema.partitions "
+        "WHERE table_schema = DATABASE() AND table_name = :table AND partition_name IS NOT NULL "
+        "ORDER BY partition_ordinal_position"
+    ), {"table": PARTITIONED_TABLE})
+
+    partitions = []
+    for name, description in rows:
+        if description == "MAXVALUE":
+            partitions.append((name, None))
+        else:
+            partitions.append((name, datetime.fromisoformat(description.strip("'"))))
+    return partitions
+
+
+async def is_partitioned(conn: AsyncConnection) -> bool:
+    """
+    Проверяет, секционирована ли таблица messages (только MySQL).
+
+    Args:
+        conn: Соединение с БД
+
+    Returns:
+        bool: True, если таблица секционирована
+    """
+    if conn.dialect.name != "mysql":
+        return False
+    return bool(await get_partitions(conn))
+
+
+class PartitionMaintainer:
+    """
+    Обслуживает помесячные секции таблицы messages в MySQL
+    (секционирование RANGE COLUMNS(sent_at) включается миграцией при MESSAGES_PARTITIONING=true).
+
+    Раз в interval секунд:
+    - выделяет из pmax секции на months_ahead месяцев вперед, чтобы новые сообщения
+      не попадали в секцию без границы;
+    - удаляет секции старше retention_months месяцев через DROP PARTITION - это
+      операция с метаданными вместо массового DELETE. Сообщения закрытых тикетов к этому
+      времени уже скопированы в messages_archive задачей архивации, поэтому секция,
+      в которой остались сообщения живых тикетов, не удаляется, а только попадает в лог.
+    """
+
+    def __init__(self, months_ahead: int = 3, retention_months: int = 12, interval: float = 86400.0):
+        """
+        Инициализирует обслуживание секций.
+
+        Args:
+            months_ahead: Сколько будущих месяцев создавать заранее
+            retention_months: Сколько месяцев хранить сообщения (0 - не удалять секции)
+            interval: Интервал обслуживания в секундах
+        """
+        self.months_ahead = months_ahead
+        self.retention_months = retention_months
+        self.interval = interval
+
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats: Dict[str, Any] = {"runs": 0, "created": 0, "dropped": 0, "kept": 0, "errors": 0}
+
+    async def _has_live_messages(self, conn: AsyncConnection, name: str) -> bool:
+        """Проверяет, остались ли в секции сообщения тикетов, которые еще не в архиве."""
+        result = await conn.execute(text(
+            f"SELECT 1 FROM {PARTITIONED_TABLE} PARTITION ({name}) m "
+            f"JOIN tickets t ON t.id = m.ticket_id LIMIT 1"
+        ))
+        return result.first() is not None
+
+    async def maintain(self) -> Tuple[int, int]:
+        """
+        Создает будущие секции и удаляет устаревшие.
+
+        Returns:
+            Tuple[int, int]: Количество созданных и удаленных секций
+        """
+        async with database.engine.connect() as conn:
+            partitions = await get_partitions(conn)
+            if not partitions:
+                return 0, 0
+
+            to_add, to_drop = plan_maintenance(
+                partitions, datetime.now(), self.months_ahead, self.retention_months
+            )
+
+            if to_add:
+                definitions = [partition_definition(month) for month in to_add]
+                definitions.append(f"PARTITION {MAXVALUE_PARTITION} VALUES LESS THAN (MAXVALUE)")
+                await conn.execute(text(
+                    f"ALTER TABLE {PARTITIONED_TABLE} REORGANIZE PARTITION {MAXVALUE_PARTITION} "
+                    f"INTO ({', '.join(definitions)})"
+                ))
+                logger.info(f"Созданы секции {PARTITIONED_TABLE}: {', '.join(map(partition_name, to_add))}")
+
+            dropped = 0
+            for name in to_drop:
+                if await self._has_live_messages(conn, name):
+                    self.stats["kept"] += 1
+                    logger.warning(f"Секция {PARTITIONED_TABLE}.{name} устарела, но содержит сообщения "
+                                   f"тикетов, которые еще не в архиве. Секция сохранена")
+                    continue
+
+                await conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} DROP PARTITION {name}"))
+                dropped += 1
+                logger.info(f"Удалена устаревшая секция {PARTITIONED_TABLE}.{name}")
+
+            await conn.commit()
+
+        self.stats["created"] += len(to_add)
+        self.stats["dropped"] += dropped
+        return len(to_add), dropped
+
+    async def _run(self) -> None:
+        """Цикл обслуживания."""
+        while True:
+            self.stats["runs"] += 1
+            try:
+                await self.maintain()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Ошибка при обслуживании секций {PARTITIONED_TABLE}: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> asyncio.Task:
+        """
+        Запускает обслуживание в фоновой задаче.
+
+        Returns:
+            asyncio.Task: Фоновая задача
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self) -> None:
+        """Останавливает обслуживание."""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Возвращает счетчики обслуживания секций.
+
+        Returns:
+            Dict[str, Any]: Статистика обслуживания
+        """
+        return {"months_ahead": self.months_ahead, "retention_months": self.retention_months, **self.stats}
+
+
+# Признак того, что таблица messages секционирована (определяется при запуске)
+_messages_partitioned = False
+
+# Глобальный экземпляр обслуживания секций
+_partition_maintainer = None
+
+
+async def setup_partition_maintainer(config: Optional[Config] = None) -> Optional[PartitionMaintainer]:
+    """
+    Определяет, секционирована ли таблица messages, и инициализирует обслуживание секций.
+
+    Args:
+        config: Объект конфигурации (если None, используются значения по умолчанию)
+
+    Returns:
+        Optional[PartitionMaintainer]: Экземпляр или None, если таблица не секционирована
+    """
+    global _messages_partitioned, _partition_maintainer
+
+    async with database.engine.connect() as conn:
+        _messages_partitioned = await is_partitioned(conn)
+
+    if not _messages_partitioned:
+        _partition_maintainer = None
+        return None
+
+    if config is None:
+        _partition_maintainer = PartitionMaintainer()
+    else:
+        _partition_maintainer = PartitionMaintainer(
+            months_ahead=config.partitions.months_ahead,
+            retention_months=config.partitions.retention_months,
+            interval=config.partitions.interval,
+        )
+
+    logger.info(f"Таблица {PARTITIONED_TABLE} секционирована по месяцам: "
+                f"вперед {_partition_maintainer.months_ahead} мес., хранение {_partition_maintainer.retention_months} мес.")
+    return _partition_maintainer
+
+
+def get_partition_maintainer() -> Optional[PartitionMaintainer]:
+    """
+    Возвращает глобальное обслуживание секций.
+
+    Returns:
+        Optional[PartitionMaintainer]: Экземпляр или None, если таблица не секционирована
+    """
+    return _partition_maintainer
+
+
+def messages_partitioned() -> bool:
+    """
+    Возвращает признак секционирования таблицы messages.
+
+    Returns:
+        bool: True, если таблица секционирована
+    """
+    return _messages_partitioned
@@ -0,0 +1,238 @@
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import Config
+from models import User, UserRole, Ticket, TicketStatus
+from utils.cache import user_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Статусы присутствия
+STATUS_ONLINE = "online"
+STATUS_IDLE = "idle"
+STATUS_OFFLINE = "offline"
+
+# Роли, присутствие которых отслеживается
+STAFF_ROLES = (UserRole.MODERATOR, UserRole.ADMIN)
+
+
+class PresenceIndex:
+    """
+    Индекс присутствия модераторов и администраторов в памяти.
+
+    Для каждого сотрудника хранит снимок пользователя, время последней активности,
+    количество тикетов в работе и лимит тикетов. Статус определяется по давности активности:
+    online - не дольше online_after секунд, idle - не дольше idle_after секунд,
+    offline - дольше. Индекс обновляется из middleware активности и обработчиков
+    тикетов, поэтому рассылки, назначение и переназначение могут выбирать
+    доступных модераторов без запросов к таблице users.
+
+    После перезапуска индекс заполняется одним запросом по users.last_activity
+    (warmup), которое пишет middleware активности. При нескольких экземплярах
+    бота каждый видит активность только своих апдейтов, а нагрузка периодически
+    сверяется с БД через refresh_load().
+    """
+
+    def __init__(self, online_after: float = 300.0, idle_after: float = 1800.0):
+        """
+        Инициализирует индекс.
+
+        Args:
+            online_after: Сколько секунд после активности сотрудник считается в сети
+            idle_after: Сколько секунд после активности сотрудник считается отошедшим
+        """
+        self.online_after = online_after
+        self.idle_after = idle_after
+
+        # telegram_id -> {**user_snapshot, "last_seen": timestamp, "load": int, "capacity": int}
+        self._members: Dict[int, Dict[str, Any]] = {}
+        # users.id -> telegram_id
+        self._by_id: Dict[int, int] = {}
+
+    async def warmup(self, session: AsyncSession) -> None:
+        """
+        Заполняет индекс из БД: сотрудники с временем последней активности и нагрузкой.
+
+        Args:
+            session: Сессия БД
+        """
+        staff_query = select(User).where(User.role.in_(STAFF_ROLES) & (User.is_active == True))
+        staff = (await session.execute(staff_query)).scalars().all()
+
+        self._members.clear()
+        self._by_id.clear()
+        for user in staff:
+            self.upsert(user)
+
+        await self.refresh_load(session)
+        logger.info(f"Индекс присутствия: загружено {len(self._members)} сотрудников")
+
+    async def refresh_load(self, session: AsyncSession) -> None:
+        """
+        Сверяет нагрузку (тикеты в работе) с БД одним запросом.
+
+        Args:
+            session: Сессия БД
+        """
+        load_query = select(Ticket.moderator_id, func.count(Ticket.id)).where(
+            (Ticket.status == TicketStatus.IN_PROGRESS) &
+            (Ticket.moderator_id != None)
+        ).group_by(Ticket.moderator_id)
+        load = dict((await session.execute(load_query)).all())
+
+        for member in self._members.values():
+            member["load"] = load.get(member["id"], 0)
+
+    def upsert(self, user: User) -> None:
+        """
+        Добавляет или обновляет сотрудника (например, после назначения модератором).
+        Пользователь без роли сотрудника удаляется из индекса.
+
+        Args:
+            user: Объект User
+        """
+        if user.role not in STAFF_ROLES or not user.is_active:
+            self.discard(user.telegram_id)
+            return
+
+        previous = self._members.get(user.telegram_id, {})
+        last_activity = user.last_activity.timestamp() if user.last_activity else 0.0
+
+        self._members[user.telegram_id] = {
+            **user_snapshot(user),
+            "last_seen": max(last_activity, previous.get("last_seen", 0.0)),
+            "load": previous.get("load", 0),
+            "capacity": user.max_active_tickets or 1,
+        }
+        self._by_id[user.id] = user.telegram_id
+
+    def discard(self, telegram_id: int) -> None:
+        """
+        Удаляет сотрудника из индекса (например, после снятия роли).
+
+        Args:
+            telegram_id: Telegram ID пользователя
+        """
+        member = self._members.pop(telegram_id, None)
+        if member:
+            self._by_id.pop(member["id"], None)
+
+    def touch(self, telegram_id: int) -> None:
+        """
+        Отмечает активность пользователя. Для обычных пользователей ничего не делает.
+
+        Args:
+            telegram_id: Telegram ID пользователя
+        """
+        member = self._members.get(telegram_id)
+        if member is not None:
+            member["last_seen"] = time.time()
+
+    def adjust_load(self, moderator_id: int, delta: int) -> None:
+        """
+        Изменяет нагрузку модератора после принятия, передачи или решения тикета.
+
+        Args:
+            moderator_id: ID модератора (users.id)
+            delta: Изменение количества тикетов в работе
+        """
+        telegram_id = self._by_id.get(moderator_id)
+        if telegram_id is not None:
+            member = self._members[telegram_id]
+            member["load"] = max(member["load"] + delta, 0)
+
+    def status(self, telegram_id: int) -> str:
+        """
+        Возвращает статус присутствия сотрудника.
+
+        Args:
+            telegram_id: Telegram ID пользователя
+
+        Returns:
+            str: online, idle или offline
+        """
+        member = self._members.get(telegram_id)
+        if member is None:
+            return STATUS_OFFLINE
+
+        age = time.time() - member["last_seen"]
+        if age <= self.online_after:
+            return STATUS_ONLINE
+        if age <= self.idle_after:
+            return STATUS_IDLE
+        return STATUS_OFFLINE
+
+    def moderators(self, active_within: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Возвращает доступных модераторов, сначала наименее загруженных относительно их лимита.
+
+        Args:
+            active_within: Максимальная давность активности в секундах
+                (по умолчанию - idle_after, т.е. статусы online и idle)
+
+        Returns:
+            List[Dict[str, Any]]: Снимки модераторов с полями last_seen, load, capacity и status
+        """
+        if active_within is None:
+            active_within = self.idle_after
+        since = time.time() - active_within
+
+        result = [
+            {**member, "status": self.status(member["telegram_id"])}
+            for member in self._members.values()
+            if member["role"] == UserRole.MODERATOR.value and member["last_seen"] >= since
+        ]
+        result.sort(key=lambda m: (m["load"] / m["capacity"], -m["last_seen"]))
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Возвращает количество сотрудников по статусам.
+
+        Returns:
+            Dict[str, Any]: Статистика индекса
+        """
+        stats = {STATUS_ONLINE: 0, STATUS_IDLE: 0, STATUS_OFFLINE: 0}
+        for telegram_id in self._members:
+            stats[self.status(telegram_id)] += 1
+        return {"members": len(self._members), **stats}
+
+
+# Глобальный экземпляр индекса
+_presence = PresenceIndex()
+
+
+def setup_presence(config: Optional[Config] = None) -> PresenceIndex:
+    """
+    Инициализирует глобальный индекс присутствия.
+
+    Args:
+        config: Объект конфигурации (если None, используются значения по умолчанию)
+
+    Returns:
+        PresenceIndex: Экземпляр индекса
+    """
+    global _presence
+
+    if config is None:
+        _presence = PresenceIndex()
+    else:
+        _presence = PresenceIndex(
+            online_after=config.presence.online_after,
+            idle_after=config.presence.idle_after,
+        )
+    return _presence
+
+
+def get_presence() -> PresenceIndex:
+    """
+    Возвращает глобальный индекс присутствия.
+
+    Returns:
+        PresenceIndex: Экземпляр индекса
+    """
+    return _presence
@@ -0,0 +1,242 @@
+import re
+import time
+import logging
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+import database
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Длина SQL-запроса в сводке
+STATEMENT_PREVIEW = 120
+
+# Сколько повторяющихся запросов показывать в сводке
+TOP_REPEATED = 3
+
+_whitespace = re.compile(r"\s+")
+_select_columns = re.compile(r"^SELECT .+? FROM ", re.IGNORECASE)
+
+
+def _preview(statement: str) -> str:
+    """Короткий вид запроса для лога: в одну строку и без списка столбцов SELECT."""
+    statement = _whitespace.sub(" ", statement).strip()
+    return _select_columns.sub("SELECT ... FROM ", statement, count=1)[:STATEMENT_PREVIEW]
+
+
+class UpdateQueries:
+    """Запросы к БД, выполненные при обработке одного апдейта."""
+
+    def __init__(self, update_id: Optional[int] = None, update_type: Optional[str] = None):
+        self.update_id = update_id
+        self.update_type = update_type
+        self.handler: Optional[str] = None
+        self.count = 0
+        self.time = 0.0
+        # Текст запроса -> [количество выполнений, суммарное время]
+        self.statements: Dict[str, List[Any]] = {}
+
+    def add(self, statement: str, duration: float) -> None:
+        """Учитывает выполненный запрос."""
+        self.count += 1
+        self.time += duration
+        stats = self.statements.get(statement)
+        if stats is None:
+            self.statements[statement] = [1, duration]
+        else:
+            stats[0] += 1
+            stats[1] += duration
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int, float]]:
+        """
+        Запросы, выполненные не меньше threshold раз (признак N+1: запрос в цикле
+        или ленивая загрузка связи для каждого объекта списка).
+
+        Returns:
+            List[Tuple[str, int, float]]: (текст запроса, количество, суммарное время), сначала частые
+        """
+        result = [
+            (statement, count, duration)
+            for statement, (count, duration) in self.statements.items()
+            if count >= threshold
+        ]
+        result.sort(key=lambda item: item[1], reverse=True)
+        return result
+
+
+# Запросы текущего апдейта; задается middleware на время обработки апдейта
+_current_update: ContextVar[Optional[UpdateQueries]] = ContextVar("current_update_queries", default=None)
+
+
+def start_update(update_id: Optional[int] = None, update_type: Optional[str] = None) -> Tuple[UpdateQueries, Any]:
+    """
+    Начинает учет запросов апдейта в текущем контексте.
+
+    Args:
+        update_id: ID апдейта
+        update_type: Тип апдейта (message, callback_query, ...)
+
+    Returns:
+        Tuple[UpdateQueries, Any]: Счетчик запросов и токен для finish_update
+    """
+    queries = UpdateQueries(update_id, update_type)
+    return queries, _current_update.set(queries)
+
+
+def finish_update(token: Any) -> None:
+    """Заканчивает учет запросов апдейта."""
+    _current_update.reset(token)
+
+
+def current_update() -> Optional[UpdateQueries]:
+    """
+    Возвращает счетчик запросов апдейта, который сейчас обрабатывается.
+
+    Returns:
+        Optional[UpdateQueries]: Счетчик или None вне обработки апдейта (например, в фоновых задачах)
+    """
+    return _current_update.get()
+
+
+class QueryBudget:
+    """
+    Бюджет запросов к БД на один апдейт.
+
+    Каждый SQL-запрос учитывается в счетчике апдейта, в контексте которого он выполнен
+    (contextvar задает middleware, см. middlewares.query_budget). После обработки апдейта
+    сводка пишется в лог, если превышено количество запросов или их суммарное время,
+    или если один и тот же запрос выполнен repeat_threshold раз и больше.
+    """
+
+    def __init__(self, max_queries: int = 20, max_time: float = 0.5, repeat_threshold: int = 5):
+        """
+        Инициализирует бюджет.
+
+        Args:
+            max_queries: Максимальное количество запросов на апдейт
+            max_time: Максимальное суммарное время запросов на апдейт (сек)
+            repeat_threshold: Сколько выполнений одного запроса считается повтором (N+1)
+        """
+        self.max_queries = max_queries
+        self.max_time = max_time
+        self.repeat_threshold = repeat_threshold
+
+        self.stats: Dict[str, int] = {"updates": 0, "over_budget": 0, "repeated": 0}
+
+    def instrument(self, engine: AsyncEngine) -> None:
+        """
+        Подключает учет запросов к движку БД.
+
+        Args:
+            engine: Движок БД
+        """
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            if _current_update.get() is not None:
+                conn.info.setdefault("budget_started", []).append(time.perf_counter())
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            queries = _current_update.get()
+            started = conn.info.get("budget_started")
+            if queries is not None and started:
+                queries.add(statement, time.perf_counter() - started.pop())
+
+        @event.listens_for(sync_engine, "handle_error")
+        def _error(context):
+            started = context.connection.info.get("budget_started") if context.connection is not None else None
+            if started:
+                started.pop()
+
+    def check(self, queries: UpdateQueries) -> bool:
+        """
+        Проверяет запросы апдейта и пишет сводку в лог при превышении бюджета.
+
+        Args:
+            queries: Запросы апдейта
+
+        Returns:
+            bool: True, если бюджет превышен или найдены повторяющиеся запросы
+        """
+        self.stats["updates"] += 1
+        repeated = queries.repeated(self.repeat_threshold)
+        over_budget = queries.count > self.max_queries or queries.time > self.max_time
+
+        if not over_budget and not repeated:
+            return False
+
+        if over_budget:
+            self.stats["over_budget"] += 1
+        if repeated:
+            self.stats["repeated"] += 1
+
+        lines = [
+            f"Апдейт {queries.update_id} ({queries.handler or 'без обработчика'}): "
+            f"{queries.count} запросов к БД за {queries.time * 1000:.1f} мс "
+            f"(бюджет {self.max_queries} запросов, {self.max_time * 1000:.0f} мс)"
+        ]
+        for statement, count, duration in repeated[:TOP_REPEATED]:
+            lines.append(f"  {count}x {duration * 1000:.1f} мс: {_preview(statement)}")
+        logger.warning("\n".join(lines))
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Возвращает счетчики проверок.
+
+        Returns:
+            Dict[str, Any]: Статистика бюджета
+        """
+        return {"max_queries": self.max_queries, "max_time": self.max_time, **self.stats}
+
+
+# Глобальный экземпляр бюджета запросов
+_query_budget = None
+
+
+def setup_query_budget(config: Optional[Config] = None) -> Optional[QueryBudget]:
+    """
+    Инициализирует глобальный бюджет запросов и подключает учет запросов к движку БД.
+
+    Args:
+        config: Объект конфигурации (если None, используются значения по умолчанию)
+
+    Returns:
+        Optional[QueryBudget]: Экземпляр бюджета или None, если учет отключен
+    """
+    global _query_budget
+
+    if config is None:
+        _query_budget = QueryBudget()
+    elif not config.query_budget.enabled:
+        _query_budget = None
+        return None
+    else:
+        _query_budget = QueryBudget(
+            max_queries=config.query_budget.max_queries,
+            max_time=config.query_budget.max_time,
+            repeat_threshold=config.query_budget.repeat_threshold,
+        )
+
+    if database.engine is not None:
+        _query_budget.instrument(database.engine)
+
+    logger.info(f"Бюджет запросов к БД на апдейт: {_query_budget.max_queries} запросов, "
+                f"{_query_budget.max_time * 1000:.0f} мс, повтор - от {_query_budget.repeat_threshold} раз")
+    return _query_budget
+
+
+def get_query_budget() -> Optional[QueryBudget]:
+    """
+    Возвращает глобальный бюджет запросов.
+
+    Returns:
+        Optional[QueryBudget]: Экземпляр бюджета или None, если учет отключен
+    """
+    return _query_budget
@@ -0,0 +1,332 @@
+import time
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from cachetools import TTLCache
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Максимальное количество маршрутов в статистике отказов; остальные учитываются как "other"
+MAX_THROTTLED_ROUTES = 100
+
+# Маршруты статистики отказов для сообщений и callback data без известного маршрута
+_GENERIC_ROUTES = frozenset({"message", "callback", "other"})
+
+
+class TokenBucketLimiter:
+    """
+    Ограничитель частоты запросов по алгоритму token bucket.
+
+    У каждого пользователя своя "корзина" на burst токенов, которая пополняется
+    со скоростью rate токенов в секунду. Каждый запрос забирает из корзины
+    свою стоимость. Короткие всплески (например, двойное нажатие) укладываются
+    в запас корзины, а постоянный поток запросов быстрее rate отсекается.
+    """
+
+    def __init__(
+            self,
+            rate: float = 2.0,
+            burst: float = 5.0,
+            route_costs: Optional[Dict[str, float]] = None,
+            default_cost: float = 1.0,
+            maxsize: int = 100_000
+    ):
+        """
+        Инициализирует ограничитель.
+
+        Args:
+            rate: Скорость пополнения корзины (токенов в секунду)
+            burst: Емкость корзины (допустимый всплеск запросов)
+            route_costs: Стоимость маршрутов (callback data или текст кнопки)
+            default_cost: Стоимость маршрута, которого нет в route_costs
+            maxsize: Максимальное количество корзин в памяти
+        """
+        self.rate = rate
+        self.burst = burst
+        self.route_costs = route_costs or {}
+        self.default_cost = default_cost
+
+        # Корзина, к которой не обращались burst / rate секунд, уже полная,
+        # поэтому ее можно удалить без изменения поведения
+        self._buckets: TTLCache = TTLCache(maxsize=maxsize, ttl=max(burst / rate, 1.0))
+
+        self.stats: Dict[str, int] = {"allowed": 0, "throttled": 0}
+        self.throttled_routes: Counter = Counter()
+
+    def cost_for(self, route: Optional[str]) -> float:
+        """
+        Возвращает стоимость маршрута.
+
+        Для маршрутов с параметрами (mod:take_ticket:5, page:2) стоимость ищется
+        и по префиксу до последнего двоеточия.
+
+        Args:
+            route: Callback data или текст сообщения
+
+        Returns:
+            float: Стоимость в токенах
+        """
+        if not route:
+            return self.default_cost
+
+        cost = self.route_costs.get(route)
+        if cost is None and ":" in route:
+            cost = self.route_costs.get(route.rsplit(":", 1)[0])
+        return self.default_cost if cost is None else cost
+
+    def consume(self, key: Any, cost: float = 1.0) -> float:
+        """
+        Забирает токены из корзины пользователя.
+
+        Args:
+            key: Идентификатор пользователя
+            cost: Стоимость запроса в токенах
+
+        Returns:
+            float: 0, если запрос разрешен, иначе время ожидания в секундах
+        """
+        # Запрос дороже всей корзины не должен блокироваться навсегда
+        cost = min(cost, self.burst)
+        now = time.monotonic()
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = self.burst
+        else:
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+
+        if tokens >= cost:
+            self._buckets[key] = (tokens - cost, now)
+            self.stats["allowed"] += 1
+            return 0.0
+
+        self._buckets[key] = (tokens, now)
+        self.stats["throttled"] += 1
+        return (cost - tokens) / self.rate
+
+    async def acquire(self, key: Any, cost: float = 1.0) -> float:
+        """
+        Забирает токены из корзины пользователя (общий интерфейс ограничителей).
+
+        Args:
+            key: Идентификатор пользователя
+            cost: Стоимость запроса в токенах
+
+        Returns:
+            float: 0, если запрос разрешен, иначе время ожидания в секундах
+        """
+        return self.consume(key, cost)
+
+    def record_throttled(self, route: str) -> None:
+        """
+        Учитывает отказ на маршруте для статистики. Маршруты из route_costs учитываются всегда,
+        остальные (префиксы callback data) - пока их не больше MAX_THROTTLED_ROUTES.
+
+        Args:
+            route: Маршрут (ключ из route_costs, префикс callback data, "message" или "callback")
+        """
+        if (route not in self.throttled_routes and route not in self.route_costs
+                and route not in _GENERIC_ROUTES and len(self.throttled_routes) >= MAX_THROTTLED_ROUTES):
+            route = "other"
+        self.throttled_routes[route] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Возвращает счетчики ограничителя.
+
+        Returns:
+            Dict[str, Any]: Разрешенные и отклоненные запросы, количество корзин
+                и маршруты, на которых чаще всего срабатывает ограничение
+        """
+        return {
+            **self.stats,
+            "buckets": len(self._buckets),
+            "top_throttled_routes": self.throttled_routes.most_common(10),
+        }
+
+    async def close(self) -> None:
+        pass
+
+
+# Атомарное списание токенов в Redis. Время берется с сервера Redis,
+# поэтому расхождение часов между экземплярами бота не влияет на результат.
+# Результат возвращается строкой, так как числа Lua при возврате округляются до целых
+_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local ttl = tonumber(ARGV[4])
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil or ts == nil then
+    tokens = burst
+    ts = now
+end
+
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], ttl)
+return tostring(wait)
+"""
+
+
+class RedisTokenBucketLimiter(TokenBucketLimiter):
+    """
+    Ограничитель с корзинами в Redis, общими для всех экземпляров бота.
+
+    Порядок проверки запроса:
+    1. Если пользователь недавно получил отказ от Redis, запрос отклоняется
+       локально до истечения времени ожидания (без обращения к Redis).
+    2. Локальная корзина экземпляра: она видит только часть запросов пользователя,
+       поэтому ее отказ означает и отказ общей корзины.
+    3. Общая корзина в Redis (атомарный Lua-скрипт) - окончательное решение.
+
+    Если Redis недоступен или не ответил за timeout секунд, решение принимает
+    локальная корзина, и бот продолжает работать с ограничением на экземпляр.
+    Клиент Redis передается извне; тесты (tests/test_rate_limiter.py) используют fakeredis.
+    """
+
+    def __init__(
+            self,
+            redis: Any,
+            rate: float = 2.0,
+            burst: float = 5.0,
+            route_costs: Optional[Dict[str, float]] = None,
+            default_cost: float = 1.0,
+            maxsize: int = 100_000,
+            timeout: float = 0.05,
+            prefix: str = "throttle"
+    ):
+        """
+        Инициализирует ограничитель.
+
+        Args:
+            redis: Асинхронный клиент Redis (redis.asyncio.Redis или совместимый)
+            rate: Скорость пополнения корзины (токенов в секунду)
+            burst: Емкость корзины (допустимый всплеск запросов)
+            route_costs: Стоимость маршрутов (callback data или текст кнопки)
+            default_cost: Стоимость маршрута, которого нет в route_costs
+            maxsize: Максимальное количество локальных корзин
+            timeout: Время ожидания ответа Redis в секундах
+            prefix: Префикс ключей Redis
+        """
+        super().__init__(rate, burst, route_costs, default_cost, maxsize)
+        self.redis = redis
+        self.timeout = timeout
+        self.prefix = prefix
+        self._script = redis.register_script(_TOKEN_BUCKET_SCRIPT)
+        self._ttl = max(int(burst / rate) + 1, 1)
+
+        # Пользователи, получившие отказ от Redis: ключ -> время, до которого отказывать локально
+        self._blocked: TTLCache = TTLCache(maxsize=maxsize, ttl=max(burst / rate, 1.0))
+        self.stats.update({"remote": 0, "local_rejected": 0, "fallback": 0})
+
+    async def acquire(self, key: Any, cost: float = 1.0) -> float:
+        cost = min(cost, self.burst)
+        now = time.monotonic()
+
+        # Недавний отказ общей корзины
+        blocked_until = self._blocked.get(key)
+        if blocked_until is not None and blocked_until > now:
+            self.stats["throttled"] += 1
+            self.stats["local_rejected"] += 1
+            return blocked_until - now
+
+        # Локальная корзина: ее отказ означает отказ и общей корзины
+        wait = self.consume(key, cost)
+        if wait:
+            self.stats["local_rejected"] += 1
+            return wait
+
+        # Общая корзина
+        try:
+            result = await asyncio.wait_for(
+                self._script(keys=[f"{self.prefix}:{key}"], args=[self.rate, self.burst, cost, self._ttl]),
+                timeout=self.timeout
+            )
+            wait = float(result)
+        except Exception as e:
+            # Redis медленный или недоступен - остаемся на решении локальной корзины
+            self.stats["fallback"] += 1
+            logger.debug(f"Ограничитель: Redis недоступен ({e!r}), используется локальная корзина")
+            return 0.0
+
+        self.stats["remote"] += 1
+        if wait:
+            # Локальная корзина уже засчитала запрос как разрешенный
+            self.stats["allowed"] -= 1
+            self.stats["throttled"] += 1
+            self._blocked[key] = now + wait
+        return wait
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+
+
+# Глобальный экземпляр ограничителя
+_rate_limiter = None
+
+
+def setup_rate_limiter(config: Optional[Config] = None,
+                       route_costs: Optional[Dict[str, float]] = None) -> TokenBucketLimiter:
+    """
+    Инициализирует глобальный ограничитель частоты запросов.
+
+    Args:
+        config: Объект конфигурации (если None, используются значения по умолчанию)
+        route_costs: Стоимость маршрутов
+
+    Returns:
+        TokenBucketLimiter: Экземпляр ограничителя
+    """
+    global _rate_limiter
+
+    if config is None:
+        _rate_limiter = TokenBucketLimiter(route_costs=route_costs)
+    elif config.redis.url and config.throttling.shared:
+        from redis.asyncio import Redis
+
+        _rate_limiter = RedisTokenBucketLimiter(
+            Redis.from_url(config.redis.url),
+            rate=config.throttling.rate,
+            burst=config.throttling.burst,
+            route_costs=route_costs,
+            timeout=config.throttling.redis_timeout,
+        )
+    else:
+        _rate_limiter = TokenBucketLimiter(
+            rate=config.throttling.rate,
+            burst=config.throttling.burst,
+            route_costs=route_costs,
+        )
+
+    logger.info(f"Ограничение частоты ({type(_rate_limiter).__name__}): {_rate_limiter.rate} запросов/сек, "
+                f"всплеск до {_rate_limiter.burst}")
+    return _rate_limiter
+
+
+def get_rate_limiter() -> Optional[TokenBucketLimiter]:
+    """
+    Возвращает глобальный ограничитель частоты запросов.
+
+    Returns:
+        Optional[TokenBucketLimiter]: Экземпляр ограничителя или None, если он не настроен
+    """
+    return _rate_limiter
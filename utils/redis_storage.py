@@ -0,0 +1,144 @@
+import json
+import logging
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Сколько секунд данные, прочитанные вместе с состоянием, ждут вызова get_data
+PREFETCH_TTL = 1.0
+
+
+class RedisStorage(BaseStorage):
+    """
+    Хранилище FSM в Redis, общее для нескольких экземпляров бота.
+
+    Состояние и данные хранятся в отдельных ключах, но читаются и записываются
+    одним конвейером (pipeline), то есть за один сетевой запрос.
+    aiogram читает состояние на каждый апдейт (FSMContextMiddleware), а обработчик
+    затем запрашивает данные, поэтому get_state читает данные тем же конвейером
+    и отдает их следующему get_data того же ключа, если он вызван в течение PREFETCH_TTL.
+    Клиент Redis передается извне; тесты (tests/test_redis_storage.py) используют fakeredis.
+    """
+
+    def __init__(
+            self,
+            redis: Any,
+            key_builder: Optional[KeyBuilder] = None,
+            ttl: Optional[int] = None
+    ):
+        """
+        Инициализирует хранилище.
+
+        Args:
+            redis: Асинхронный клиент Redis (redis.asyncio.Redis или совместимый)
+            key_builder: Построитель ключей (по умолчанию DefaultKeyBuilder)
+            ttl: Время жизни состояния и данных в секундах (None - без ограничения)
+        """
+        self.redis = redis
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True)
+        self.ttl = ttl
+
+        # Данные, прочитанные вместе с состоянием; отдаются один раз
+        self._prefetched: TTLCache = TTLCache(maxsize=10_000, ttl=PREFETCH_TTL)
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisStorage":
+        """
+        Создает хранилище по URL подключения к Redis.
+
+        Args:
+            url: URL подключения, например redis://localhost:6379/0
+            **kwargs: Остальные параметры конструктора
+
+        Returns:
+            RedisStorage: Экземпляр хранилища
+        """
+        from redis.asyncio import Redis
+
+        return cls(Redis.from_url(url), **kwargs)
+
+    def _queue_state(self, pipe: Any, key: StorageKey, state: Optional[str]) -> None:
+        """Добавляет запись состояния в конвейер"""
+        redis_key = self.key_builder.build(key, "state")
+        if state is None:
+            pipe.delete(redis_key)
+        else:
+            pipe.set(redis_key, state, ex=self.ttl)
+
+    def _queue_data(self, pipe: Any, key: StorageKey, data: Mapping[str, Any]) -> None:
+        """Добавляет запись данных в конвейер"""
+        redis_key = self.key_builder.build(key, "data")
+        if not data:
+            pipe.delete(redis_key)
+        else:
+            pipe.set(redis_key, json.dumps(dict(data), ensure_ascii=False), ex=self.ttl)
+
+    async def get_state_and_data(self, key: StorageKey) -> Tuple[Optional[str], Dict[str, Any]]:
+        """
+        Читает состояние и данные за один сетевой запрос.
+
+        Args:
+            key: Ключ хранилища
+
+        Returns:
+            Tuple[Optional[str], Dict[str, Any]]: Состояние и данные
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get(self.key_builder.build(key, "state"))
+        pipe.get(self.key_builder.build(key, "data"))
+        raw_state, raw_data = await pipe.execute()
+
+        state = raw_state.decode() if isinstance(raw_state, bytes) else raw_state
+        data = json.loads(raw_data) if raw_data else {}
+        return state, data
+
+    async def set_state_and_data(self, key: StorageKey, state: StateType, data: Mapping[str, Any]) -> None:
+        """
+        Записывает состояние и данные за один сетевой запрос.
+
+        Args:
+            key: Ключ хранилища
+            state: Новое состояние
+            data: Новые данные
+        """
+        self._prefetched.pop(key, None)
+        pipe = self.redis.pipeline(transaction=True)
+        self._queue_state(pipe, key, state.state if isinstance(state, State) else state)
+        self._queue_data(pipe, key, data)
+        await pipe.execute()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        redis_key = self.key_builder.build(key, "state")
+        state = state.state if isinstance(state, State) else state
+        if state is None:
+            await self.redis.delete(redis_key)
+        else:
+            await self.redis.set(redis_key, state, ex=self.ttl)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, data = await self.get_state_and_data(key)
+        self._prefetched[key] = data
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        self._prefetched.pop(key, None)
+        redis_key = self.key_builder.build(key, "data")
+        if not data:
+            await self.redis.delete(redis_key)
+        else:
+            await self.redis.set(redis_key, json.dumps(dict(data), ensure_ascii=False), ex=self.ttl)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        data = self._prefetched.pop(key, None)
+        if data is not None:
+            return data
+
+        value = await self.redis.get(self.key_builder.build(key, "data"))
+        return json.loads(value) if value else {}
+
+    async def close(self) -> None:
+        await self.redis.aclose()
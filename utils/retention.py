@@ -0,0 +1,438 @@
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update, delete, func, bindparam, Table
+
+import database
+from config import Config
+from models import Message as TicketMessage, MessageType, ArchivedTicket, ArchivedMessage, RetentionCheckpoint
+from utils.overload import get_overload_controller
+from utils.tickets import MESSAGES_TIME_MARGIN
+from utils.transcript import pack_transcript, unpack_transcript, transcript_text
+
+logger = logging.getLogger(__name__)
+
+# Таблицы, из которых удаляются устаревшие сообщения
+_TABLES = (TicketMessage.__table__, ArchivedMessage.__table__)
+
+# Таблицы, в которых id не растут вместе со временем вставки: ArchiveJob переносит в messages_archive
+# сообщения с исходными id в порядке закрытия тикетов, спустя долгое время после отправки.
+# Их диапазоны проходятся целиком при каждом запуске, а контрольная точка нужна только для того,
+# чтобы прерванный проход продолжился с того же места
+_UNORDERED_TABLES = frozenset({ArchivedMessage.__table__.name})
+
+# Контрольная точка прохода по сжатой переписке архивных тикетов (tickets_archive.transcript)
+TRANSCRIPT_POLICY = "tickets_archive:transcript"
+
+# Минимальная ширина диапазона id, до которой сужается DELETE при медленной БД
+MIN_BATCH_SIZE = 100
+
+# Сколько ждать перед следующим DELETE, пока бот перегружен (сек)
+OVERLOAD_PAUSE = 5.0
+
+
+class RetentionJob:
+    """
+    Удаляет сообщения старше срока хранения, заданного для их типа (например, системные
+    сообщения хранятся меньше текстовых), из таблиц messages и messages_archive.
+
+    Вместо одного DELETE по sent_at, который надолго блокирует таблицу, сообщения удаляются
+    короткими транзакциями по диапазонам первичного ключа (id > last_id AND id <= last_id + batch_size).
+    После каждого диапазона задача делает паузу, пропорциональную его длительности, так что
+    очистка занимает не больше max_load времени БД; если DELETE выполняется дольше
+    target_latency, диапазон сужается, если заметно быстрее - расширяется обратно до batch_size.
+    Пока бот перегружен (utils.overload), удаление приостанавливается.
+
+    Прогресс каждой политики хранится в retention_checkpoints, поэтому после перезапуска
+    очистка продолжается с последнего диапазона. В messages id растут вместе с sent_at, поэтому
+    диапазон считается пройденным, только если все его сообщения старше срока хранения; на первом
+    диапазоне с более новыми сообщениями проход по политике останавливается до следующего запуска.
+    В messages_archive сообщения попадают с исходными id в порядке архивации, поэтому таблица
+    проходится от начала до конца при каждом запуске (_UNORDERED_TABLES).
+
+    Сжатая переписка архивных тикетов (ARCHIVE_COMPRESS) проходится так же, диапазонами id
+    tickets_archive: переписка, в которой есть устаревшие сообщения, упаковывается заново без них
+    вместе с текстом сообщений (transcript_text), по которому работает поиск.
+    """
+
+    def __init__(
+            self,
+            policies: Dict[str, int],
+            batch_size: int = 5000,
+            target_latency: float = 0.1,
+            max_load: float = 0.2,
+            interval: float = 3600.0
+    ):
+        """
+        Инициализирует задачу очистки.
+
+        Args:
+            policies: Тип сообщения (значение MessageType, например "system") -> срок хранения в днях
+            batch_size: Максимальная ширина диапазона id для одного DELETE
+            target_latency: Желаемая длительность одного DELETE в секундах
+            max_load: Доля времени, которую очистка может занимать БД (0..1)
+            interval: Интервал запуска очистки в секундах
+        """
+        self.policies: List[Tuple[MessageType, int]] = []
+        for name, days in policies.items():
+            try:
+                message_type = MessageType(name.strip().lower())
+            except ValueError:
+                raise ValueError(f"Неизвестный тип сообщения в политике хранения: {name}. "
+                                 f"Доступны: {', '.join(t.value for t in MessageType)}")
+            if days <= 0:
+                raise ValueError(f"Срок хранения сообщений {name} должен быть больше нуля")
+            self.policies.append((message_type, days))
+
+        if not 0 < max_load <= 1:
+            raise ValueError("Доля нагрузки очистки должна быть в диапазоне (0, 1]")
+
+        self.batch_size = batch_size
+        self.target_latency = target_latency
+        self.max_load = max_load
+        self.interval = interval
+
+        self._window = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats: Dict[str, Any] = {
+            "runs": 0, "deleted": 0, "batches": 0, "repacked": 0, "overload_pauses": 0, "errors": 0,
+            "last_batch_seconds": 0.0, "last_run_seconds": 0.0,
+        }
+
+    def _pause(self, latency: float) -> float:
+        """Пауза после DELETE длительностью latency, при которой очистка занимает max_load времени."""
+        return latency * (1 - self.max_load) / self.max_load
+
+    def _adjust_window(self, latency: float) -> None:
+        """Сужает диапазон id после медленного DELETE и расширяет после быстрого."""
+        if latency > self.target_latency:
+            self._window = max(MIN_BATCH_SIZE, self._window // 2)
+        elif latency < self.target_latency / 2:
+            self._window = min(self.batch_size, self._window * 2)
+
+    async def _wait_for_capacity(self) -> None:
+        """Ждет, пока бот выйдет из режима перегрузки."""
+        controller = get_overload_controller()
+        while controller is not None and controller.overloaded:
+            self.stats["overload_pauses"] += 1
+            await asyncio.sleep(OVERLOAD_PAUSE)
+
+    @staticmethod
+    async def _checkpoint(session, policy: str) -> RetentionCheckpoint:
+        """Контрольная точка политики (создается при первом обращении)."""
+        checkpoint = await session.get(RetentionCheckpoint, policy)
+        if checkpoint is None:
+            checkpoint = RetentionCheckpoint(policy=policy, last_id=0, deleted=0)
+            session.add(checkpoint)
+        return checkpoint
+
+    async def purge_batch(self, table: Table, message_type: MessageType,
+                          cutoff: datetime, last_id: int, ordered: bool = True) -> Tuple[int, int, bool]:
+        """
+        Удаляет устаревшие сообщения одного типа в диапазоне id после last_id и сохраняет прогресс.
+
+        Args:
+            table: Таблица сообщений
+            message_type: Тип сообщения
+            cutoff: Сообщения, отправленные раньше, удаляются
+            last_id: Последний обработанный id
+            ordered: Id таблицы растут вместе с sent_at (иначе диапазон всегда считается пройденным)
+
+        Returns:
+            Tuple[int, int, bool]: Количество удаленных сообщений, новый last_id
+                и признак того, что диапазон пройден целиком
+        """
+        upper = last_id + self._window
+        in_range = (table.c.id > last_id) & (table.c.id <= upper)
+        policy = f"{table.name}:{message_type.value}"
+
+        async with database.async_session_factory() as session:
+            newest = None
+            if ordered:
+                newest = (await session.execute(select(func.max(table.c.sent_at)).where(in_range))).scalar()
+            result = await session.execute(
+                delete(table).where(
+                    in_range &
+                    (table.c.message_type == message_type) &
+                    (table.c.sent_at < cutoff)
+                )
+            )
+            deleted = max(result.rowcount or 0, 0)
+
+            # В диапазоне есть сообщения моложе срока хранения - к нему вернемся при следующем запуске
+            completed = newest is None or newest < cutoff
+            checkpoint = await self._checkpoint(session, policy)
+            if completed:
+                checkpoint.last_id = upper
+            checkpoint.deleted += deleted
+            await session.commit()
+
+        return deleted, upper if completed else last_id, completed
+
+    async def purge_policy(self, table: Table, message_type: MessageType, days: int) -> int:
+        """
+        Удаляет из таблицы сообщения типа message_type старше days дней.
+
+        Args:
+            table: Таблица сообщений
+            message_type: Тип сообщения
+            days: Срок хранения в днях
+
+        Returns:
+            int: Количество удаленных сообщений
+        """
+        cutoff = datetime.now() - timedelta(days=days)
+        policy = f"{table.name}:{message_type.value}"
+        ordered = table.name not in _UNORDERED_TABLES
+
+        async with database.async_session_factory() as session:
+            checkpoint = await session.get(RetentionCheckpoint, policy)
+            last_id = checkpoint.last_id if checkpoint else 0
+            max_id = (await session.execute(select(func.max(table.c.id)))).scalar() or 0
+
+        total = 0
+        while last_id < max_id:
+            await self._wait_for_capacity()
+
+            started = time.monotonic()
+            deleted, last_id, completed = await self.purge_batch(table, message_type, cutoff, last_id, ordered)
+            latency = time.monotonic() - started
+
+            total += deleted
+            self.stats["batches"] += 1
+            self.stats["deleted"] += deleted
+            self.stats["last_batch_seconds"] = round(latency, 4)
+            self._adjust_window(latency)
+
+            if not completed:
+                break
+            await asyncio.sleep(self._pause(latency))
+
+        # Проход по таблице без порядка id завершен - следующий запуск начнет его с начала
+        if not ordered and last_id >= max_id:
+            async with database.async_session_factory() as session:
+                checkpoint = await self._checkpoint(session, policy)
+                checkpoint.last_id = 0
+                await session.commit()
+
+        if total:
+            logger.info(f"Очистка {policy}: удалено сообщений старше {days} дн. - {total}")
+        return total
+
+    async def purge_transcripts_batch(self, cutoffs: Dict[str, datetime], last_id: int) -> Tuple[int, int]:
+        """
+        Удаляет устаревшие сообщения из сжатой переписки архивных тикетов в диапазоне id после last_id
+        и сохраняет прогресс.
+
+        Args:
+            cutoffs: Тип сообщения (значение MessageType) -> сообщения, отправленные раньше, удаляются
+            last_id: Последний обработанный id тикета
+
+        Returns:
+            Tuple[int, int]: Количество удаленных сообщений и новый last_id
+        """
+        archive = ArchivedTicket.__table__
+        upper = last_id + self._window
+        # Сообщения не старше своего тикета, поэтому переписку тикетов моложе всех сроков не распаковываем
+        created_before = max(cutoffs.values()) + MESSAGES_TIME_MARGIN
+
+        async with database.async_session_factory() as session:
+            rows = (await session.execute(
+                select(archive.c.id, archive.c.transcript, archive.c.transcript_text).where(
+                    (archive.c.id > last_id) & (archive.c.id <= upper) &
+                    archive.c.transcript.isnot(None) &
+                    (archive.c.created_at.is_(None) | (archive.c.created_at < created_before))
+                )
+            )).all()
+
+            deleted = 0
+            repacked = []
+            for ticket_id, transcript, text in rows:
+                try:
+                    messages = unpack_transcript(transcript, text)
+                except ValueError as e:
+                    logger.error(f"Пропущена переписка архивного тикета #{ticket_id}: {e}")
+                    continue
+
+                kept = [
+                    message for message in messages
+                    if not (message["message_type"] in cutoffs and message["sent_at"] is not None
+                            and message["sent_at"] < cutoffs[message["message_type"]])
+                ]
+                if len(kept) < len(messages):
+                    deleted += len(messages) - len(kept)
+                    repacked.append({
+                        "ticket_id": ticket_id,
+                        "packed": pack_transcript(kept),
+                        "packed_text": transcript_text(kept),
+                    })
+
+            if repacked:
+                await session.execute(
+                    update(archive).where(archive.c.id == bindparam("ticket_id")).values(
+                        transcript=bindparam("packed"), transcript_text=bindparam("packed_text")
+                    ),
+                    repacked
+                )
+
+            checkpoint = await self._checkpoint(session, TRANSCRIPT_POLICY)
+            checkpoint.last_id = upper
+            checkpoint.deleted += deleted
+            await session.commit()
+
+        self.stats["repacked"] += len(repacked)
+        return deleted, upper
+
+    async def purge_transcripts(self) -> int:
+        """
+        Применяет все политики хранения к сжатой переписке архивных тикетов. Каждая переписка
+        распаковывается не больше одного раза за проход, сразу для всех политик.
+
+        Returns:
+            int: Количество удаленных сообщений
+        """
+        now = datetime.now()
+        cutoffs = {message_type.value: now - timedelta(days=days) for message_type, days in self.policies}
+        archive = ArchivedTicket.__table__
+
+        async with database.async_session_factory() as session:
+            checkpoint = await session.get(RetentionCheckpoint, TRANSCRIPT_POLICY)
+            last_id = checkpoint.last_id if checkpoint else 0
+            max_id = (await session.execute(select(func.max(archive.c.id)))).scalar() or 0
+
+        total = 0
+        while last_id < max_id:
+            await self._wait_for_capacity()
+
+            started = time.monotonic()
+            deleted, last_id = await self.purge_transcripts_batch(cutoffs, last_id)
+            latency = time.monotonic() - started
+
+            total += deleted
+            self.stats["batches"] += 1
+            self.stats["deleted"] += deleted
+            self.stats["last_batch_seconds"] = round(latency, 4)
+            self._adjust_window(latency)
+            await asyncio.sleep(self._pause(latency))
+
+        # Id архивных тикетов не растут со временем архивации - следующий запуск начнет проход с начала
+        async with database.async_session_factory() as session:
+            checkpoint = await self._checkpoint(session, TRANSCRIPT_POLICY)
+            checkpoint.last_id = 0
+            await session.commit()
+
+        if total:
+            logger.info(f"Очистка {TRANSCRIPT_POLICY}: удалено сообщений из сжатой переписки - {total}")
+        return total
+
+    async def run_once(self) -> int:
+        """
+        Применяет все политики хранения к обеим таблицам сообщений и к сжатой переписке.
+
+        Returns:
+            int: Количество удаленных сообщений
+        """
+        started = time.monotonic()
+        total = 0
+        for table in _TABLES:
+            for message_type, days in self.policies:
+                total += await self.purge_policy(table, message_type, days)
+        if self.policies:
+            total += await self.purge_transcripts()
+
+        self.stats["runs"] += 1
+        self.stats["last_run_seconds"] = round(time.monotonic() - started, 3)
+        return total
+
+    async def _run(self) -> None:
+        """Цикл очистки."""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Ошибка при удалении устаревших сообщений: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> asyncio.Task:
+        """
+        Запускает очистку в фоновой задаче.
+
+        Returns:
+            asyncio.Task: Фоновая задача
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self) -> None:
+        """Останавливает очистку."""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Возвращает счетчики очистки.
+
+        Returns:
+            Dict[str, Any]: Статистика очистки
+        """
+        return {
+            "policies": {message_type.value: days for message_type, days in self.policies},
+            "batch_size": self._window,
+            **self.stats,
+        }
+
+
+# Глобальный экземпляр задачи очистки
+_retention_job = None
+
+
+def setup_retention_job(config: Optional[Config] = None) -> Optional[RetentionJob]:
+    """
+    Инициализирует глобальную задачу удаления устаревших сообщений.
+
+    Args:
+        config: Объект конфигурации
+
+    Returns:
+        Optional[RetentionJob]: Экземпляр задачи или None, если очистка отключена или политики не заданы
+    """
+    global _retention_job
+
+    if config is None or not config.retention.enabled or not config.retention.policies:
+        _retention_job = None
+        return None
+
+    _retention_job = RetentionJob(
+        policies=config.retention.policies,
+        batch_size=config.retention.batch_size,
+        target_latency=config.retention.target_latency,
+        max_load=config.retention.max_load,
+        interval=config.retention.interval,
+    )
+
+    policies = ", ".join(f"{message_type.value} - {days} дн." for message_type, days in _retention_job.policies)
+    logger.info(f"Удаление устаревших сообщений: {policies}")
+    return _retention_job
+
+
+def get_retention_job() -> Optional[RetentionJob]:
+    """
+    Возвращает глобальную задачу удаления устаревших сообщений.
+
+    Returns:
+        Optional[RetentionJob]: Экземпляр задачи или None, если очистка отключена
+    """
+    return _retention_job
@@ -0,0 +1,309 @@
+import re
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple, Union
+
+from sqlalchemy import select, text, func
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from models import User, Ticket, ArchivedTicket
+from utils.partitions import messages_partitioned
+
+logger = logging.getLogger(__name__)
+
+# Совпадение в теме тикета весит больше, чем совпадение в сообщении
+SUBJECT_WEIGHT = 2.0
+
+# Максимальное количество слов в поисковом запросе
+MAX_TERMS = 8
+
+# Окно поиска по живым сообщениям через LIKE, если таблица messages секционирована
+LIVE_TEXT_WINDOW = timedelta(days=92)
+
+# Релевантность совпадения, найденного через LIKE
+LIKE_SCORE = 1.0
+
+_term_pattern = re.compile(r"\w+", re.UNICODE)
+
+# Источники полнотекстового поиска: (таблица, столбец с ID тикета, столбец с текстом, таблица FTS5 в SQLite)
+# для темы тикета и текста сообщений в живых и архивных таблицах (архив заполняет utils.archive.ArchiveJob;
+# текст сжатой переписки ищется по tickets_archive.transcript_text - одна строка на тикет)
+_SUBJECT_SOURCES = (
+    ("tickets", "id", "subject", "tickets_fts"),
+    ("tickets_archive", "id", "subject", "tickets_archive_fts"),
+)
+_TEXT_SOURCES = (
+    ("messages", "ticket_id", "text", "messages_fts"),
+    ("messages_archive", "ticket_id", "text", "messages_archive_fts"),
+    ("tickets_archive", "id", "transcript_text", "tickets_archive_transcript_fts"),
+)
+
+
+def _sqlite_fts_ddl(table: str, column: str, fts: str) -> List[str]:
+    """
+    Таблица FTS5 и триггеры для полнотекстового индекса SQLite по столбцу таблицы.
+    Таблица хранит только индекс, текст берется из исходной таблицы (external content),
+    а триггеры обновляют индекс при вставке, изменении и удалении строк. В MySQL
+    используются FULLTEXT-индексы (см. модели и миграции), которые InnoDB обновляет сама.
+    """
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{column}, content='{table}', content_rowid='id', tokenize='unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {column} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END",
+    ]
+
+
+def _mysql_hits(like_terms: int = 0) -> str:
+    """
+    Совпадения по темам и сообщениям, score - релевантность (больше - лучше).
+
+    В секционированной таблице messages FULLTEXT-индекс невозможен (ограничение MySQL),
+    поэтому при like_terms > 0 живые сообщения ищутся через LIKE по каждому из слов,
+    только в секциях за последние LIVE_TEXT_WINDOW (старые сообщения к этому времени
+    обычно уже в messages_archive с FULLTEXT-индексом).
+    """
+    text_sources = _TEXT_SOURCES if not like_terms else [
+        source for source in _TEXT_SOURCES if source[0] != "messages"
+    ]
+    parts = [
+        f"SELECT s.{key} AS ticket_id, "
+        f"MATCH(s.{column}) AGAINST(:query IN NATURAL LANGUAGE MODE){weight} AS score "
+        f"FROM {table} s WHERE MATCH(s.{column}) AGAINST(:query IN NATURAL LANGUAGE MODE)"
+        for sources, weight in (
+            (_SUBJECT_SOURCES, " * :subject_weight"),
+            (text_sources, ""),
+        )
+        for table, key, column, _fts in sources
+    ]
+    if like_terms:
+        conditions = " OR ".join(f"s.text LIKE :like_{i}" for i in range(like_terms))
+        parts.append(
+            f"SELECT s.ticket_id AS ticket_id, :like_score AS score FROM messages s "
+            f"WHERE s.sent_at >= :live_since AND ({conditions})"
+        )
+    return " UNION ALL ".join(parts)
+
+
+def _sqlite_hits() -> str:
+    """То же для FTS5: bm25() возвращает отрицательные значения (меньше - лучше), поэтому меняем знак."""
+    parts = [
+        f"SELECT s.{key} AS ticket_id, -bm25({fts}){weight} AS score "
+        f"FROM {fts} JOIN {table} s ON s.id = {fts}.rowid "
+        f"WHERE {fts} MATCH :query"
+        for sources, weight in (
+            (_SUBJECT_SOURCES, " * :subject_weight"),
+            (_TEXT_SOURCES, ""),
+        )
+        for table, key, _column, fts in sources
+    ]
+    return " UNION ALL ".join(parts)
+
+
+_MYSQL_HITS = _mysql_hits()
+_SQLITE_HITS = _sqlite_hits()
+
+
+def search_terms(query: str) -> List[str]:
+    """
+    Разбивает поисковый запрос на слова.
+
+    Args:
+        query: Текст запроса
+
+    Returns:
+        List[str]: Слова запроса (не больше MAX_TERMS)
+    """
+    return _term_pattern.findall(query.lower())[:MAX_TERMS]
+
+
+async def setup_search(engine: AsyncEngine) -> None:
+    """
+    Создает полнотекстовые индексы, которые не описываются моделями.
+
+    Для SQLite создаются таблицы FTS5 и триггеры; если индекс создан впервые,
+    он заполняется из существующих тикетов и сообщений. Для MySQL ничего не делает:
+    FULLTEXT-индексы создаются вместе с таблицами или миграцией.
+
+    Args:
+        engine: Движок БД
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    async with engine.begin() as conn:
+        for table, _key, column, fts in _SUBJECT_SOURCES + _TEXT_SOURCES:
+            existing = await conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": fts}
+            )
+            created = existing.first() is None
+
+            for statement in _sqlite_fts_ddl(table, column, fts):
+                await conn.execute(text(statement))
+
+            if created:
+                await conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+                logger.info(f"Полнотекстовый индекс {table}.{column} построен")
+
+
+async def search_tickets(
+        session: AsyncSession,
+        query: str,
+        limit: int = 10,
+        after: Optional[Tuple[float, int]] = None
+) -> List[Tuple[int, float]]:
+    """
+    Ищет тикеты (живые и архивные) по словам в теме и тексте сообщений.
+
+    Тикеты ранжируются по лучшему совпадению (тема весит SUBJECT_WEIGHT), при равной
+    релевантности - сначала более новые. Страницы выбираются по ключу (score, ticket_id)
+    последнего результата предыдущей страницы, а не через OFFSET.
+
+    Args:
+        session: Сессия БД
+        query: Текст запроса
+        limit: Количество результатов на странице
+        after: Ключ (score, ticket_id) последнего результата предыдущей страницы
+
+    Returns:
+        List[Tuple[int, float]]: Пары (ID тикета, релевантность)
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    if session.bind.dialect.name == "sqlite":
+        hits = _SQLITE_HITS
+        # Каждое слово берется в кавычки, чтобы символы запроса не разбирались как синтаксис FTS5
+        match = " OR ".join(f'"{term}"' for term in terms)
+    else:
+        hits = _MYSQL_HITS
+        match = " ".join(terms)
+
+    params = {"query": match, "subject_weight": SUBJECT_WEIGHT, "limit": limit}
+
+    if session.bind.dialect.name == "mysql" and messages_partitioned():
+        hits = _mysql_hits(like_terms=len(terms))
+        params["like_score"] = LIKE_SCORE
+        params["live_since"] = datetime.now() - LIVE_TEXT_WINDOW
+        for i, term in enumerate(terms):
+            params[f"like_{i}"] = "%" + term.replace("_", "\\_") + "%"
+    having = ""
+    if after is not None:
+        having = (
+            "HAVING MAX(score) < :after_score "
+            "OR (MAX(score) = :after_score AND ticket_id < :after_id) "
+        )
+        params["after_score"], params["after_id"] = after
+
+    statement = text(
+        f"SELECT ticket_id, MAX(score) AS score FROM ({hits}) AS hits "
+        f"GROUP BY ticket_id {having}"
+        f"ORDER BY score DESC, ticket_id DESC LIMIT :limit"
+    )
+    result = await session.execute(statement, params)
+    return [(row.ticket_id, float(row.score)) for row in result]
+
+
+def _prefix_range(column, prefix: str):
+    """
+    Условие "lower(column) начинается с prefix" в виде диапазона
+    prefix <= lower(column) < следующая строка после prefix.
+    В отличие от LIKE, диапазон по выражению использует индекс и в MySQL, и в SQLite,
+    а символы % и _ в запросе сравниваются как обычные символы.
+    """
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    expression = func.lower(column)
+    return (expression >= prefix) & (expression < upper)
+
+
+async def find_users(session: AsyncSession, query: str, limit: int = 10) -> List[User]:
+    """
+    Ищет пользователей по telegram_id, @username или началу имени.
+
+    - число - точное совпадение telegram_id;
+    - @username - начало username без учета регистра;
+    - иначе - начало имени (first_name) или username без учета регистра;
+      второе слово запроса сравнивается с началом фамилии.
+
+    Каждый вариант выполняется по индексу (уникальный индекс telegram_id,
+    ix_users_username_lower, ix_users_first_name_lower), поэтому время поиска
+    не зависит от количества пользователей.
+
+    Args:
+        session: Сессия БД
+        query: Текст запроса
+        limit: Максимальное количество пользователей
+
+    Returns:
+        List[User]: Найденные пользователи
+    """
+    query = query.strip()
+    if not query:
+        return []
+
+    if query.isdigit():
+        result = await session.execute(select(User).where(User.telegram_id == int(query)))
+        return list(result.scalars().all())
+
+    if query.startswith("@"):
+        username = query[1:].lower()
+        if not username:
+            return []
+        result = await session.execute(
+            select(User).where(_prefix_range(User.username, username))
+            .order_by(func.lower(User.username)).limit(limit)
+        )
+        return list(result.scalars().all())
+
+    words = query.lower().split()
+    first_name_query = select(User).where(_prefix_range(User.first_name, words[0]))
+    if len(words) > 1:
+        first_name_query = first_name_query.where(_prefix_range(User.last_name, words[1]))
+    first_name_query = first_name_query.order_by(func.lower(User.first_name)).limit(limit)
+
+    users = list((await session.execute(first_name_query)).scalars().all())
+
+    # Имя может быть не указано или совпадать с ником - дополняем совпадениями по username
+    if len(users) < limit and len(words) == 1:
+        found = {user.id for user in users}
+        username_query = select(User).where(
+            _prefix_range(User.username, words[0])
+        ).order_by(func.lower(User.username)).limit(limit)
+        for user in (await session.execute(username_query)).scalars().all():
+            if user.id not in found and len(users) < limit:
+                users.append(user)
+
+    return users
+
+
+async def get_user_tickets(session: AsyncSession, user_id: int,
+                           limit: int = 20) -> List[Union[Ticket, ArchivedTicket]]:
+    """
+    Возвращает тикеты пользователя из живой и архивной таблиц, сначала новые
+    (по индексам ix_tickets_user_created и ix_tickets_archive_user_created).
+
+    Args:
+        session: Сессия БД
+        user_id: ID пользователя (users.id)
+        limit: Максимальное количество тикетов
+
+    Returns:
+        List[Union[Ticket, ArchivedTicket]]: Тикеты пользователя
+    """
+    tickets = []
+    for model in (Ticket, ArchivedTicket):
+        result = await session.execute(
+            select(model).where(model.user_id == user_id)
+            .order_by(model.created_at.desc(), model.id.desc()).limit(limit)
+        )
+        tickets.extend(result.scalars().all())
+
+    tickets.sort(key=lambda ticket: (ticket.created_at, ticket.id), reverse=True)
+    return tickets[:limit]
@@ -0,0 +1,357 @@
+import re
+import math
+import time
+import asyncio
+import logging
+from collections import deque, OrderedDict
+from typing import Any, Deque, Dict, List, Optional
+
+from cachetools import LRUCache
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+import database
+from config import Config
+from utils.query_budget import UpdateQueries, current_update
+
+logger = logging.getLogger(__name__)
+
+# Сколько последних длительностей хранится для расчета p50/p95
+SAMPLE_SIZE = 1000
+
+# Сколько разных текстов запросов хранить с уже вычисленным отпечатком
+FINGERPRINT_CACHE_SIZE = 4096
+
+# Источник запросов вне обработки апдейтов (фоновые задачи)
+BACKGROUND = "background"
+
+# Источник запросов апдейта до выбора обработчика (outer middleware, фильтры): update:<тип апдейта>
+UPDATE_SOURCE = "update:{}"
+
+# Нормализация запроса в отпечаток: комментарии, литералы и параметры заменяются на ?,
+# списки IN (...) и VALUES (...), (...) сворачиваются, пробелы схлопываются
+_comments = re.compile(r"/\*.*?\*/|--[^\n]*", re.DOTALL)
+_strings = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_numbers = re.compile(r"\b\d+(?:\.\d+)?\b")
+_placeholders = re.compile(r"%\(\w+\)s|%s|(?<![:\w]):\w+|\?")
+_in_lists = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_values_lists = re.compile(r"(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+")
+_whitespace = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """
+    Приводит SQL-запрос к отпечатку: запросы, которые отличаются только значениями,
+    количеством элементов в IN (...) или строк в VALUES, получают один отпечаток.
+
+    Args:
+        statement: Текст запроса
+
+    Returns:
+        str: Отпечаток запроса
+    """
+    statement = _comments.sub(" ", statement)
+    statement = _strings.sub("?", statement)
+    statement = _numbers.sub("?", statement)
+    statement = _placeholders.sub("?", statement)
+    statement = _in_lists.sub("IN (...)", statement)
+    statement = _values_lists.sub(r"\1, ...", statement)
+    return _whitespace.sub(" ", statement).strip()
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    """Перцентиль по отсортированному списку (nearest rank)."""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+def query_source(queries: Optional[UpdateQueries]) -> str:
+    """
+    Источник запроса для отчета: обработчик, апдейт без выбранного обработчика или фоновая задача.
+
+    Args:
+        queries: Счетчик запросов текущего апдейта (None вне обработки апдейтов)
+
+    Returns:
+        str: Имя обработчика, update:<тип апдейта> или background
+    """
+    if queries is None:
+        return BACKGROUND
+    if queries.handler:
+        return queries.handler
+    return UPDATE_SOURCE.format(queries.update_type or "unknown")
+
+
+class _FingerprintStats:
+    """Накопленная статистика одного отпечатка."""
+
+    def __init__(self):
+        self.count = 0
+        self.slow = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: Deque[float] = deque(maxlen=SAMPLE_SIZE)
+        self.handlers: Dict[str, int] = {}
+        self.slow_handlers: Dict[str, int] = {}
+
+
+class SlowQueryLog:
+    """
+    Журнал медленных запросов к БД без включения slow log в MySQL.
+
+    Каждый запрос приводится к отпечатку (fingerprint) - тексту без литералов и значений
+    параметров. Для отпечатка накапливаются количество выполнений, суммарное время, максимум,
+    p50/p95 по последним SAMPLE_SIZE выполнениям и обработчики, из которых запрос выполнялся
+    (имя берется из контекста апдейта, см. utils.query_budget; до выбора обработчика -
+    update:<тип апдейта>, вне апдейтов - background).
+    Отпечатков хранится не больше max_fingerprints: при переполнении вытесняется давно
+    не встречавшийся отпечаток без медленных выполнений, а медленные остаются до reset().
+    Отчет показывает отпечатки, которые хотя бы раз выполнялись дольше threshold,
+    по убыванию суммарного времени: сверху - запросы, которым индекс или переписывание
+    даст больше всего. Отчет доступен по команде /slow_queries и раз в dump_interval
+    секунд пишется в лог.
+    """
+
+    def __init__(self, threshold: float = 0.1, dump_interval: float = 3600.0, max_fingerprints: int = 1000):
+        """
+        Инициализирует журнал.
+
+        Args:
+            threshold: С какой длительности (сек) запрос считается медленным
+            dump_interval: Интервал записи отчета в лог (сек); 0 - не записывать
+            max_fingerprints: Максимальное количество отпечатков в памяти
+        """
+        self.threshold = threshold
+        self.dump_interval = dump_interval
+        self.max_fingerprints = max_fingerprints
+
+        self._stats: Dict[str, _FingerprintStats] = {}
+        # Отпечатки без медленных выполнений в порядке последнего выполнения - кандидаты на вытеснение
+        self._fast: "OrderedDict[str, None]" = OrderedDict()
+        self._fingerprints: LRUCache = LRUCache(maxsize=FINGERPRINT_CACHE_SIZE)
+        self._since = time.time()
+        self._task: Optional[asyncio.Task] = None
+
+        self.dropped = 0
+        self.evicted = 0
+
+    def record(self, statement: str, duration: float, handler: Optional[str] = None) -> None:
+        """
+        Учитывает выполненный запрос.
+
+        Args:
+            statement: Текст запроса
+            duration: Длительность (сек)
+            handler: Источник запроса (query_source); None - фоновая задача
+        """
+        # SQLAlchemy выполняет одни и те же тексты запросов, поэтому отпечаток вычисляется один раз
+        key = self._fingerprints.get(statement)
+        if key is None:
+            key = self._fingerprints[statement] = fingerprint(statement)
+
+        stats = self._stats.get(key)
+        if stats is None:
+            if len(self._stats) >= self.max_fingerprints:
+                if not self._fast:
+                    # Все отпечатки уже были медленными - их не вытесняем
+                    self.dropped += 1
+                    return
+                evicted, _ = self._fast.popitem(last=False)
+                del self._stats[evicted]
+                self.evicted += 1
+            stats = self._stats[key] = _FingerprintStats()
+            self._fast[key] = None
+        elif not stats.slow:
+            self._fast.move_to_end(key)
+
+        handler = handler or BACKGROUND
+        stats.count += 1
+        stats.total += duration
+        stats.max = max(stats.max, duration)
+        stats.samples.append(duration)
+        stats.handlers[handler] = stats.handlers.get(handler, 0) + 1
+        if duration >= self.threshold:
+            if not stats.slow:
+                del self._fast[key]
+            stats.slow += 1
+            stats.slow_handlers[handler] = stats.slow_handlers.get(handler, 0) + 1
+
+    def instrument(self, engine: AsyncEngine) -> None:
+        """
+        Подключает журнал к движку БД.
+
+        Args:
+            engine: Движок БД
+        """
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("slow_log_started", []).append(time.perf_counter())
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            # Движок мог быть подключен к журналу, когда запрос уже выполнялся
+            started = conn.info.get("slow_log_started")
+            if not started:
+                return
+            duration = time.perf_counter() - started.pop()
+            self.record(statement, duration, query_source(current_update()))
+
+        @event.listens_for(sync_engine, "handle_error")
+        def _error(context):
+            started = context.connection.info.get("slow_log_started") if context.connection is not None else None
+            if started:
+                started.pop()
+
+    def top(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Возвращает отпечатки с медленными выполнениями, сначала с наибольшим суммарным временем.
+
+        Args:
+            limit: Количество отпечатков
+
+        Returns:
+            List[Dict[str, Any]]: Статистика отпечатков
+        """
+        slow = [(key, stats) for key, stats in self._stats.items() if stats.slow]
+        slow.sort(key=lambda item: item[1].total, reverse=True)
+
+        result = []
+        for key, stats in slow[:limit]:
+            samples = sorted(stats.samples)
+            handlers = stats.slow_handlers or stats.handlers
+            result.append({
+                "fingerprint": key,
+                "count": stats.count,
+                "slow": stats.slow,
+                "total": stats.total,
+                "p50": _percentile(samples, 50),
+                "p95": _percentile(samples, 95),
+                "max": stats.max,
+                "handlers": sorted(handlers.items(), key=lambda item: item[1], reverse=True),
+            })
+        return result
+
+    def format_report(self, limit: int = 10, max_fingerprint_length: int = 300) -> str:
+        """
+        Возвращает текстовый отчет о медленных запросах.
+
+        Args:
+            limit: Количество отпечатков
+            max_fingerprint_length: Максимальная длина отпечатка в отчете
+
+        Returns:
+            str: Отчет
+        """
+        minutes = (time.time() - self._since) / 60
+        entries = self.top(limit)
+        if not entries:
+            return f"Запросов дольше {self.threshold * 1000:.0f} мс не было (за {minutes:.0f} мин)"
+
+        lines = [f"Запросы дольше {self.threshold * 1000:.0f} мс за {minutes:.0f} мин, по суммарному времени:"]
+        for number, entry in enumerate(entries, 1):
+            handlers = ", ".join(f"{name} ({count})" for name, count in entry["handlers"][:3])
+            statement = entry["fingerprint"]
+            if len(statement) > max_fingerprint_length:
+                statement = statement[:max_fingerprint_length] + "..."
+            lines.append("")
+            lines.append(
+                f"{number}. выполнений {entry['count']}, медленных {entry['slow']}, всего {entry['total']:.2f} с; "
+                f"p50 {entry['p50'] * 1000:.1f} мс, p95 {entry['p95'] * 1000:.1f} мс, max {entry['max'] * 1000:.1f} мс"
+            )
+            lines.append(f"   Обработчики: {handlers}")
+            lines.append(f"   {statement}")
+        if self.evicted:
+            lines.append("")
+            lines.append(f"Вытеснено отпечатков без медленных выполнений: {self.evicted}")
+        if self.dropped:
+            lines.append("")
+            lines.append(f"Не учтено запросов сверх {self.max_fingerprints} медленных отпечатков: {self.dropped}")
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        """Сбрасывает накопленную статистику (например, после добавления индекса)."""
+        self._stats.clear()
+        self._fast.clear()
+        self._since = time.time()
+        self.dropped = 0
+        self.evicted = 0
+
+    async def _run(self) -> None:
+        """Цикл записи отчета в лог."""
+        while True:
+            await asyncio.sleep(self.dump_interval)
+            if self.top(1):
+                logger.warning(self.format_report())
+
+    def start(self) -> Optional[asyncio.Task]:
+        """
+        Запускает периодическую запись отчета в лог.
+
+        Returns:
+            Optional[asyncio.Task]: Фоновая задача или None, если запись отключена
+        """
+        if self.dump_interval <= 0:
+            return None
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self) -> None:
+        """Останавливает запись отчета."""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+# Глобальный экземпляр журнала медленных запросов
+_slow_query_log = None
+
+
+def setup_slow_query_log(config: Optional[Config] = None) -> Optional[SlowQueryLog]:
+    """
+    Инициализирует глобальный журнал медленных запросов и подключает его к движку БД.
+
+    Args:
+        config: Объект конфигурации (если None, используются значения по умолчанию)
+
+    Returns:
+        Optional[SlowQueryLog]: Экземпляр журнала или None, если журнал отключен
+    """
+    global _slow_query_log
+
+    if config is None:
+        _slow_query_log = SlowQueryLog()
+    elif not config.slow_queries.enabled:
+        _slow_query_log = None
+        return None
+    else:
+        _slow_query_log = SlowQueryLog(
+            threshold=config.slow_queries.threshold,
+            dump_interval=config.slow_queries.dump_interval,
+            max_fingerprints=config.slow_queries.max_fingerprints,
+        )
+
+    if database.engine is not None:
+        _slow_query_log.instrument(database.engine)
+
+    logger.info(f"Журнал медленных запросов: порог {_slow_query_log.threshold * 1000:.0f} мс")
+    return _slow_query_log
+
+
+def get_slow_query_log() -> Optional[SlowQueryLog]:
+    """
+    Возвращает глобальный журнал медленных запросов.
+
+    Returns:
+        Optional[SlowQueryLog]: Экземпляр журнала или None, если журнал отключен
+    """
+    return _slow_query_log
@@ -0,0 +1,275 @@
+import enum
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from config import Config
+from models import User, Ticket, TicketStatus, Message as TicketMessage
+
+logger = logging.getLogger(__name__)
+
+# Уровни приоритета тикета
+PRIORITY_NORMAL = 0
+PRIORITY_HIGH = 1
+PRIORITY_URGENT = 2
+PRIORITY_LABELS = {PRIORITY_NORMAL: "обычный", PRIORITY_HIGH: "высокий", PRIORITY_URGENT: "срочный"}
+PRIORITY_ICONS = {PRIORITY_NORMAL: "🔹", PRIORITY_HIGH: "🟠", PRIORITY_URGENT: "🔴"}
+
+# Максимальный лимит тикетов, которые модератор может вести одновременно
+MAX_MODERATOR_CAPACITY = 10
+
+# На сколько каждый уровень приоритета продвигает тикет в очереди
+_priority_step = timedelta(minutes=30)
+
+# Запас при отсечении сообщений по времени создания тикета (на случай расхождения часов)
+MESSAGES_TIME_MARGIN = timedelta(days=1)
+
+
+class ClaimResult(enum.Enum):
+    """Результат попытки назначить тикет модератору"""
+    CLAIMED = "claimed"  # Тикет назначен
+    TAKEN = "taken"  # Тикет уже не в нужном состоянии (взят другим модератором, закрыт и т.п.)
+    BUSY = "busy"  # Модератор уже ведет максимальное количество тикетов
+
+
+async def _reserve_slot(session: AsyncSession, moderator_id: int) -> bool:
+    """
+    Занимает у модератора место под тикет, если он не достиг своего лимита.
+    Условный UPDATE блокирует строку модератора, поэтому одновременные попытки
+    не могут превысить users.max_active_tickets.
+    """
+    result = await session.execute(
+        update(User)
+        .where((User.id == moderator_id) & (User.active_tickets < User.max_active_tickets))
+        .values(active_tickets=User.active_tickets + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+async def _release_slot(session: AsyncSession, moderator_id: int) -> None:
+    """Освобождает у модератора место под тикет."""
+    await session.execute(
+        update(User)
+        .where((User.id == moderator_id) & (User.active_tickets > 0))
+        .values(active_tickets=User.active_tickets - 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def claim_ticket(session: AsyncSession, ticket_id: int, moderator_id: int) -> ClaimResult:
+    """
+    Назначает открытый тикет модератору условными UPDATE.
+
+    Сначала занимается место в счетчике users.active_tickets (не больше
+    users.max_active_tickets), затем тикет назначается, только если он все еще
+    открыт и не назначен, поэтому из нескольких одновременных попыток успешной
+    будет ровно одна. При неудаче транзакция откатывается вместе со счетчиком.
+    Транзакция не фиксируется: вызывающий код добавляет системное сообщение
+    и вызывает commit().
+
+    Args:
+        session: Сессия БД
+        ticket_id: ID тикета
+        moderator_id: ID модератора (users.id)
+
+    Returns:
+        ClaimResult: Результат назначения
+    """
+    if not await _reserve_slot(session, moderator_id):
+        await session.rollback()
+        return ClaimResult.BUSY
+
+    result = await session.execute(
+        update(Ticket)
+        .where(
+            (Ticket.id == ticket_id) &
+            (Ticket.status == TicketStatus.OPEN) &
+            (Ticket.moderator_id.is_(None))
+        )
+        .values(moderator_id=moderator_id, status=TicketStatus.IN_PROGRESS, updated_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
+
+    if result.rowcount != 1:
+        await session.rollback()
+        return ClaimResult.TAKEN
+
+    return ClaimResult.CLAIMED
+
+
+async def transfer_ticket(session: AsyncSession, ticket_id: int,
+                          from_moderator_id: int, to_moderator_id: int) -> ClaimResult:
+    """
+    Переназначает тикет в работе другому модератору условными UPDATE
+    с учетом лимита тикетов нового модератора.
+
+    Транзакция не фиксируется: вызывающий код добавляет системное сообщение и вызывает commit().
+
+    Args:
+        session: Сессия БД
+        ticket_id: ID тикета
+        from_moderator_id: ID текущего модератора
+        to_moderator_id: ID нового модератора
+
+    Returns:
+        ClaimResult: Результат переназначения
+    """
+    if not await _reserve_slot(session, to_moderator_id):
+        await session.rollback()
+        return ClaimResult.BUSY
+
+    result = await session.execute(
+        update(Ticket)
+        .where(
+            (Ticket.id == ticket_id) &
+            (Ticket.status == TicketStatus.IN_PROGRESS) &
+            (Ticket.moderator_id == from_moderator_id)
+        )
+        .values(moderator_id=to_moderator_id, updated_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
+
+    if result.rowcount != 1:
+        await session.rollback()
+        return ClaimResult.TAKEN
+
+    await _release_slot(session, from_moderator_id)
+    return ClaimResult.CLAIMED
+
+
+async def resolve_ticket(session: AsyncSession, ticket_id: int, moderator_id: int) -> bool:
+    """
+    Отмечает тикет в работе как решенный и освобождает место модератора.
+    Транзакция не фиксируется: вызывающий код вызывает commit().
+
+    Args:
+        session: Сессия БД
+        ticket_id: ID тикета
+        moderator_id: ID модератора, который ведет тикет
+
+    Returns:
+        bool: True, если тикет отмечен как решенный
+    """
+    result = await session.execute(
+        update(Ticket)
+        .where(
+            (Ticket.id == ticket_id) &
+            (Ticket.status == TicketStatus.IN_PROGRESS) &
+            (Ticket.moderator_id == moderator_id)
+        )
+        .values(status=TicketStatus.RESOLVED, updated_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
+
+    if result.rowcount != 1:
+        return False
+
+    await _release_slot(session, moderator_id)
+    return True
+
+
+async def get_active_ticket_ids(session: AsyncSession, moderator_id: int) -> List[int]:
+    """
+    Возвращает ID тикетов, которые модератор сейчас ведет.
+
+    Args:
+        session: Сессия БД
+        moderator_id: ID модератора (users.id)
+
+    Returns:
+        List[int]: ID тикетов в порядке принятия
+    """
+    query = select(Ticket.id).where(
+        (Ticket.moderator_id == moderator_id) &
+        (Ticket.status == TicketStatus.IN_PROGRESS)
+    ).order_by(Ticket.updated_at.asc(), Ticket.id.asc())
+    result = await session.execute(query)
+    return list(result.scalars().all())
+
+
+async def load_ticket_messages(session: AsyncSession, ticket: Ticket) -> List[TicketMessage]:
+    """
+    Загружает сообщения тикета в ticket.messages.
+
+    Сообщения не бывают старше тикета, поэтому запрос дополнительно ограничен
+    sent_at >= created_at (с запасом в сутки). В секционированной по месяцам
+    таблице messages это позволяет MySQL читать только секции начиная с месяца
+    создания тикета, а не индекс ticket_id в каждой секции.
+
+    Args:
+        session: Сессия БД
+        ticket: Тикет
+
+    Returns:
+        List[TicketMessage]: Сообщения тикета по времени отправки
+    """
+    query = select(TicketMessage).where(TicketMessage.ticket_id == ticket.id)
+    if ticket.created_at is not None:
+        query = query.where(TicketMessage.sent_at >= ticket.created_at - MESSAGES_TIME_MARGIN)
+    query = query.order_by(TicketMessage.sent_at.asc(), TicketMessage.id.asc())
+
+    messages = list((await session.execute(query)).scalars().all())
+    set_committed_value(ticket, "messages", messages)
+    return messages
+
+
+def queue_position(created_at: datetime, priority: int) -> datetime:
+    """
+    Возвращает позицию тикета в очереди (значение tickets.queue_at).
+
+    Каждый уровень приоритета сдвигает тикет на один шаг вперед, как если бы он
+    был создан на шаг раньше. Поэтому срочный тикет обгоняет обычные, созданные
+    не раньше чем за два шага до него, а более старые тикеты остаются впереди
+    и не "голодают".
+
+    Args:
+        created_at: Время создания тикета
+        priority: Уровень приоритета
+
+    Returns:
+        datetime: Позиция в очереди
+    """
+    return created_at - _priority_step * priority
+
+
+async def set_ticket_priority(session: AsyncSession, ticket_id: int, priority: int) -> Optional[Ticket]:
+    """
+    Меняет приоритет тикета и пересчитывает его позицию в очереди.
+    Транзакция не фиксируется: вызывающий код вызывает commit().
+
+    Args:
+        session: Сессия БД
+        ticket_id: ID тикета
+        priority: Новый уровень приоритета
+
+    Returns:
+        Optional[Ticket]: Тикет или None, если он не найден или уже закрыт
+    """
+    if priority not in PRIORITY_LABELS:
+        raise ValueError(f"Неизвестный уровень приоритета: {priority}")
+
+    ticket = await session.get(Ticket, ticket_id)
+    if not ticket or ticket.status == TicketStatus.CLOSED:
+        return None
+
+    ticket.priority = priority
+    ticket.queue_at = queue_position(ticket.created_at, priority)
+    return ticket
+
+
+def setup_ticket_queue(config: Optional[Config] = None) -> None:
+    """
+    Настраивает очередь тикетов.
+
+    Args:
+        config: Объект конфигурации (если None, используются значения по умолчанию)
+    """
+    global _priority_step
+
+    if config is not None:
+        _priority_step = timedelta(minutes=config.queue.priority_step_minutes)
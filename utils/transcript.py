@@ -0,0 +1,131 @@
+import json
+import zlib
+import struct
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Формат сжатой переписки архивного тикета (tickets_archive.transcript):
+# заголовок (сигнатура, версия, кодек, количество сообщений, длина несжатых данных),
+# за ним - сжатый JSON-массив сообщений, каждое сообщение - массив значений TRANSCRIPT_FIELDS.
+# С версии 2 вместо текста сообщения в блоке хранится его длина в символах (null - текста нет),
+# а сами тексты - в tickets_archive.transcript_text (transcript_text), по которому строится
+# полнотекстовый индекс, поэтому текст не хранится дважды. Блоки версии 1 содержат текст
+# и читаются без transcript_text
+TRANSCRIPT_MAGIC = b"TR"
+TRANSCRIPT_VERSION = 2
+CODEC_ZLIB = 1
+
+_READABLE_VERSIONS = (1, 2)
+
+TRANSCRIPT_FIELDS = (
+    "id", "sender_id", "message_type", "text", "file_id", "sent_at", "is_read", "media_group_id",
+)
+
+# Разделитель текстов сообщений в transcript_text
+TEXT_SEPARATOR = "\n"
+
+_header = struct.Struct(">2sBBII")
+_text_index = TRANSCRIPT_FIELDS.index("text")
+_sent_at_index = TRANSCRIPT_FIELDS.index("sent_at")
+
+# Переписка записывается один раз, поэтому используется максимальная степень сжатия
+COMPRESSION_LEVEL = 9
+
+
+def pack_transcript(messages: List[Dict[str, Any]]) -> bytes:
+    """
+    Упаковывает сообщения тикета (без текста - он хранится в transcript_text) в один сжатый блок.
+
+    Args:
+        messages: Сообщения в порядке отправки; ключи - TRANSCRIPT_FIELDS,
+            message_type - значение MessageType ("text", "system", ...), sent_at - datetime или None
+
+    Returns:
+        bytes: Заголовок и сжатые данные
+    """
+    rows = []
+    for message in messages:
+        row = [message.get(field) for field in TRANSCRIPT_FIELDS]
+        text = row[_text_index]
+        row[_text_index] = len(text) if text is not None else None
+        sent_at = row[_sent_at_index]
+        row[_sent_at_index] = sent_at.isoformat() if sent_at else None
+        rows.append(row)
+
+    raw = json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    header = _header.pack(TRANSCRIPT_MAGIC, TRANSCRIPT_VERSION, CODEC_ZLIB, len(rows), len(raw))
+    return header + zlib.compress(raw, COMPRESSION_LEVEL)
+
+
+def transcript_text(messages: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    Тексты сообщений переписки (tickets_archive.transcript_text): по ним строится полнотекстовый
+    индекс, и из них unpack_transcript восстанавливает текст сообщений.
+
+    Args:
+        messages: Сообщения в порядке отправки (как для pack_transcript)
+
+    Returns:
+        Optional[str]: Тексты сообщений через TEXT_SEPARATOR или None, если текста нет
+    """
+    texts = [message["text"] for message in messages if message.get("text") is not None]
+    return TEXT_SEPARATOR.join(texts) if texts else None
+
+
+def unpack_transcript(blob: bytes, text: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Распаковывает сжатую переписку.
+
+    Args:
+        blob: Заголовок и сжатые данные (результат pack_transcript)
+        text: Тексты сообщений (результат transcript_text); для блоков версии 1 не нужен
+
+    Returns:
+        List[Dict[str, Any]]: Сообщения в порядке отправки (sent_at - datetime)
+
+    Raises:
+        ValueError: Если данные повреждены, записаны в неизвестном формате или не совпадают с text
+    """
+    if len(blob) < _header.size:
+        raise ValueError(f"Переписка повреждена: {len(blob)} байт меньше заголовка")
+
+    magic, version, codec, count, length = _header.unpack_from(blob)
+    if magic != TRANSCRIPT_MAGIC or version not in _READABLE_VERSIONS or codec != CODEC_ZLIB:
+        raise ValueError(f"Неизвестный формат переписки: {magic!r}, версия {version}, кодек {codec}")
+
+    try:
+        raw = zlib.decompress(blob[_header.size:])
+    except zlib.error as e:
+        raise ValueError(f"Переписка повреждена: {e}") from e
+    if len(raw) != length:
+        raise ValueError(f"Переписка повреждена: ожидалось {length} байт, распаковано {len(raw)}")
+
+    messages = []
+    for row in json.loads(raw):
+        message = dict(zip(TRANSCRIPT_FIELDS, row))
+        if message["sent_at"]:
+            message["sent_at"] = datetime.fromisoformat(message["sent_at"])
+        messages.append(message)
+
+    if len(messages) != count:
+        raise ValueError(f"Переписка повреждена: ожидалось {count} сообщений, получено {len(messages)}")
+
+    if version >= 2:
+        _restore_text(messages, text or "")
+    return messages
+
+
+def _restore_text(messages: List[Dict[str, Any]], text: str) -> None:
+    """Заменяет длины текстов в сообщениях текстами из transcript_text."""
+    position = 0
+    for message in messages:
+        size = message["text"]
+        if size is None:
+            continue
+        if not isinstance(size, int) or size < 0 or position + size > len(text):
+            raise ValueError(f"Текст переписки не совпадает с блоком: сообщение {message['id']}")
+        message["text"] = text[position:position + size]
+        position += size + len(TEXT_SEPARATOR)
+
+    if max(position - len(TEXT_SEPARATOR), 0) != len(text):
+        raise ValueError(f"Текст переписки не совпадает с блоком: {len(text)} символов, использовано {position}")